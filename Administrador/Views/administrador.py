@@ -9,93 +9,115 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_http_methods
 from ..forms import EditarClienteForm, ClienteRegistrationForm, MecanicoRegistrationForm, EditarMecanicoForm
+from ..estatisticas import acontagem_agendamentos, atotais_sistema, contagem_agendamentos, contar_tabelas
+from ..filtros import filtrar_agendamentos
+from ..exportacao import EXPORTACOES, FORMATOS, em_partes_assincronas, linhas_exportacao
+from ..limpeza import criar_tarefa, iniciar_em_segundo_plano, progresso, tarefa_ativa
+from ..disponibilidade import HorarioIndisponivel, reservar_horario
+from django.utils import timezone
+from ..paginacao import ler_por_pagina, paginar_por_data
+from urllib.parse import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db import IntegrityError
-from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from .. import busca, caixa_saida
+from ..motos import resolver_moto
+from ..placas import normalizar_placa
+from ..servicos import listar_servicos, obter_servico, servico_por_nome
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+from ..perfis import aperfil_da_requisicao
+from .assincrono import arender
+from ..caches import obter_fragmento
+from asgiref.sync import sync_to_async
+from django.utils.html import json_script
+import asyncio
+import json
 import os
 
 
+def _graficos_admin():
+    """Fragmento dos gráficos de linha e de barras: os dados em um <script type="application/json">"""
+    # Agendamentos por mês (últimos 6 meses)
+    seis_meses_atras = date.today() - timedelta(days=180)
+    agendamentos_por_mes = Agendamento.objects.filter(
+        data_hora__date__gte=seis_meses_atras
+    ).annotate(
+        mes=TruncMonth('data_hora')
+    ).values('mes').annotate(
+        total=Count('id')
+    ).order_by('mes')
+    
+    # Serviços mais solicitados (Top 5)
+    servicos_populares = Agendamento.objects.values(
+        'servico__nome'
+    ).annotate(
+        total=Count('id')
+    ).order_by('-total')[:5]
+    
+    dados = {
+        'meses_labels': [item['mes'].strftime('%b/%Y') for item in agendamentos_por_mes],
+        'meses_valores': [item['total'] for item in agendamentos_por_mes],
+        'servicos_labels': [s['servico__nome'] for s in servicos_populares],
+        'servicos_valores': [s['total'] for s in servicos_populares],
+    }
+    return json_script(dados, 'dados-graficos'), {nome: json.dumps(valores) for nome, valores in dados.items()}
+
+
 @login_required
-def dashboard_admin(request):
-    """Dashboard do Administrador com dados completos"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+async def dashboard_admin(request):
+    """
+    Dashboard do Administrador com dados completos
+
+    Assíncrona: as consultas são independentes e vão juntas em um
+    asyncio.gather, sem ocupar uma thread do servidor ASGI enquanto esperam.
+    Os gráficos de mês e de serviços vêm do cache de fragmentos até um
+    agendamento ou serviço mudar.
+    """
+    perfil, _ = await aperfil_da_requisicao(request)
+    if not perfil.eh_administrador:
         messages.error(request, 'Acesso negado. Apenas administradores podem acessar esta página.')
         return redirect('login')
     
     try:
-        # Dados para o dashboard
-        total_clientes = Cliente.objects.count()
-        total_mecanicos = Mecanico.objects.count()
-        total_agendamentos = Agendamento.objects.count()
-        total_ordens = OrdemServico.objects.count()
-        
-        agendamentos_hoje = Agendamento.objects.filter(data_hora__date=date.today()).count()
-        servicos_andamento = Agendamento.objects.filter(status='em_andamento').count()
-        agendamentos_pendentes = Agendamento.objects.filter(status='agendado').count()
-        agendamentos_concluidos = Agendamento.objects.filter(status='concluido').count()
-        agendamentos_cancelados = Agendamento.objects.filter(status='cancelado').count()
-        
-        # Dados para gráficos
-        from django.db.models import Count
-        from django.db.models.functions import TruncMonth
-        import json
-        
-        # Agendamentos por mês (últimos 6 meses)
-        seis_meses_atras = date.today() - timedelta(days=180)
-        agendamentos_por_mes = Agendamento.objects.filter(
-            data_hora__date__gte=seis_meses_atras
-        ).annotate(
-            mes=TruncMonth('data_hora')
-        ).values('mes').annotate(
-            total=Count('id')
-        ).order_by('mes')
-        
-        # Preparar dados para o gráfico de linha
-        meses_labels = []
-        meses_valores = []
-        for item in agendamentos_por_mes:
-            meses_labels.append(item['mes'].strftime('%b/%Y'))
-            meses_valores.append(item['total'])
-        
-        # Serviços mais solicitados (Top 5)
-        servicos_populares = Agendamento.objects.values(
-            'servico__nome'
-        ).annotate(
-            total=Count('id')
-        ).order_by('-total')[:5]
-        
-        servicos_labels = [s['servico__nome'] for s in servicos_populares]
-        servicos_valores = [s['total'] for s in servicos_populares]
+        # Totais (uma query), status (outra) e os gráficos (cache ou duas queries), ao mesmo tempo
+        totais, contagem, (graficos, dados_graficos) = await asyncio.gather(
+            atotais_sistema(),
+            acontagem_agendamentos(),
+            sync_to_async(obter_fragmento)(
+                'admin_graficos', ['agendamentos', 'servicos'], _graficos_admin,
+                partes=[date.today().isoformat()],
+            ),
+        )
         
         context = {
-            'total_clientes': total_clientes,
-            'total_mecanicos': total_mecanicos,
-            'total_agendamentos': total_agendamentos,
-            'total_ordens': total_ordens,
-            'agendamentos_hoje': agendamentos_hoje,
-            'servicos_andamento': servicos_andamento,
-            'agendamentos_pendentes': agendamentos_pendentes,
-            'agendamentos_concluidos': agendamentos_concluidos,
-            'agendamentos_cancelados': agendamentos_cancelados,
+            'total_clientes': totais['clientes'],
+            'total_mecanicos': totais['mecanicos'],
+            'total_agendamentos': contagem['total'],
+            'total_ordens': totais['ordens'],
+            'agendamentos_hoje': contagem['hoje'],
+            'servicos_andamento': contagem['em_andamento'],
+            'agendamentos_pendentes': contagem['agendado'],
+            'agendamentos_concluidos': contagem['concluido'],
+            'agendamentos_cancelados': contagem['cancelado'],
             # Dados para gráficos
-            'meses_labels': json.dumps(meses_labels),
-            'meses_valores': json.dumps(meses_valores),
-            'servicos_labels': json.dumps(servicos_labels),
-            'servicos_valores': json.dumps(servicos_valores),
+            'graficos': graficos,
+            **dados_graficos,
         }
         
-        return render(request, 'Administrador/dashbord-admin.html', context)
+        return await arender(request, 'Administrador/dashbord-admin.html', context)
         
     except Exception as e:
         messages.error(request, f'Erro ao carregar dashboard: {e}')
-        return render(request, 'Administrador/dashbord-admin.html', {})
+        return await arender(request, 'Administrador/dashbord-admin.html', {})
 
 
 
 @login_required
 def clientes_admin(request):
     """Página de gerenciamento de clientes"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
@@ -151,7 +173,7 @@ def criar_admin_padrao(request):
 @login_required  
 def agendar_servico_admin(request):
     """Página de agendamento específica para administradores"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
@@ -179,16 +201,13 @@ def agendar_servico_admin(request):
                 if not outro_servico:
                     messages.error(request, 'Por favor, digite o nome do serviço.')
                     return redirect('agendar-servico-admin')
-                # Criar ou buscar serviço personalizado
-                servico, created = Servicos.objects.get_or_create(
-                    nome=outro_servico,
-                    defaults={'descricao': f'Serviço personalizado: {outro_servico}'}
-                )
+                # Serviço personalizado: o do catálogo com esse nome ou um novo
+                servico = servico_por_nome(outro_servico, f'Serviço personalizado: {outro_servico}')
             elif not servico_id:
                 messages.error(request, 'Por favor, selecione um serviço.')
                 return redirect('agendar-servico-admin')
             else:
-                servico = get_object_or_404(Servicos, id=servico_id)
+                servico = obter_servico(servico_id)
             
             # Buscar objetos
             cliente = get_object_or_404(Cliente, id=cliente_id)
@@ -196,44 +215,40 @@ def agendar_servico_admin(request):
             if mecanico_id:
                 mecanico = get_object_or_404(Mecanico, id=mecanico_id)
             
-            # Criar ou buscar moto
-            moto, created = Moto.objects.get_or_create(
-                marca=marca,
-                modelo=modelo,
-                ano=int(ano)
-            )
-            
             # Combinar data e hora
             from datetime import datetime
-            data_hora = datetime.strptime(f"{data} {hora}", "%Y-%m-%d %H:%M")
+            data_hora = timezone.make_aware(datetime.strptime(f"{data} {hora}", "%Y-%m-%d %H:%M"))
             
-            # Criar agendamento
-            agendamento = Agendamento.objects.create(
-                cliente=cliente,
-                mecanico=mecanico,
-                servico=servico,
-                data_hora=data_hora,
-                moto=moto,
-                descricao_problema=descricao,
-                status='agendado'
-            )
+            # Valida o horário (expediente, antecedência, limite do dia) e grava na mesma transação
+            with reservar_horario(data_hora):
+                # Moto do cliente (pela placa, se informada); só cria se ele não a tiver
+                moto = resolver_moto(cliente, marca, modelo, ano, request.POST.get('placa'))
+                
+                # Criar agendamento
+                agendamento = Agendamento.objects.create(
+                    cliente=cliente,
+                    mecanico=mecanico,
+                    servico=servico,
+                    data_hora=data_hora,
+                    moto=moto,
+                    descricao_problema=descricao,
+                    status='agendado'
+                )
+                caixa_saida.enfileirar('confirmacao', agendamento)
             
             messages.success(request, f'Agendamento #{agendamento.id} criado com sucesso!')
             return redirect('adm-agendamentos')
             
+        except HorarioIndisponivel as e:
+            messages.error(request, str(e))
+            return redirect('agendar-servico-admin')
         except Exception as e:
             messages.error(request, f'Erro ao criar agendamento: {str(e)}')
             return redirect('agendar-servico-admin')
     
-    # Buscar dados necessários para o formulário
-    clientes = Cliente.objects.all().select_related('usuario')
-    mecanicos = Mecanico.objects.all().select_related('usuario')
-    servicos = Servicos.objects.all()
-    
+    # Cliente e mecânico são escolhidos pelo autocompletar (ver autocompletar)
     context = {
-        'clientes': clientes,
-        'mecanicos': mecanicos,
-        'servicos': servicos,
+        'servicos': listar_servicos(),
     }
     
     return render(request, 'Administrador/agenda_servico/agendar-servico-admin.html', context)
@@ -244,47 +259,83 @@ def agendar_servico_admin(request):
 @login_required
 def agendamentos_admin(request):
     """Página de gerenciamento de agendamentos com filtros"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
-    # Filtrar por status se especificado
-    status_filter = request.GET.get('status', '')
-    
-    agendamentos = Agendamento.objects.all().select_related(
+    # Filtros (status, mecânico, serviço e período) aplicados no banco
+    agendamentos, filtros = filtrar_agendamentos(request.GET)
+    agendamentos = agendamentos.select_related(
         'cliente__usuario', 'moto', 'servico', 'mecanico__usuario'
     )
     
-    if status_filter:
-        agendamentos = agendamentos.filter(status=status_filter)
+    # Paginação por cursor em (data_hora, id) - custo constante por página
+    por_pagina = ler_por_pagina(request.GET.get('por_pagina'))
+    pagina = paginar_por_data(
+        agendamentos,
+        cursor=request.GET.get('cursor'),
+        por_pagina=por_pagina,
+        anterior=request.GET.get('direcao') == 'anterior',
+    )
     
-    # Contar agendamentos por status para os badges
-    total_count = Agendamento.objects.count()
-    andamento_count = Agendamento.objects.filter(status='em_andamento').count()
-    concluido_count = Agendamento.objects.filter(status='concluido').count()
-    cancelado_count = Agendamento.objects.filter(status='cancelado').count()
-    agendado_count = Agendamento.objects.filter(status='agendado').count()
+    # Contar agendamentos por status para os badges (uma única query)
+    contagem = contagem_agendamentos()
     
     context = {
-        'agendamentos': agendamentos,
-        'status_filter': status_filter,
-        'total_count': total_count,
-        'andamento_count': andamento_count,
-        'concluido_count': concluido_count,
-        'cancelado_count': cancelado_count,
-        'agendado_count': agendado_count,
+        'agendamentos': pagina,
+        'pagina': pagina,
+        'filtros': filtros,
+        'filtros_query': urlencode({**filtros, 'por_pagina': por_pagina}),
+        'status_filter': filtros.get('status', ''),
+        'mecanicos': Mecanico.objects.select_related('usuario').order_by('nome_completo'),
+        'servicos': listar_servicos(),
+        'tipos_exportacao': [
+            ('agendamentos', 'Agendamentos'), ('ordens', 'Ordens de serviço'),
+            ('clientes', 'Clientes'), ('motos', 'Motos'),
+        ],
+        'total_count': contagem['total'],
+        'andamento_count': contagem['em_andamento'],
+        'concluido_count': contagem['concluido'],
+        'cancelado_count': contagem['cancelado'],
+        'agendado_count': contagem['agendado'],
     }
     return render(request, 'Administrador/agenda_servico/agendamentos-admin.html', context)
 
 
+def exportar_dados(request, tipo, formato):
+    """Exporta agendamentos, ordens, clientes ou motos em CSV/XLSX (streaming)"""
+    if not request.perfil.eh_administrador:
+        messages.error(request, 'Acesso negado.')
+        return redirect('login')
+    
+    if tipo not in EXPORTACOES or formato not in FORMATOS:
+        messages.error(request, 'Exportação não encontrada.')
+        return redirect('adm-agendamentos')
+    
+    # Mesmos filtros da listagem de agendamentos; as linhas são lidas em lotes
+    cabecalho, linhas = linhas_exportacao(tipo, request.GET)
+    gerar, content_type = FORMATOS[formato]
+    conteudo = gerar(cabecalho, linhas)
+    if isinstance(request, ASGIRequest):
+        # O ASGI juntaria o gerador síncrono inteiro na memória (ver exportacao.py)
+        conteudo = em_partes_assincronas(conteudo)
+    
+    response = StreamingHttpResponse(conteudo, content_type=content_type)
+    nome_arquivo = f"{tipo}-{timezone.localdate():%Y-%m-%d}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
 @login_required
 def editar_agendamento(request, id):
     """Editar agendamento"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
-    agendamento = get_object_or_404(Agendamento, id=id)
+    agendamento = get_object_or_404(
+        Agendamento.objects.select_related('cliente__usuario', 'mecanico__usuario'), id=id
+    )
     
     if request.method == 'POST':
         try:
@@ -311,16 +362,13 @@ def editar_agendamento(request, id):
                 if not outro_servico:
                     messages.error(request, 'Por favor, digite o nome do serviço.')
                     return redirect('editar_agendamento', id=id)
-                # Criar ou buscar serviço personalizado
-                servico, created = Servicos.objects.get_or_create(
-                    nome=outro_servico,
-                    defaults={'descricao': f'Serviço personalizado: {outro_servico}'}
-                )
+                # Serviço personalizado: o do catálogo com esse nome ou um novo
+                servico = servico_por_nome(outro_servico, f'Serviço personalizado: {outro_servico}')
             elif not servico_id:
                 messages.error(request, 'Por favor, selecione um serviço.')
                 return redirect('editar_agendamento', id=id)
             else:
-                servico = get_object_or_404(Servicos, id=servico_id)
+                servico = obter_servico(servico_id)
             
             # Buscar objetos
             cliente = get_object_or_404(Cliente, id=cliente_id)
@@ -328,12 +376,8 @@ def editar_agendamento(request, id):
             if mecanico_id:
                 mecanico = get_object_or_404(Mecanico, id=mecanico_id)
             
-            # Criar ou atualizar moto
-            moto, created = Moto.objects.get_or_create(
-                marca=marca,
-                modelo=modelo,
-                ano=int(ano)
-            )
+            # Moto do cliente (pela placa, se informada); só cria se ele não a tiver
+            moto = resolver_moto(cliente, marca, modelo, ano, request.POST.get('placa'))
             
             # Combinar data e hora
             from datetime import datetime
@@ -356,31 +400,143 @@ def editar_agendamento(request, id):
             messages.error(request, f'Erro ao atualizar agendamento: {str(e)}')
             return redirect('editar_agendamento', id=id)
     
-    # Buscar dados necessários para o formulário
-    clientes = Cliente.objects.all().select_related('usuario')
-    mecanicos = Mecanico.objects.all().select_related('usuario')
-    servicos = Servicos.objects.all()
-    
+    # Cliente e mecânico são escolhidos pelo autocompletar (ver autocompletar)
     context = {
         'agendamento': agendamento,
-        'clientes': clientes,
-        'mecanicos': mecanicos,
-        'servicos': servicos,
+        'servicos': listar_servicos(),
     }
     
     return render(request, 'Administrador/agenda_servico/editar-agendamento.html', context)
 
 
+def _opcao(tipo, objeto):
+    nome = objeto.nome_completo or objeto.usuario.username
+    if tipo == 'clientes':
+        detalhe = f'{objeto.cpf} · {objeto.email}'
+    else:
+        detalhe = objeto.especialidade
+    return {'id': objeto.id, 'nome': nome, 'detalhe': detalhe}
+
+
+def autocompletar(request, tipo):
+    """JSON com até busca.LIMITE_MAXIMO clientes ou mecânicos que contêm o termo
+
+    Parâmetros: q (nome, CPF, e-mail ou username; mínimo busca.MIN_CARACTERES)
+    e limite. Usado pelos campos de cliente e mecânico dos formulários de agendamento.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Autenticação necessária'}, status=401)
+    if not request.perfil.eh_administrador:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    if tipo not in busca.INDICES:
+        return JsonResponse({'error': 'Tipo inválido'}, status=404)
+    
+    try:
+        limite = int(request.GET.get('limite', busca.LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'error': 'Parâmetros inválidos'}, status=400)
+    
+    objetos = busca.buscar(tipo, request.GET.get('q', ''), limite)
+    return JsonResponse({'resultados': [_opcao(tipo, objeto) for objeto in objetos]})
+
+
+def buscar_agendamentos(request):
+    """JSON com os agendamentos mais relevantes para o texto (busca.buscar_agendamentos)
+
+    Parâmetros: q (cliente, moto, placa, serviço ou descrições), inicio e fim
+    (AAAA-MM-DD, opcionais) e limite.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Autenticação necessária'}, status=401)
+    if not request.perfil.eh_administrador:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    
+    try:
+        inicio, fim = (
+            datetime.strptime(request.GET[nome], '%Y-%m-%d').date() if request.GET.get(nome) else None
+            for nome in ('inicio', 'fim')
+        )
+        limite = int(request.GET.get('limite', busca.LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'error': 'Parâmetros inválidos'}, status=400)
+    
+    agendamentos = busca.buscar_agendamentos(request.GET.get('q', ''), limite, inicio=inicio, fim=fim)
+    return JsonResponse({'resultados': [
+        {
+            'id': agendamento.id,
+            'data_hora': timezone.localtime(agendamento.data_hora).strftime('%d/%m/%Y %H:%M'),
+            'status': agendamento.get_status_display(),
+            'cliente': agendamento.cliente.nome_completo,
+            'moto': ' '.join(filter(None, [agendamento.moto.marca, agendamento.moto.modelo, agendamento.moto.placa])),
+            'servico': agendamento.servico.nome,
+            'descricao': agendamento.descricao_problema or '',
+            'url': reverse('editar_agendamento', args=[agendamento.id]),
+        }
+        for agendamento in agendamentos
+    ]})
+
+
+def buscar_placa(request):
+    """JSON com as motos da placa, o dono e o último serviço concluído, em uma query
+
+    Parâmetro: placa, em qualquer formato (ABC-1234, abc 1234, ABC1C34); a
+    busca usa a chave indexada Moto.placa_normalizada (placas.py). O último
+    serviço considera só os agendamentos ainda não arquivados.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Autenticação necessária'}, status=401)
+    if not request.perfil.eh_administrador:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    
+    chave = normalizar_placa(request.GET.get('placa'))
+    if chave is None:
+        return JsonResponse({'error': 'Informe a placa'}, status=400)
+    
+    ultimo = Agendamento.objects.filter(moto=OuterRef('pk'), status='concluido').order_by('-data_hora', '-id')
+    motos = Moto.objects.filter(placa_normalizada=chave).select_related('cliente').annotate(
+        ultimo_id=Subquery(ultimo.values('id')[:1]),
+        ultimo_data_hora=Subquery(ultimo.values('data_hora')[:1]),
+        ultimo_servico=Subquery(ultimo.values('servico__nome')[:1]),
+        ultimo_valor=Subquery(ultimo.values('valor_servico')[:1]),
+    )
+    return JsonResponse({'resultados': [
+        {
+            'id': moto.id,
+            'marca': moto.marca,
+            'modelo': moto.modelo,
+            'ano': moto.ano,
+            'placa': moto.placa,
+            'cor': moto.cor or '',
+            # Motos sem dono ainda existem (ex.: cadastradas pelo admin do Django)
+            'cliente': {
+                'id': moto.cliente.id,
+                'nome': moto.cliente.nome_completo,
+                'telefone': moto.cliente.telefone,
+                'email': moto.cliente.email,
+            } if moto.cliente_id else None,
+            'ultimo_servico': {
+                'id': moto.ultimo_id,
+                'data_hora': timezone.localtime(moto.ultimo_data_hora).strftime('%d/%m/%Y %H:%M'),
+                'servico': moto.ultimo_servico,
+                'valor': f'{moto.ultimo_valor:.2f}' if moto.ultimo_valor is not None else None,
+            } if moto.ultimo_id else None,
+        }
+        for moto in motos
+    ]})
+
+
 @login_required
 def cancelar_agendamento(request, id):
     """Cancelar agendamento"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
     agendamento = get_object_or_404(Agendamento, id=id)
-    agendamento.status = 'cancelado'
-    agendamento.save()
+    with transaction.atomic():
+        agendamento.status = 'cancelado'
+        agendamento.save()
+        caixa_saida.enfileirar('cancelamento', agendamento)
     
     messages.success(request, f'Agendamento de {agendamento.cliente} foi cancelado!')
     return redirect('adm-agendamentos')
@@ -392,7 +548,7 @@ def cancelar_agendamento(request, id):
 @login_required
 def mecanicos_admin(request):
     """Página de gerenciamento de mecânicos"""
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
     
@@ -437,7 +593,7 @@ def admin_registrar_cliente(request):
 
 def excluir_cliente(request, id):
     # se o udsuário não for administrador ou staff, redireciona
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
 
@@ -490,7 +646,7 @@ def editar_mecanico(request, pk):
 
 def excluir_mecanico(request, id):
     # se o udsuário não for administrador ou staff, redireciona
-    if not (hasattr(request.user, 'administrador') or request.user.is_staff):
+    if not request.perfil.eh_administrador:
         messages.error(request, 'Acesso negado.')
         return redirect('login')
 
@@ -507,7 +663,7 @@ def excluir_mecanico(request, id):
 
 from django.http import HttpResponse
 import csv
-from ..models import ConfiguracaoOficina, ConfiguracaoAgendamento, ConfiguracaoNotificacao
+from ..models import ConfiguracaoOficina, ConfiguracaoAgendamento, ConfiguracaoNotificacao, TarefaLimpeza
 
 @login_required
 def configuracoes_admin(request):
@@ -639,13 +795,18 @@ def configuracoes_admin(request):
         return redirect('configuracoes_admin')
     
     # Estatísticas para o dashboard
+    totais = contar_tabelas(
+        clientes=Cliente.objects.all(),
+        mecanicos=Mecanico.objects.all(),
+        admins=User.objects.filter(is_staff=True),
+    )
     context = {
         'config': config,
         'config_agendamento': config_agendamento,
         'config_notificacao': config_notificacao,
-        'total_clientes': Cliente.objects.count(),
-        'total_mecanicos': Mecanico.objects.count(),
-        'total_admins': User.objects.filter(is_staff=True).count(),
+        'total_clientes': totais['clientes'],
+        'total_mecanicos': totais['mecanicos'],
+        'total_admins': totais['admins'],
         'servicos': Servicos.objects.all(),
         'ultimo_backup': None,  # Implementar depois
         'logins_hoje': 0,  # Implementar depois
@@ -667,19 +828,12 @@ def limpar_dados_sistema(request):
         
         try:
             if tipo_limpeza == 'agendamentos':
-                # Remove agendamentos cancelados/concluídos com mais de 6 meses
-                data_limite = datetime.now() - timedelta(days=180)
-                agendamentos_antigos = Agendamento.objects.filter(
-                    status__in=['cancelado', 'concluido'],
-                    data_hora__lt=data_limite
-                )
-                count = agendamentos_antigos.count()
-                agendamentos_antigos.delete()
-                
-                return JsonResponse({
-                    'success': True,
-                    'message': f'{count} agendamentos antigos removidos com sucesso!'
-                })
+                # Remove agendamentos cancelados/concluídos com mais de 6 meses, em segundo plano
+                return _iniciar_limpeza(request, 'agendamentos')
+            
+            elif tipo_limpeza == 'arquivamento':
+                # Move agendamentos cancelados/concluídos com mais de 6 meses para o arquivo
+                return _iniciar_limpeza(request, 'arquivamento')
             
             elif tipo_limpeza == 'logs':
                 # Simular limpeza de logs (implementar conforme necessário)
@@ -698,17 +852,8 @@ def limpar_dados_sistema(request):
             elif tipo_limpeza == 'reset_total':
                 # Reset completo - CUIDADO!
                 if request.POST.get('confirmacao') == 'CONFIRMAR RESET':
-                    # Remover todos os dados (exceto usuário admin)
-                    Agendamento.objects.all().delete()
-                    OrdemServico.objects.all().delete()
-                    Cliente.objects.all().delete()
-                    Mecanico.objects.all().delete()
-                    Moto.objects.all().delete()
-                    
-                    return JsonResponse({
-                        'success': True,
-                        'message': 'Sistema resetado completamente! Todos os dados foram removidos.'
-                    })
+                    # Remover todos os dados (exceto usuários), em lotes e em segundo plano
+                    return _iniciar_limpeza(request, 'reset_total')
                 else:
                     return JsonResponse({
                         'error': 'Confirmação incorreta'
@@ -721,4 +866,33 @@ def limpar_dados_sistema(request):
     
     return JsonResponse({'error': 'Método não permitido'}, status=405)
 
+
+def _iniciar_limpeza(request, tipo):
+    """Cria a tarefa de limpeza (ou reaproveita a que já está rodando) e responde 202"""
+    tarefa = tarefa_ativa(tipo)
+    if tarefa is None:
+        tarefa = criar_tarefa(tipo, request.user)
+        mensagem = f'Limpeza iniciada em segundo plano: {tarefa.total_estimado} registros a remover.'
+    else:
+        # Se a execução anterior morreu sem terminar, esta chamada a retoma
+        iniciar_em_segundo_plano(tarefa.pk)
+        mensagem = 'Já existe uma limpeza deste tipo em andamento.'
+    
+    return JsonResponse({
+        'success': True,
+        'message': mensagem,
+        'tarefa_id': tarefa.pk,
+        'status_url': reverse('status_limpeza', args=[tarefa.pk]),
+    }, status=202)
+
+
+@login_required
+def status_limpeza(request, id):
+    """Progresso de uma limpeza em segundo plano (consultado periodicamente pela página)"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+    
+    tarefa = get_object_or_404(TarefaLimpeza, id=id)
+    return JsonResponse(progresso(tarefa))
+
  
\ No newline at end of file
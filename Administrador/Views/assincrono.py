@@ -0,0 +1,25 @@
+"""
+Apoio às views assíncronas (dashboards servidos pelo core/asgi.py)
+
+As consultas são avaliadas antes do render, pelo ORM assíncrono, e as
+independentes vão juntas em asyncio.gather. O que ainda é síncrono (sessão,
+mensagens, context processors, o próprio render) roda em sync_to_async.
+
+No Django 5.2 o ORM assíncrono ainda delega ao driver síncrono, na thread da
+requisição: o gather deixa o código pronto para um driver assíncrono, mas
+hoje as queries de uma requisição continuam em sequência. Com o SQLite a
+vazão fica perto da do WSGI (queries e render disputam o GIL); o que muda
+é que requisições esperando não prendem threads do servidor. Meça com
+`python manage.py benchmark_dashboards`.
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+
+async def listar(queryset):
+    """list(queryset) pelo ORM assíncrono"""
+    return [item async for item in queryset]
+
+
+async def arender(request, template, context=None):
+    return await sync_to_async(render)(request, template, context)
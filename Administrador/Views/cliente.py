@@ -1,76 +1,62 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth import logout as django_logout, authenticate, login as login_user
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime
-from ..models import Moto, Servicos, Agendamento, OrdemServico, Mecanico, Cliente, Administrador, ConfiguracaoOficina
-
-def Mostrar(request):
+from contextlib import nullcontext
+from ..models import Moto, Servicos, Agendamento, AgendamentoArquivado, OrdemServico, Mecanico, Cliente, Administrador, ConfiguracaoOficina
+from urllib.parse import urlencode
+from django.db import IntegrityError, transaction
+from .. import caixa_saida
+from ..caches import TEMPO_CACHE_RESUMO_CLIENTE, obter_fragmento, obter_resumo_cliente
+from ..estatisticas import resumo_historico
+from ..paginacao import ler_por_pagina, paginar_por_data
+from ..perfis import aperfil_da_requisicao, guardar_perfil, resolver_perfil
+from ..motos import resolver_moto
+from ..servicos import servico_por_nome
+from ..disponibilidade import HorarioIndisponivel, horarios_disponiveis as calcular_horarios_disponiveis, reservar_horario
+from .assincrono import arender
+from asgiref.sync import sync_to_async
+import asyncio
+
+# Valores do painel sem cliente (visitante ou usuário sem perfil de cliente)
+RESUMO_VAZIO = {
+    'agendamentos': [],
+    'proximo_agendamento': None,
+    'ultimo_servico': None,
+    'total_finalizados': 0,
+    'total_cancelados': 0,
+    'total_pendentes': 0,
+    'total_em_andamento': 0,
+    'total_motos': 0,
+    'total_gasto': 0,
+}
+
+
+def _painel_cliente(cliente):
+    """Fragmento dos contadores e cartões do dashboard e o resumo de onde saiu"""
+    resumo = RESUMO_VAZIO if cliente is None else obter_resumo_cliente(cliente)
+    return render_to_string('Cliente/components/painel-dashboard.html', resumo), resumo
+
+
+async def Mostrar(request):
     # Dashboard profissional do cliente com estatísticas completas
-    servicos = Servicos.objects.all()
-    agendamentos = []
-    ultimo_servico = None
-    total_finalizados = 0
-    total_cancelados = 0
-    total_pendentes = 0
-    total_em_andamento = 0
-    total_motos = 0
-    total_gasto = 0
-    proximo_agendamento = None
-    
-    if request.user.is_authenticated:
-        try:
-            cliente = Cliente.objects.get(usuario=request.user)
-            
-            # Próximos agendamentos (futuros e não cancelados)
-            agendamentos = Agendamento.objects.filter(
-                cliente=cliente, 
-                data_hora__gte=timezone.now()
-            ).exclude(status='cancelado').order_by('data_hora')[:5]
-            
-            # Próximo agendamento
-            proximo_agendamento = agendamentos.first() if agendamentos else None
-            
-            # Último serviço concluído
-            ultimo_servico = Agendamento.objects.filter(
-                cliente=cliente,
-                status='concluido'
-            ).order_by('-data_hora').first()
-            
-            # Estatísticas de serviços
-            total_finalizados = Agendamento.objects.filter(cliente=cliente, status='concluido').count()
-            total_cancelados = Agendamento.objects.filter(cliente=cliente, status='cancelado').count()
-            total_pendentes = Agendamento.objects.filter(cliente=cliente, status='agendado').count()
-            total_em_andamento = Agendamento.objects.filter(cliente=cliente, status='em_andamento').count()
-            
-            # Total de motos cadastradas
-            total_motos = Moto.objects.filter(cliente=cliente).count()
-            
-            # Total gasto em serviços concluídos
-            from django.db.models import Sum
-            total_gasto = Agendamento.objects.filter(
-                cliente=cliente, 
-                status='concluido'
-            ).aggregate(Sum('valor_servico'))['valor_servico__sum'] or 0
-            
-        except Cliente.DoesNotExist:
-            pass
-
-    context = {
-        'servicos': servicos,
-        'agendamentos': agendamentos,
-        'proximo_agendamento': proximo_agendamento,
-        'ultimo_servico': ultimo_servico,
-        'total_finalizados': total_finalizados,
-        'total_cancelados': total_cancelados,
-        'total_pendentes': total_pendentes,
-        'total_em_andamento': total_em_andamento,
-        'total_motos': total_motos,
-        'total_gasto': total_gasto,
-    }
+    # Contadores, total gasto, próximos agendamentos e último serviço: duas
+    # queries, e o HTML fica em cache por cliente até algo dele mudar
+    _, cliente = await aperfil_da_requisicao(request, carregar='cliente')
+    if cliente is None:
+        painel, resumo = await sync_to_async(_painel_cliente)(None)
+    else:
+        painel, resumo = await sync_to_async(obter_fragmento)(
+            'cliente_painel', [f'cliente:{cliente.pk}'], lambda: _painel_cliente(cliente),
+            tempo=TEMPO_CACHE_RESUMO_CLIENTE,
+        )
     
-    return render(request, 'Cliente/dasbord-cliente.html', context)
+    context = {'servicos': Servicos.objects.all(), 'painel': painel, **resumo}
+    return await arender(request, 'Cliente/dasbord-cliente.html', context)
 
 
 
@@ -90,34 +76,22 @@ def login(request):
             login_user(request, user)
             
             try:
-                # Verificar se é um Administrador (staff ou superuser)
-                if user.is_staff or user.is_superuser:
-                    messages.success(request, f'Bem-vindo, Administrador {user.first_name or user.username}!')
-                    return redirect('dashboard-admin')
+                # Papel resolvido em uma única query e guardado na sessão
+                perfil = resolver_perfil(user)
+                guardar_perfil(request, perfil)
+                nome = user.first_name or user.username
                 
-                # Verificar se tem perfil de Administrador
-                try:
-                    admin_profile = Administrador.objects.get(usuario=user)
-                    messages.success(request, f'Bem-vindo, Administrador {user.first_name or user.username}!')
+                if perfil.eh_administrador:
+                    messages.success(request, f'Bem-vindo, Administrador {nome}!')
                     return redirect('dashboard-admin')
-                except Administrador.DoesNotExist:
-                    pass
                 
-                # Verificar se tem perfil de Cliente
-                try:
-                    cliente_profile = Cliente.objects.get(usuario=user)
-                    messages.success(request, f'Bem-vindo, {user.first_name or user.username}!')
+                if perfil.eh_cliente:
+                    messages.success(request, f'Bem-vindo, {nome}!')
                     return redirect('dashboard-cliente')
-                except Cliente.DoesNotExist:
-                    pass
                 
-                # Verificar se tem perfil de Mecânico
-                try:
-                    mecanico_profile = Mecanico.objects.get(usuario=user)
-                    messages.success(request, f'Bem-vindo, Mecânico {user.first_name or user.username}!')
+                if perfil.eh_mecanico:
+                    messages.success(request, f'Bem-vindo, Mecânico {nome}!')
                     return redirect('dashboard-mecanico')
-                except Mecanico.DoesNotExist:
-                    pass
                 
                 # Se não tem nenhum perfil específico, redirecionar para cliente
                 messages.warning(request, 'Usuário sem perfil específico. Redirecionando...')
@@ -139,9 +113,9 @@ def logout_view(request):
 
 
 
-def dashboard_cliente(request):
+async def dashboard_cliente(request):
     """Dashboard do cliente - redireciona para a função Mostrar"""
-    return Mostrar(request)
+    return await Mostrar(request)
 
 
 
@@ -152,7 +126,7 @@ def agendar_servico(request):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         minhas_motos = Moto.objects.filter(cliente=cliente).order_by('-id')
     except Cliente.DoesNotExist:
         cliente = None
@@ -174,75 +148,73 @@ def agendar_servico(request):
                 messages.error(request, ' Todos os campos são obrigatórios!')
                 return redirect('agendar-servico')
             
-            # Obter ou criar moto
-            if moto_id and moto_id != 'nova':
-                # Usar moto cadastrada
-                moto = get_object_or_404(Moto, id=moto_id, cliente=cliente)
-                print(f" Usando moto cadastrada: {moto.marca} {moto.modelo} (ID: {moto.id})")
-            else:
-                # Criar nova moto
-                marca = request.POST.get('marca')
-                modelo = request.POST.get('modelo')
-                ano = request.POST.get('ano')
-                
-                if not all([marca, modelo, ano]):
-                    messages.error(request, ' Para cadastrar nova moto, preencha marca, modelo e ano!')
-                    return redirect('agendar-servico')
-                
-                moto = Moto.objects.create(
-                    cliente=cliente,
-                    marca=marca,
-                    modelo=modelo,
-                    ano=int(ano)
-                )
-                print(f" Nova moto criada: {moto.marca} {moto.modelo} (ID: {moto.id})")
-            
-            # Criar ou buscar o serviço
-            servico, servico_created = Servicos.objects.get_or_create(
-                nome=nome_servico,
-                defaults={'descricao': descricao}
-            )
-            print(f"Serviço {'CRIADO' if servico_created else 'ENCONTRADO'}: {servico.nome} (ID: {servico.id})")
-            
             # Converter data e hora para datetime
             data_hora_str = f"{data} {hora}"
             data_hora = datetime.strptime(data_hora_str, '%Y-%m-%d %H:%M')
             data_hora = timezone.make_aware(data_hora)
             print(f" Data/Hora formatada: {data_hora}")
             
-            # Buscar ou criar cliente - IMPORTANTE: garantir que o perfil existe
-            cliente, cliente_created = Cliente.objects.get_or_create(
-                usuario=request.user,
-                defaults={
-                    'nome_completo': request.user.get_full_name() or request.user.username,
-                    'email': request.user.email or f'{request.user.username}@oficina.com',
-                    'telefone': '(00) 00000-0000',
-                    'endereco': 'Endereço não informado',
-                    'cpf': '000.000.000-00'
-                }
-            )
-            print(f"Cliente {'CRIADO' if cliente_created else 'ENCONTRADO'}: {cliente.nome_completo} (ID: {cliente.id})")
-            
-            # Criar agendamento com STATUS AGENDADO
-            agendamento = Agendamento.objects.create(
-                cliente=cliente,
-                mecanico=None,  # Será atribuído depois pelo mecânico
-                servico=servico,
-                data_hora=data_hora,
-                moto=moto,
-                descricao_problema=descricao,
-                status='agendado'  # IMPORTANTE: status correto
-            )
-            print(f" AGENDAMENTO CRIADO COM SUCESSO!")
-            print(f"   ID: {agendamento.id}")
-            print(f"   Status: {agendamento.status}")
-            print(f"   Cliente: {agendamento.cliente.nome_completo}")
-            print(f"   Data/Hora: {agendamento.data_hora}")
-            print(f"{'='*60}\n")
-            
-            messages.success(request, f' Agendamento #{agendamento.id} criado com sucesso! Aguarde a confirmação do mecânico.')
-            return redirect('dashboard-cliente')
+            # Valida o horário (expediente, antecedência, limite do dia) e grava tudo na mesma transação
+            with reservar_horario(data_hora):
+                # Obter ou criar moto
+                if moto_id and moto_id != 'nova':
+                    # Usar moto cadastrada
+                    moto = get_object_or_404(Moto, id=moto_id, cliente=cliente)
+                    print(f" Usando moto cadastrada: {moto.marca} {moto.modelo} (ID: {moto.id})")
+                else:
+                    # Criar nova moto
+                    marca = request.POST.get('marca')
+                    modelo = request.POST.get('modelo')
+                    ano = request.POST.get('ano')
+                    
+                    if not all([marca, modelo, ano]):
+                        messages.error(request, ' Para cadastrar nova moto, preencha marca, modelo e ano!')
+                        return redirect('agendar-servico')
+                    
+                    # A mesma moto digitada de novo não vira outra
+                    moto = resolver_moto(cliente, marca, modelo, ano, request.POST.get('placa'))
+                
+                # Serviço do catálogo com esse nome; só cria se não houver
+                servico = servico_por_nome(nome_servico, descricao)
+                
+                # Buscar ou criar cliente - IMPORTANTE: garantir que o perfil existe
+                cliente, cliente_created = Cliente.objects.get_or_create(
+                    usuario=request.user,
+                    defaults={
+                        'nome_completo': request.user.get_full_name() or request.user.username,
+                        'email': request.user.email or f'{request.user.username}@oficina.com',
+                        'telefone': '(00) 00000-0000',
+                        'endereco': 'Endereço não informado',
+                        'cpf': '000.000.000-00'
+                    }
+                )
+                print(f"Cliente {'CRIADO' if cliente_created else 'ENCONTRADO'}: {cliente.nome_completo} (ID: {cliente.id})")
+                
+                # Criar agendamento com STATUS AGENDADO
+                agendamento = Agendamento.objects.create(
+                    cliente=cliente,
+                    mecanico=None,  # Será atribuído depois pelo mecânico
+                    servico=servico,
+                    data_hora=data_hora,
+                    moto=moto,
+                    descricao_problema=descricao,
+                    status='agendado'  # IMPORTANTE: status correto
+                )
+                # E-mail de confirmação na mesma transação; o worker envia depois
+                caixa_saida.enfileirar('confirmacao', agendamento)
+                print(f" AGENDAMENTO CRIADO COM SUCESSO!")
+                print(f"   ID: {agendamento.id}")
+                print(f"   Status: {agendamento.status}")
+                print(f"   Cliente: {agendamento.cliente.nome_completo}")
+                print(f"   Data/Hora: {agendamento.data_hora}")
+                print(f"{'='*60}\n")
+                
+                messages.success(request, f' Agendamento #{agendamento.id} criado com sucesso! Aguarde a confirmação do mecânico.')
+                return redirect('dashboard-cliente')
             
+        except HorarioIndisponivel as e:
+            messages.error(request, f' Erro ao criar agendamento: {e}')
+            return redirect('agendar-servico')
         except Exception as e:
             print(f" ERRO CRÍTICO ao criar agendamento:")
             print(f"   Tipo: {type(e).__name__}")
@@ -261,6 +233,34 @@ def agendar_servico(request):
 
 
 
+def horarios_disponiveis(request):
+    """JSON com os horários livres para os formulários de agendamento
+
+    Parâmetros: inicio (AAAA-MM-DD, padrão hoje) e dias (1 a 31, padrão 7)
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Autenticação necessária'}, status=401)
+    
+    try:
+        inicio = datetime.strptime(request.GET['inicio'], '%Y-%m-%d').date() if request.GET.get('inicio') else timezone.localdate()
+        dias = max(1, min(int(request.GET.get('dias', 7)), 31))
+    except ValueError:
+        return JsonResponse({'error': 'Parâmetros inválidos'}, status=400)
+    
+    resultado = calcular_horarios_disponiveis(inicio, dias=dias)
+    return JsonResponse({
+        'dias': [
+            {
+                'data': dia['data'].isoformat(),
+                'horarios': [timezone.localtime(h).strftime('%H:%M') for h in dia['horarios']],
+                'lotado': dia['lotado'],
+            }
+            for dia in resultado
+        ]
+    })
+
+
+
 def listas_servicos(request):
     """Exibe a lista de motos, serviços e agendamentos"""
     try:
@@ -362,7 +362,7 @@ def agendamentos_cliente(request):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         # Buscar apenas agendamentos ativos (não concluídos nem cancelados)
         agendamentos = Agendamento.objects.filter(
             cliente=cliente
@@ -393,7 +393,7 @@ def cancelar_agendamento_cliente(request, agendamento_id):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         agendamento = get_object_or_404(Agendamento, id=agendamento_id, cliente=cliente)
         
         # Verificar se o agendamento pode ser cancelado
@@ -405,9 +405,11 @@ def cancelar_agendamento_cliente(request, agendamento_id):
             messages.warning(request, 'Este agendamento já está cancelado.')
             return redirect('agendamentos-cliente')
         
-        # Cancelar o agendamento
-        agendamento.status = 'cancelado'
-        agendamento.save()
+        # Cancelar o agendamento e enfileirar o aviso na mesma transação
+        with transaction.atomic():
+            agendamento.status = 'cancelado'
+            agendamento.save()
+            caixa_saida.enfileirar('cancelamento', agendamento)
         
         messages.success(request, f'Agendamento #{agendamento.id} cancelado com sucesso!')
         return redirect('agendamentos-cliente')
@@ -428,7 +430,7 @@ def remarcar_agendamento_cliente(request, agendamento_id):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         agendamento = get_object_or_404(Agendamento, id=agendamento_id, cliente=cliente)
         
         # Verificar se o agendamento pode ser remarcado
@@ -455,36 +457,40 @@ def remarcar_agendamento_cliente(request, agendamento_id):
                 messages.error(request, 'Todos os campos são obrigatórios!')
                 return redirect('remarcar-agendamento-cliente', agendamento_id=agendamento_id)
             
-            # Atualizar ou criar moto
-            moto, _ = Moto.objects.get_or_create(
-                marca=marca,
-                modelo=modelo,
-                ano=int(ano)
-            )
+            # Moto do cliente com esses dados; só cria se ele não a tiver
+            moto = resolver_moto(cliente, marca, modelo, ano, request.POST.get('placa'))
             
-            # Atualizar ou criar serviço
-            servico, _ = Servicos.objects.get_or_create(
-                nome=nome_servico,
-                defaults={'descricao': descricao}
-            )
+            # Serviço do catálogo com esse nome; só cria se não houver
+            servico = servico_por_nome(nome_servico, descricao)
             
             # Converter data e hora
             data_hora_str = f"{data} {hora}"
             data_hora = datetime.strptime(data_hora_str, '%Y-%m-%d %H:%M')
             data_hora = timezone.make_aware(data_hora)
             
-            # Atualizar agendamento
-            agendamento.moto = moto
-            agendamento.servico = servico
-            agendamento.data_hora = data_hora
-            agendamento.descricao_problema = descricao
-            
-            # Se estava em andamento, voltar para agendado
-            if agendamento.status == 'em_andamento':
-                agendamento.status = 'agendado'
-                agendamento.mecanico = None
+            # Novo horário precisa respeitar as regras de agendamento
+            if data_hora != agendamento.data_hora:
+                reserva = reservar_horario(data_hora, ignorar_id=agendamento.id)
+            else:
+                reserva = nullcontext()
             
-            agendamento.save()
+            try:
+                with reserva:
+                    # Atualizar agendamento
+                    agendamento.moto = moto
+                    agendamento.servico = servico
+                    agendamento.data_hora = data_hora
+                    agendamento.descricao_problema = descricao
+                    
+                    # Se estava em andamento, voltar para agendado
+                    if agendamento.status == 'em_andamento':
+                        agendamento.status = 'agendado'
+                        agendamento.mecanico = None
+                    
+                    agendamento.save()
+            except HorarioIndisponivel as e:
+                messages.error(request, str(e))
+                return redirect('remarcar-agendamento-cliente', agendamento_id=agendamento_id)
             
             messages.success(request, f'Agendamento #{agendamento.id} remarcado com sucesso!')
             return redirect('agendamentos-cliente')
@@ -505,49 +511,66 @@ def remarcar_agendamento_cliente(request, agendamento_id):
 
 
 
-def historico_cliente(request):
-    """Mostra histórico completo de serviços do cliente"""
-    if not request.user.is_authenticated:
+async def historico_cliente(request):
+    """
+    Mostra histórico completo de serviços do cliente
+
+    Assíncrona: os totais e a página são consultados juntos (ver Views/assincrono.py)
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
         messages.error(request, 'Você precisa estar logado.')
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
-        
-        # Buscar agendamentos concluídos e cancelados
-        agendamentos_concluidos = Agendamento.objects.filter(
-            cliente=cliente, 
-            status='concluido'
-        ).select_related('moto', 'servico', 'mecanico__usuario').order_by('-data_hora')
-        
-        agendamentos_cancelados = Agendamento.objects.filter(
-            cliente=cliente, 
-            status='cancelado'
-        ).select_related('moto', 'servico', 'mecanico__usuario').order_by('-data_hora')
+        _, cliente = await aperfil_da_requisicao(request, carregar='cliente')
+        if cliente is None:
+            messages.error(request, 'Perfil de cliente não encontrado.')
+            return redirect('dashboard-cliente')
         
-        # Combinar todos os agendamentos (concluídos e cancelados)
-        todos_agendamentos = list(agendamentos_concluidos) + list(agendamentos_cancelados)
-        todos_agendamentos.sort(key=lambda x: x.data_hora, reverse=True)
+        # Concluídos e cancelados em uma única query, ordenada e paginada no banco
+        historico = Agendamento.objects.filter(
+            cliente=cliente,
+            status__in=['concluido', 'cancelado']
+        )
+        # Agendamentos antigos já movidos para o arquivo entram na mesma página e nos totais
+        arquivo = AgendamentoArquivado.objects.filter(cliente_id=cliente.pk)
         
-        # Estatísticas
-        total_servicos = agendamentos_concluidos.count()
-        total_cancelados = agendamentos_cancelados.count()
-        total_gasto = sum([a.valor_servico for a in agendamentos_concluidos if a.valor_servico]) or 0
+        status_filter = request.GET.get('status', '')
+        if status_filter in ('concluido', 'cancelado'):
+            filtrado, arquivo_filtrado = historico.filter(status=status_filter), arquivo.filter(status=status_filter)
+        else:
+            status_filter = ''
+            filtrado, arquivo_filtrado = historico, arquivo
+        
+        por_pagina = ler_por_pagina(request.GET.get('por_pagina'))
+        # Estatísticas (totais e gasto por moto) agregadas no banco, junto com a página
+        resumo, pagina = await asyncio.gather(
+            sync_to_async(resumo_historico)(historico, arquivo=arquivo),
+            sync_to_async(paginar_por_data)(
+                filtrado.select_related('moto', 'servico', 'mecanico__usuario'),
+                cursor=request.GET.get('cursor'),
+                por_pagina=por_pagina,
+                anterior=request.GET.get('direcao') == 'anterior',
+                arquivo=arquivo_filtrado,
+            ),
+        )
+        filtros = {'status': status_filter} if status_filter else {}
         
         context = {
-            'agendamentos_concluidos': agendamentos_concluidos,
-            'agendamentos_cancelados': agendamentos_cancelados,
-            'todos_agendamentos': todos_agendamentos,
-            'total_servicos': total_servicos,
-            'total_cancelados': total_cancelados,
-            'total_gasto': total_gasto,
+            'todos_agendamentos': pagina,
+            'pagina': pagina,
+            'status_filter': status_filter,
+            'filtros_query': urlencode({**filtros, 'por_pagina': por_pagina}),
+            'total_historico': resumo['total'],
+            'total_servicos': resumo['total_servicos'],
+            'total_cancelados': resumo['total_cancelados'],
+            'total_gasto': resumo['total_gasto'],
+            'gasto_por_moto': resumo['por_moto'],
             'cliente': cliente
         }
-        return render(request, 'Cliente/historico-cliente.html', context)
+        return await arender(request, 'Cliente/historico-cliente.html', context)
         
-    except Cliente.DoesNotExist:
-        messages.error(request, 'Perfil de cliente não encontrado.')
-        return redirect('dashboard-cliente')
     except Exception as e:
         messages.error(request, f'Erro ao carregar histórico: {e}')
         return redirect('dashboard-cliente')
@@ -560,7 +583,7 @@ def minhas_motos(request):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         motos = Moto.objects.filter(cliente=cliente).order_by('-id')
         
         context = {
@@ -577,6 +600,10 @@ def minhas_motos(request):
         return redirect('dashboard-cliente')
 
 
+# Restrições únicas de Moto (motos.py)
+MOTO_REPETIDA = 'Você já tem uma moto com essa placa (ou, sem placa, com a mesma marca, modelo e ano).'
+
+
 def cadastrar_moto(request):
     """Cadastra uma nova moto para o cliente"""
     if not request.user.is_authenticated:
@@ -584,7 +611,7 @@ def cadastrar_moto(request):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         
         if request.method == 'POST':
             marca = request.POST.get('marca')
@@ -616,6 +643,9 @@ def cadastrar_moto(request):
     except Cliente.DoesNotExist:
         messages.error(request, 'Perfil de cliente não encontrado.')
         return redirect('dashboard-cliente')
+    except IntegrityError:
+        messages.error(request, MOTO_REPETIDA)
+        return redirect('cadastrar-moto')
     except Exception as e:
         messages.error(request, f'Erro ao cadastrar moto: {e}')
         return redirect('minhas-motos')
@@ -628,7 +658,7 @@ def editar_moto(request, moto_id):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         moto = get_object_or_404(Moto, id=moto_id, cliente=cliente)
         
         if request.method == 'POST':
@@ -651,6 +681,9 @@ def editar_moto(request, moto_id):
     except Cliente.DoesNotExist:
         messages.error(request, 'Perfil de cliente não encontrado.')
         return redirect('dashboard-cliente')
+    except IntegrityError:
+        messages.error(request, MOTO_REPETIDA)
+        return redirect('editar-moto', moto_id=moto_id)
     except Exception as e:
         messages.error(request, f'Erro ao editar moto: {e}')
         return redirect('minhas-motos')
@@ -663,7 +696,7 @@ def excluir_moto(request, moto_id):
         return redirect('login')
     
     try:
-        cliente = Cliente.objects.get(usuario=request.user)
+        cliente = request.perfil.cliente
         moto = get_object_or_404(Moto, id=moto_id, cliente=cliente)
         
         # Verificar se a moto tem agendamentos
@@ -2,36 +2,78 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import logout as django_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.utils import timezone
-from ..models import Mecanico, Agendamento, OrdemServico
+from decimal import Decimal, InvalidOperation
+from ..models import Mecanico, Agendamento, AgendamentoArquivado, OrdemServico
+from urllib.parse import urlencode
+from .. import fila_mecanico, transicoes
+from ..estatisticas import produtividade_mensal, resumo_historico
+from ..paginacao import ler_por_pagina, paginar_por_data
+from ..perfis import aperfil_da_requisicao
+from .assincrono import arender, listar
+from ..caches import obter_fragmento
+from django.template.loader import render_to_string
+from asgiref.sync import sync_to_async
+import asyncio
 
 
-@login_required
-def dashboard_mecanico(request):
-    try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
-    except Mecanico.DoesNotExist:
-        messages.error(request, 'Perfil de mecânico não encontrado.')
-        return redirect('login')
-    
+def _pendentes():
     # Agendamentos pendentes (status 'agendado') disponíveis para pegar
-    agendamentos_pendentes = Agendamento.objects.filter(
+    return Agendamento.objects.filter(
         status='agendado'
     ).select_related('cliente', 'servico', 'moto').order_by('data_hora')
 
+
+def _tabela_pendentes():
+    html = render_to_string('Mecanico/components/tabela-pendentes.html', {'agendamentos_pendentes': _pendentes()})
+    return html, {}
+
+
+def tabela_pendentes():
+    """
+    Tabela de agendamentos pendentes
+
+    É a mesma para todos os mecânicos, então fica em cache até um agendamento,
+    cliente, moto ou serviço mudar. Chamar depois de ler o ultimo_evento da
+    fila: os sinais trocam a geração antes de publicar o evento.
+    """
+    html, _ = obter_fragmento(
+        'fila_pendentes', ['agendamentos', 'clientes', 'motos', 'servicos'], _tabela_pendentes,
+    )
+    return html
+
+
+@login_required
+async def dashboard_mecanico(request):
+    """Assíncrona: a fila de pendentes (cache) e a do mecânico são buscadas juntas (ver Views/assincrono.py)"""
+    _, mecanico = await aperfil_da_requisicao(request, carregar='mecanico')
+    if mecanico is None:
+        messages.error(request, 'Perfil de mecânico não encontrado.')
+        return redirect('login')
+    
+    # Lido antes das consultas: o stream reenvia o que mudar depois dele
+    ultimo_evento = fila_mecanico.fila().ultimo_id
+    
     # Agendamentos que o mecânico pegou e estão em andamento
     meus_agendamentos = Agendamento.objects.filter(
         mecanico=mecanico,
         status='em_andamento'
     ).select_related('cliente', 'servico', 'moto').order_by('data_hora')
 
+    pendentes, meus_agendamentos = await asyncio.gather(
+        sync_to_async(tabela_pendentes)(), listar(meus_agendamentos),
+    )
+
     context = {
         'mecanico': mecanico,
-        'agendamentos_pendentes': agendamentos_pendentes,
-        'meus_agendamentos': meus_agendamentos
+        'tabela_pendentes': pendentes,
+        'meus_agendamentos': meus_agendamentos,
+        'ultimo_evento': ultimo_evento,
+        'fila_ao_vivo': fila_mecanico.ao_vivo(request),
     }
 
-    return render(request, 'Mecanico/dashbord-mecanico.html', context)
+    return await arender(request, 'Mecanico/dashbord-mecanico.html', context)
 
 
 @login_required
@@ -40,23 +82,18 @@ def pegar_agendamento(request, agendamento_id):
     Permite que o mecânico pegue um agendamento pendente e mude o status para 'em andamento'
     """
     try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
+        mecanico = request.perfil.mecanico
     except Mecanico.DoesNotExist:
         messages.error(request, 'Perfil de mecânico não encontrado.')
         return redirect('login')
     
-    agendamento = get_object_or_404(Agendamento, id=agendamento_id)
-    
-    # Verificar se o agendamento está disponível
-    if agendamento.status != 'agendado':
+    # UPDATE condicional: só um mecânico consegue pegar, mesmo com cliques simultâneos
+    if not transicoes.pegar_agendamento(agendamento_id, mecanico):
+        get_object_or_404(Agendamento, id=agendamento_id)
         messages.warning(request, 'Este agendamento não está mais disponível.')
         return redirect('dashboard-mecanico')
     
-    # Atribuir o mecânico e mudar o status
-    agendamento.mecanico = mecanico
-    agendamento.status = 'em_andamento'
-    agendamento.save()
-    
+    agendamento = Agendamento.objects.select_related('cliente').get(id=agendamento_id)
     messages.success(request, f'Agendamento pegado com sucesso! Cliente: {agendamento.cliente.nome_completo}')
     return redirect('dashboard-mecanico')
 
@@ -67,79 +104,109 @@ def ver_servicos_pendentes(request):
     Exibe uma página dedicada apenas aos serviços pendentes
     """
     try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
+        mecanico = request.perfil.mecanico
     except Mecanico.DoesNotExist:
         messages.error(request, 'Perfil de mecânico não encontrado.')
         return redirect('login')
     
-    agendamentos_pendentes = Agendamento.objects.filter(
-        status='agendado'
-    ).select_related('cliente', 'servico', 'moto').order_by('data_hora')
-    
+    ultimo_evento = fila_mecanico.fila().ultimo_id
     context = {
         'mecanico': mecanico,
-        'agendamentos_pendentes': agendamentos_pendentes
+        'tabela_pendentes': tabela_pendentes(),
+        'ultimo_evento': ultimo_evento,
+        'fila_ao_vivo': fila_mecanico.ao_vivo(request),
     }
     
     return render(request, 'Mecanico/ver-servicos.html', context)
 
 
+@login_required
+def fila_eventos(request):
+    """
+    Stream SSE com as mudanças da fila de agendamentos (ver fila_mecanico.py)
+
+    A view é síncrona (o perfil vem do banco), mas o corpo é um gerador
+    assíncrono: no servidor ASGI a conexão aberta não ocupa uma thread. No
+    WSGI o stream nunca começaria; a resposta é 204, com que o EventSource
+    para de reconectar, e o painel volta a ser atualizado recarregando a página.
+    """
+    try:
+        request.perfil.mecanico
+    except Mecanico.DoesNotExist:
+        return HttpResponseForbidden('Perfil de mecânico não encontrado.')
+    if not fila_mecanico.ao_vivo(request):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        # Last-Event-ID vem nas reconexões automáticas; ?ultimo= na primeira conexão da página
+        fila_mecanico.fluxo(ultimo_id=request.headers.get('Last-Event-ID') or request.GET.get('ultimo')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx: não bufferizar o stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _avisar_se_indisponivel(request, agendamento, mecanico):
+    """Mensagem de erro quando o agendamento não está em andamento com este mecânico"""
+    if agendamento.mecanico_id != mecanico.id:
+        messages.error(request, 'Este agendamento não pertence a você.')
+        return True
+    if agendamento.status != 'em_andamento':
+        messages.warning(request, 'Este agendamento não está em andamento.')
+        return True
+    return False
+
+
 @login_required
 def concluir_agendamento(request, agendamento_id):
     """
     Marca o agendamento como concluído e envia para o histórico
     """
     try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
+        mecanico = request.perfil.mecanico
     except Mecanico.DoesNotExist:
         messages.error(request, 'Perfil de mecânico não encontrado.')
         return redirect('login')
     
-    agendamento = get_object_or_404(Agendamento, id=agendamento_id)
+    # Se for GET, apenas validar o agendamento e redirecionar
+    if request.method != 'POST':
+        agendamento = get_object_or_404(Agendamento, id=agendamento_id)
+        if not _avisar_se_indisponivel(request, agendamento, mecanico):
+            messages.warning(request, 'Preencha a descrição e o valor para concluir o serviço.')
+        return redirect('dashboard-mecanico')
     
-    # Verificar se o agendamento pertence ao mecânico e está em andamento
-    if agendamento.mecanico != mecanico:
-        messages.error(request, 'Este agendamento não pertence a você.')
+    descricao_mecanico = request.POST.get('descricao_mecanico', '').strip()
+    valor_servico = request.POST.get('valor_servico', '').strip()
+    
+    # Validar campos obrigatórios
+    if not descricao_mecanico:
+        messages.error(request, 'A descrição do serviço é obrigatória!')
         return redirect('dashboard-mecanico')
     
-    if agendamento.status != 'em_andamento':
-        messages.warning(request, 'Este agendamento não está em andamento.')
+    if not valor_servico:
+        messages.error(request, 'O valor do serviço é obrigatório!')
         return redirect('dashboard-mecanico')
     
-    # Se for POST, processar o formulário
-    if request.method == 'POST':
-        descricao_mecanico = request.POST.get('descricao_mecanico', '').strip()
-        valor_servico = request.POST.get('valor_servico', '').strip()
-        
-        # Validar campos obrigatórios
-        if not descricao_mecanico:
-            messages.error(request, 'A descrição do serviço é obrigatória!')
-            return redirect('dashboard-mecanico')
-        
-        if not valor_servico:
-            messages.error(request, 'O valor do serviço é obrigatório!')
-            return redirect('dashboard-mecanico')
-        
-        try:
-            valor_servico = float(valor_servico.replace(',', '.'))
-            if valor_servico <= 0:
-                messages.error(request, 'O valor do serviço deve ser maior que zero!')
-                return redirect('dashboard-mecanico')
-        except ValueError:
-            messages.error(request, 'Valor inválido! Use apenas números.')
+    try:
+        valor_servico = Decimal(valor_servico.replace(',', '.'))
+        if not valor_servico.is_finite():
+            raise InvalidOperation
+        if valor_servico <= 0:
+            messages.error(request, 'O valor do serviço deve ser maior que zero!')
             return redirect('dashboard-mecanico')
-        
-        # Salvar descrição e valor
-        agendamento.descricao_mecanico = descricao_mecanico
-        agendamento.valor_servico = valor_servico
-        agendamento.status = 'concluido'
-        agendamento.save()
-        
-        messages.success(request, f'Serviço concluído com sucesso! Cliente: {agendamento.cliente.nome_completo} | Valor: R$ {valor_servico:.2f}')
+    except InvalidOperation:
+        messages.error(request, 'Valor inválido! Use apenas números.')
         return redirect('dashboard-mecanico')
     
-    # Se for GET, não deveria chegar aqui, redirecionar
-    messages.warning(request, 'Preencha a descrição e o valor para concluir o serviço.')
+    # UPDATE condicional: só conclui se ainda estiver em andamento com este mecânico
+    if not transicoes.concluir_agendamento(agendamento_id, mecanico, descricao_mecanico, valor_servico):
+        _avisar_se_indisponivel(request, get_object_or_404(Agendamento, id=agendamento_id), mecanico)
+        return redirect('dashboard-mecanico')
+    
+    agendamento = Agendamento.objects.select_related('cliente').get(id=agendamento_id)
+    messages.success(request, f'Serviço concluído com sucesso! Cliente: {agendamento.cliente.nome_completo} | Valor: R$ {valor_servico:.2f}')
     return redirect('dashboard-mecanico')
 
 
@@ -149,65 +216,88 @@ def cancelar_agendamento_mecanico(request, agendamento_id):
     Cancela o agendamento e devolve para pendente (remove o mecânico)
     """
     try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
+        mecanico = request.perfil.mecanico
     except Mecanico.DoesNotExist:
         messages.error(request, 'Perfil de mecânico não encontrado.')
         return redirect('login')
     
-    agendamento = get_object_or_404(Agendamento, id=agendamento_id)
-    
-    # Verificar se o agendamento pertence ao mecânico e está em andamento
-    if agendamento.mecanico != mecanico:
-        messages.error(request, 'Este agendamento não pertence a você.')
-        return redirect('dashboard-mecanico')
-    
-    if agendamento.status != 'em_andamento':
-        messages.warning(request, 'Este agendamento não está em andamento.')
+    # UPDATE condicional: só devolve se ainda estiver em andamento com este mecânico
+    if not transicoes.devolver_agendamento(agendamento_id, mecanico):
+        _avisar_se_indisponivel(request, get_object_or_404(Agendamento, id=agendamento_id), mecanico)
         return redirect('dashboard-mecanico')
     
-    # Devolver para pendente
-    agendamento.mecanico = None
-    agendamento.status = 'agendado'
-    agendamento.save()
-    
+    agendamento = Agendamento.objects.select_related('cliente').get(id=agendamento_id)
     messages.info(request, f'Agendamento devolvido para pendente. Cliente: {agendamento.cliente.nome_completo}')
     return redirect('dashboard-mecanico')
 
 
+def _historico(mecanico, status_filter, cursor, por_pagina, anterior):
+    # Concluídos e cancelados em uma única query, ordenada e paginada no banco
+    historico = Agendamento.objects.filter(
+        mecanico=mecanico,
+        status__in=['concluido', 'cancelado']
+    )
+    # Agendamentos antigos já movidos para o arquivo entram na mesma página e nos totais
+    arquivo = AgendamentoArquivado.objects.filter(mecanico_id=mecanico.pk)
+    
+    # Contadores em uma agregação e produtividade mensal agrupada no banco
+    resumo = resumo_historico(historico, por_moto=False, arquivo=arquivo)
+    produtividade = produtividade_mensal(historico, arquivo=arquivo)
+    
+    if status_filter:
+        historico = historico.filter(status=status_filter)
+        arquivo = arquivo.filter(status=status_filter)
+    
+    pagina = paginar_por_data(
+        historico.select_related('cliente', 'servico', 'moto'),
+        cursor=cursor,
+        por_pagina=por_pagina,
+        anterior=anterior,
+        arquivo=arquivo,
+    )
+    filtros = {'status': status_filter} if status_filter else {}
+    
+    context = {
+        'todos_agendamentos': pagina,
+        'pagina': pagina,
+        'status_filter': status_filter,
+        'filtros_query': urlencode({**filtros, 'por_pagina': por_pagina}),
+        'total_historico': resumo['total'],
+        'total_concluidos': resumo['total_servicos'],
+        'total_cancelados': resumo['total_cancelados'],
+        'receita_total': resumo['total_gasto'],
+        'produtividade_mensal': produtividade,
+    }
+    return render_to_string('Mecanico/components/historico.html', context), context
+
+
 @login_required
 def historico_mecanico(request):
     """
     Exibe o histórico de serviços concluídos e cancelados pelo mecânico
     """
     try:
-        mecanico = Mecanico.objects.get(usuario=request.user)
+        mecanico = request.perfil.mecanico
     except Mecanico.DoesNotExist:
         messages.error(request, 'Perfil de mecânico não encontrado.')
         return redirect('login')
     
-    # Buscar agendamentos concluídos e cancelados do mecânico
-    agendamentos_concluidos = Agendamento.objects.filter(
-        mecanico=mecanico,
-        status='concluido'
-    ).select_related('cliente', 'servico', 'moto').order_by('-data_hora')
-    
-    agendamentos_cancelados = Agendamento.objects.filter(
-        mecanico=mecanico,
-        status='cancelado'
-    ).select_related('cliente', 'servico', 'moto').order_by('-data_hora')
+    status_filter = request.GET.get('status', '')
+    if status_filter not in ('concluido', 'cancelado'):
+        status_filter = ''
+    por_pagina = ler_por_pagina(request.GET.get('por_pagina'))
+    cursor = request.GET.get('cursor')
+    anterior = request.GET.get('direcao') == 'anterior'
     
-    # Combinar todos os agendamentos e ordenar por data
-    todos_agendamentos = list(agendamentos_concluidos) + list(agendamentos_cancelados)
-    todos_agendamentos.sort(key=lambda x: x.data_hora, reverse=True)
-    
-    context = {
-        'mecanico': mecanico,
-        'agendamentos_concluidos': agendamentos_concluidos,
-        'agendamentos_cancelados': agendamentos_cancelados,
-        'todos_agendamentos': todos_agendamentos,
-        'total_concluidos': agendamentos_concluidos.count(),
-        'total_cancelados': agendamentos_cancelados.count(),
-    }
+    # Muda só quando um agendamento do mecânico (ou um cliente, moto ou serviço) muda;
+    # o mês entra na chave porque a produtividade mensal é contada até hoje
+    historico, context = obter_fragmento(
+        'historico_mecanico',
+        [f'mecanico:{mecanico.pk}', 'clientes', 'motos', 'servicos'],
+        lambda: _historico(mecanico, status_filter, cursor, por_pagina, anterior),
+        partes=[status_filter, cursor, por_pagina, anterior, timezone.localdate().strftime('%Y-%m')],
+    )
+    context = {**context, 'mecanico': mecanico, 'historico': historico}
     
     return render(request, 'Mecanico/historico-mecanico.html', context)
 
@@ -3,8 +3,9 @@ from .models import (
     Servicos, Moto, Administrador, 
     Mecanico, Cliente, Agendamento, OrdemServico,
     ConfiguracaoOficina, ConfiguracaoAgendamento, 
-    ConfiguracaoNotificacao, LogAuditoria
+    ConfiguracaoNotificacao, LogAuditoria, LembreteEnviado, EmailSaida
 )
+from .particoes import ler_periodo, modelo_particao, particoes_existentes
 
 
 @admin.register(Servicos)
@@ -97,13 +98,84 @@ class ConfiguracaoNotificacaoAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(LembreteEnviado)
+class LembreteEnviadoAdmin(admin.ModelAdmin):
+    list_display = ('agendamento', 'tipo', 'canal', 'status', 'tentativas', 'data_hora', 'enviado_em')
+    list_filter = ('tipo', 'canal', 'status')
+    list_select_related = ('agendamento__servico', 'agendamento__cliente__usuario')
+    readonly_fields = ('agendamento', 'tipo', 'canal', 'data_hora', 'status', 'tentativas', 'erro', 'criado_em', 'enviado_em')
+
+    def has_add_permission(self, request):
+        # Registrados apenas pelo agendador de lembretes
+        return False
+
+
+@admin.register(EmailSaida)
+class EmailSaidaAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'destinatario', 'assunto', 'status', 'tentativas', 'proxima_tentativa', 'enviado_em')
+    list_filter = ('tipo', 'status')
+    search_fields = ('destinatario', 'assunto')
+    readonly_fields = ('chave', 'tipo', 'agendamento', 'destinatario', 'assunto', 'corpo', 'status', 'tentativas',
+                       'proxima_tentativa', 'lote', 'erro', 'criado_em', 'atualizado_em', 'enviado_em')
+
+    def has_add_permission(self, request):
+        # Gravados apenas pela caixa de saída (caixa_saida.enfileirar)
+        return False
+
+
+class PeriodoAuditoriaFilter(admin.SimpleListFilter):
+    """Escolhe a partição mensal consultada (ver particoes.py); o padrão é o mês corrente"""
+    title = 'período'
+    parameter_name = 'periodo'
+
+    def lookups(self, request, model_admin):
+        return [(f'{ano:04d}-{mes:02d}', f'{mes:02d}/{ano:04d}') for ano, mes in particoes_existentes()]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Mês atual',
+        }
+        for valor, titulo in self.lookup_choices:
+            yield {
+                'selected': self.value() == valor,
+                'query_string': changelist.get_query_string({self.parameter_name: valor}),
+                'display': titulo,
+            }
+
+    def queryset(self, request, queryset):
+        # A troca de tabela acontece em LogAuditoriaAdmin.get_queryset
+        return queryset
+
+
 @admin.register(LogAuditoria)
 class LogAuditoriaAdmin(admin.ModelAdmin):
     list_display = ('usuario', 'acao', 'modelo', 'objeto_id', 'data_hora', 'ip_address')
     search_fields = ('usuario__username', 'acao', 'modelo', 'descricao')
-    list_filter = ('acao', 'modelo', 'data_hora')
+    list_filter = (PeriodoAuditoriaFilter, 'acao', 'modelo', 'data_hora')
+    list_select_related = ('usuario',)
     date_hierarchy = 'data_hora'
     readonly_fields = ('usuario', 'acao', 'modelo', 'objeto_id', 'descricao', 'data_hora', 'ip_address')
+    # O total sem filtros seria um COUNT(*) a mais por página
+    show_full_result_count = False
+
+    def _periodo(self, request):
+        periodo = ler_periodo(request.GET.get(PeriodoAuditoriaFilter.parameter_name))
+        return periodo if periodo in particoes_existentes() else None
+
+    def get_queryset(self, request):
+        # Só a partição do período escolhido é consultada, nunca o histórico inteiro
+        periodo = self._periodo(request)
+        if periodo is None:
+            return super().get_queryset(request)
+        return modelo_particao(periodo)._default_manager.all()
+
+    def get_list_display_links(self, request, list_display):
+        # As páginas de detalhe são da tabela do mês corrente
+        if self._periodo(request) is not None:
+            return None
+        return super().get_list_display_links(request, list_display)
     
     def has_add_permission(self, request):
         # Impede criação manual de logs
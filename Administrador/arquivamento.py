@@ -0,0 +1,94 @@
+"""
+Arquivamento de agendamentos antigos (cold storage)
+
+Agendamentos concluídos ou cancelados com mais de DIAS_PARA_ARQUIVAR dias
+saem da tabela quente e vão para AgendamentoArquivado, junto com a ordem de
+serviço. O arquivo só recebe inserções (append-only), é particionado pela
+coluna mes e guarda as descrições compactadas com zlib.
+
+O arquivamento roda como uma TarefaLimpeza do tipo 'arquivamento' (mesmos
+lotes curtos e retomada de limpeza.py); `python manage.py
+arquivar_agendamentos` permite agendá-lo no cron. Os históricos do cliente e
+do mecânico continuam paginando pelo arquivo (paginar_por_data com arquivo=).
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Agendamento, AgendamentoArquivado, OrdemServico
+
+
+DIAS_PARA_ARQUIVAR = 180
+STATUS_ARQUIVAVEIS = ['concluido', 'cancelado']
+
+
+def agendamentos_arquivaveis(data_limite):
+    return Agendamento.objects.filter(status__in=STATUS_ARQUIVAVEIS, data_hora__lt=data_limite)
+
+
+def data_limite_padrao():
+    return timezone.now() - timedelta(days=DIAS_PARA_ARQUIVAR)
+
+
+def _ordem_servico(agendamento):
+    try:
+        ordem = agendamento.ordemservico
+    except OrdemServico.DoesNotExist:
+        return None
+    return {
+        'id': ordem.id,
+        'descricao_cliente': ordem.descricao_cliente,
+        'descricao_servico': ordem.descricao_servico,
+        'custo': str(ordem.custo),
+        'data_conclusao': ordem.data_conclusao.isoformat() if ordem.data_conclusao else None,
+        'observacoes': ordem.observacoes,
+        'status': ordem.status,
+    }
+
+
+def compactar(dados):
+    return zlib.compress(json.dumps(dados, ensure_ascii=False).encode(), 9)
+
+
+def _arquivado(agendamento):
+    data_local = timezone.localtime(agendamento.data_hora).date()
+    mecanico = agendamento.mecanico
+    return AgendamentoArquivado(
+        id=agendamento.id,
+        mes=data_local.replace(day=1),
+        data_hora=agendamento.data_hora,
+        status=agendamento.status,
+        valor_servico=agendamento.valor_servico,
+        cliente_id=agendamento.cliente_id,
+        cliente_nome=agendamento.cliente.nome_completo,
+        mecanico_id=agendamento.mecanico_id,
+        mecanico_nome=mecanico.nome_completo if mecanico else '',
+        moto_id=agendamento.moto_id,
+        moto_marca=agendamento.moto.marca,
+        moto_modelo=agendamento.moto.modelo,
+        moto_ano=agendamento.moto.ano,
+        moto_placa=agendamento.moto.placa or '',
+        servico_nome=agendamento.servico.nome,
+        conteudo=compactar({
+            'descricao_problema': agendamento.descricao_problema,
+            'descricao_mecanico': agendamento.descricao_mecanico,
+            'ordem_servico': _ordem_servico(agendamento),
+        }),
+    )
+
+
+def arquivar_lote(ids):
+    """
+    Copia os agendamentos (e ordens de serviço) para o arquivo e os remove da
+    tabela quente. Deve rodar dentro da transação do lote.
+    """
+    agendamentos = Agendamento.objects.filter(pk__in=ids).select_related(
+        'cliente', 'mecanico', 'moto', 'servico', 'ordemservico',
+    )
+    # ignore_conflicts: um lote refeito depois de uma falha não duplica linhas
+    AgendamentoArquivado.objects.bulk_create(
+        [_arquivado(agendamento) for agendamento in agendamentos], ignore_conflicts=True,
+    )
+    Agendamento.objects.filter(pk__in=ids).delete()
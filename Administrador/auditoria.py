@@ -0,0 +1,234 @@
+"""
+Auditoria com gravação em lote (LogAuditoria)
+
+Um INSERT por ação dobraria as escritas no SQLite, então os eventos vão para
+uma fila em memória e uma thread do processo os grava com bulk_create quando
+a fila junta AUDITORIA_TAMANHO_LOTE eventos ou quando o evento mais antigo
+espera AUDITORIA_INTERVALO segundos.
+
+A fila é limitada (AUDITORIA_FILA_MAX). Cheia, quem registra espera até
+AUDITORIA_ESPERA_MAX segundos pela thread (backpressure); se ainda assim não
+houver espaço, o evento é descartado e contado em `descartados`, para que a
+auditoria nunca trave uma requisição por tempo indeterminado. Ao encerrar o
+processo (atexit), a thread grava o que ainda estiver na fila.
+
+Os eventos vêm do AuditoriaMiddleware (requisições que alteram dados) e dos
+sinais de Agendamento, Cliente, Mecanico e OrdemServico (signals.py). O
+usuário e o IP são os da requisição corrente; sem usuário autenticado não há
+registro, pois LogAuditoria.usuario é obrigatório.
+
+Com AUDITORIA_EM_SEGUNDO_PLANO = False (testes) não há thread: o middleware
+grava os eventos da requisição em um único bulk_create ao final dela.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import LogAuditoria
+
+
+logger = logging.getLogger(__name__)
+
+TENTATIVAS_GRAVACAO = 3
+
+# Requisição corrente, definida pelo AuditoriaMiddleware
+_requisicao = contextvars.ContextVar('auditoria_requisicao', default=None)
+
+_PARAR = object()
+
+
+def _config(nome, padrao):
+    return getattr(settings, f'AUDITORIA_{nome}', padrao)
+
+
+class GravadorAuditoria:
+    """Fila limitada de LogAuditoria não salvos e a thread que os grava em lote"""
+
+    def __init__(self, tamanho_lote, intervalo, fila_max, espera_max):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self.fila = queue.Queue(maxsize=fila_max)
+        self.descartados = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._atexit_registrado = False
+
+    def enfileirar(self, evento, em_segundo_plano=True):
+        if em_segundo_plano:
+            self._iniciar()
+        try:
+            self.fila.put(evento, timeout=self.espera_max)
+        except queue.Full:
+            self.descartados += 1
+            logger.warning('Fila de auditoria cheia; evento descartado (%s %s)', evento.acao, evento.modelo)
+
+    def _iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='auditoria', daemon=True)
+                self._thread.start()
+                if not self._atexit_registrado:
+                    atexit.register(self.parar)
+                    self._atexit_registrado = True
+
+    def _coletar(self):
+        """Espera o primeiro evento e junta outros até o tamanho do lote ou o fim do intervalo"""
+        try:
+            primeiro = self.fila.get(timeout=self.intervalo)
+        except queue.Empty:
+            return [], False
+        if primeiro is _PARAR:
+            return [], True
+
+        lote = [primeiro]
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                evento = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if evento is _PARAR:
+                return lote, True
+            lote.append(evento)
+        return lote, False
+
+    def _executar(self):
+        try:
+            parando = False
+            while not parando:
+                lote, parando = self._coletar()
+                gravar(lote)
+            # O que chegou depois do pedido de parada
+            self.despejar()
+        finally:
+            connection.close()
+
+    def despejar(self):
+        """Grava agora, na thread de quem chamou, tudo o que está na fila"""
+        lote = []
+        while True:
+            try:
+                evento = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if evento is not _PARAR:
+                lote.append(evento)
+        for inicio in range(0, len(lote), self.tamanho_lote):
+            gravar(lote[inicio:inicio + self.tamanho_lote])
+
+    def parar(self, timeout=10):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self.fila.put(_PARAR, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+
+def gravar(lote):
+    """bulk_create de um lote, ignorando eventos de usuários que já foram excluídos"""
+    if not lote:
+        return
+    existentes = set(
+        User.objects.filter(pk__in={evento.usuario_id for evento in lote}).values_list('pk', flat=True)
+    )
+    lote = [evento for evento in lote if evento.usuario_id in existentes]
+    for tentativa in range(1, TENTATIVAS_GRAVACAO + 1):
+        try:
+            LogAuditoria.objects.bulk_create(lote)
+            return
+        except DatabaseError:
+            # "database is locked" no SQLite é passageiro: tenta de novo com uma pausa crescente
+            if tentativa == TENTATIVAS_GRAVACAO:
+                logger.exception('Falha ao gravar %d eventos de auditoria', len(lote))
+            else:
+                time.sleep(0.1 * tentativa)
+
+
+_gravador = None
+_gravador_lock = threading.Lock()
+
+
+def gravador():
+    global _gravador
+    if _gravador is None:
+        with _gravador_lock:
+            if _gravador is None:
+                _gravador = GravadorAuditoria(
+                    tamanho_lote=_config('TAMANHO_LOTE', 200),
+                    intervalo=_config('INTERVALO', 2.0),
+                    fila_max=_config('FILA_MAX', 10000),
+                    espera_max=_config('ESPERA_MAX', 0.5),
+                )
+    return _gravador
+
+
+def em_segundo_plano():
+    return _config('EM_SEGUNDO_PLANO', True)
+
+
+def _ip(request):
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def registrar(acao, modelo, objeto_id, descricao='', usuario=None, ip=None):
+    """
+    Enfileira um evento de auditoria (não toca o banco na hora)
+
+    Sem `usuario`, usa o da requisição corrente; sem nenhum dos dois o evento
+    é ignorado.
+    """
+    request = _requisicao.get()
+    if usuario is None and request is not None and request.user.is_authenticated:
+        usuario = request.user
+        ip = ip or _ip(request)
+    if usuario is None:
+        return
+
+    evento = LogAuditoria(
+        usuario_id=usuario.pk,
+        acao=acao,
+        modelo=modelo,
+        objeto_id=objeto_id or 0,
+        descricao=descricao,
+        data_hora=timezone.now(),
+        ip_address=ip,
+    )
+    assincrono = em_segundo_plano()
+    gravador().enfileirar(evento, em_segundo_plano=assincrono)
+    if not assincrono and request is None:
+        gravador().despejar()
+
+
+def iniciar_requisicao(request):
+    return _requisicao.set(request)
+
+
+def encerrar_requisicao(token):
+    _requisicao.reset(token)
+    if not em_segundo_plano():
+        gravador().despejar()
+
+
+async def aencerrar_requisicao(token):
+    # O reset precisa acontecer no contexto em que o token foi criado, fora do sync_to_async
+    _requisicao.reset(token)
+    if not em_segundo_plano():
+        await sync_to_async(gravador().despejar)()
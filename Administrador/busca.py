@@ -0,0 +1,227 @@
+"""
+Busca: autocompletar de clientes e mecânicos e busca textual de agendamentos
+
+Os formulários de agendamento não listam mais todos os clientes e mecânicos:
+o campo consulta /autocompletar/<tipo>/?q= e recebe no máximo LIMITE_MAXIMO
+opções.
+
+No SQLite cada tipo tem uma tabela FTS5 com o tokenizador trigram
+(Administrador_cliente_busca e Administrador_mecanico_busca, criadas na
+migração 0009), com rowid igual ao id do modelo. O MATCH acha qualquer trecho
+de MIN_CARACTERES ou mais do nome, CPF, e-mail ou username pelo índice, sem
+varrer a tabela e sem diferenciar maiúsculas. Os resultados que começam com
+o termo vêm primeiro.
+
+Os sinais (signals.py) regravam a linha a cada gravação de Cliente, Mecanico
+ou User, na mesma transação. `python manage.py reindexar_busca` reconstrói os
+índices depois de cargas feitas por fora do ORM.
+
+Em outros bancos não há tabela: a busca usa icontains, com o mesmo limite.
+
+A busca textual (AGENDAMENTOS, endpoint /busca/) acha "aquela Honda com
+barulho no freio de março": um documento por agendamento com o cliente, a
+moto (marca, modelo, placa), o serviço, as descrições do cliente e do
+mecânico e a descrição e as observações da ordem de serviço. No SQLite é uma
+tabela FTS5 com o tokenizador unicode61 sem acentos (migração 0010), com
+prefixo em cada palavra e ordenada por bm25 com peso maior para moto e
+cliente. No PostgreSQL a mesma chamada usa SearchVector/SearchRank com a
+configuração 'portuguese'; nos demais bancos, icontains por palavra. Os
+sinais mantêm o documento a cada gravação do agendamento, da ordem, do
+cliente, da moto ou do serviço e a cada transição de status.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Agendamento, Cliente, Mecanico
+
+
+MIN_CARACTERES = 3  # o trigram não indexa trechos menores
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 20
+
+
+class IndiceBusca:
+    """Tabela FTS5 com colunas copiadas de um modelo (coluna -> caminho no ORM)"""
+
+    def __init__(self, modelo, campos, ordem):
+        self.modelo = modelo
+        self.campos = campos
+        self.ordem = ordem
+        self.tabela = f'{modelo._meta.db_table}_busca'
+
+    @property
+    def disponivel(self):
+        return connection.vendor == 'sqlite'
+
+    def _nome(self, nome):
+        return connection.ops.quote_name(nome)
+
+    def _inserir(self, cursor, objetos):
+        # INSERT ... SELECT: as linhas não passam pelo Python
+        select, params = objetos.order_by().values_list('pk', *self.campos.values()).query.sql_with_params()
+        colunas = ', '.join(['rowid', *map(self._nome, self.campos)])
+        cursor.execute(f'INSERT INTO {self._nome(self.tabela)} ({colunas}) {select}', params)
+
+    def atualizar(self, **filtro):
+        """Regrava as linhas dos objetos do filtro (ex.: pk=7 ou usuario_id=3)"""
+        if not self.disponivel:
+            return
+        objetos = self.modelo.objects.filter(**filtro)
+        ids, params = objetos.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._nome(self.tabela)} WHERE rowid IN ({ids})', params)
+            self._inserir(cursor, objetos)
+
+    def remover(self, pk):
+        if not self.disponivel:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._nome(self.tabela)} WHERE rowid = %s', [pk])
+
+    def reconstruir(self):
+        """Apaga e preenche o índice inteiro; retorna o número de linhas"""
+        if not self.disponivel:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._nome(self.tabela)}')
+            self._inserir(cursor, self.modelo.objects.all())
+            return cursor.rowcount
+
+    def buscar(self, termo, limite=LIMITE_PADRAO):
+        """Ids dos objetos com o termo em alguma coluna, os que começam com ele primeiro"""
+        termo = ' '.join(termo.split())
+        if len(termo) < MIN_CARACTERES:
+            return []
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+
+        if not self.disponivel:
+            filtro = Q()
+            for caminho in self.campos.values():
+                filtro |= Q(**{f'{caminho}__icontains': termo})
+            return list(
+                self.modelo.objects.filter(filtro).order_by(*self.ordem).values_list('pk', flat=True)[:limite]
+            )
+
+        # O termo vira uma frase FTS5: aspas internas dobradas, sem operadores
+        frase = '"{}"'.format(termo.replace('"', '""'))
+        prefixo = termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        comeca = ' OR '.join(f"{self._nome(coluna)} LIKE %s ESCAPE '\\'" for coluna in self.campos)
+        tabela = self._nome(self.tabela)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {tabela} WHERE {tabela} MATCH %s ORDER BY ({comeca}) DESC, rank LIMIT %s',
+                [frase, *[prefixo] * len(self.campos), limite],
+            )
+            return [linha[0] for linha in cursor.fetchall()]
+
+
+class IndiceTextual(IndiceBusca):
+    """Tabela FTS5 com ranking; pesos na ordem das colunas (bm25: maior pesa mais)"""
+
+    def __init__(self, modelo, campos, ordem, pesos):
+        super().__init__(modelo, campos, ordem)
+        self.pesos = pesos
+
+    def buscar(self, termo, limite=LIMITE_PADRAO, filtro=None):
+        """Ids por relevância; filtro (Q) restringe os objetos, ex.: por data"""
+        palavras = re.findall(r'\w+', termo)
+        if not palavras:
+            return []
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+        objetos = self.modelo.objects.filter(filtro or Q())
+
+        if connection.vendor == 'postgresql':
+            return self._buscar_postgres(objetos, termo, limite)
+        if not self.disponivel:
+            for palavra in palavras:
+                objetos = objetos.filter(
+                    Q(*[Q(**{f'{caminho}__icontains': palavra}) for caminho in self.campos.values()], _connector=Q.OR)
+                )
+            return list(objetos.order_by(*self.ordem).values_list('pk', flat=True)[:limite])
+
+        # Cada palavra como prefixo ("frei" acha "freio"); todas precisam aparecer
+        consulta = ' '.join('"{}"*'.format(palavra) for palavra in palavras)
+        tabela = self._nome(self.tabela)
+        restricao, params = '', []
+        if filtro:
+            ids, params = objetos.order_by().values('pk').query.sql_with_params()
+            restricao = f' AND rowid IN ({ids})'
+        pesos = ', '.join(str(peso) for peso in self.pesos)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {tabela} WHERE {tabela} MATCH %s{restricao} '
+                f'ORDER BY bm25({tabela}, {pesos}) LIMIT %s',
+                [consulta, *params, limite],
+            )
+            return [linha[0] for linha in cursor.fetchall()]
+
+    def _buscar_postgres(self, objetos, termo, limite):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # Pesos A-D do PostgreSQL na mesma ordem de importância do bm25
+        letras = {peso: letra for peso, letra in zip(sorted(set(self.pesos), reverse=True), 'ABCD')}
+        vetores = [
+            SearchVector(caminho, weight=letras.get(peso, 'D'), config='portuguese')
+            for caminho, peso in zip(self.campos.values(), self.pesos)
+        ]
+        vetor = vetores[0]
+        for outro in vetores[1:]:
+            vetor = vetor + outro
+        consulta = SearchQuery(termo, config='portuguese', search_type='websearch')
+        return list(
+            objetos.annotate(documento=vetor, relevancia=SearchRank(vetor, consulta))
+            .filter(documento=consulta).order_by('-relevancia').values_list('pk', flat=True)[:limite]
+        )
+
+
+INDICES = {
+    'clientes': IndiceBusca(Cliente, {
+        'nome_completo': 'nome_completo',
+        'cpf': 'cpf',
+        'email': 'email',
+        'username': 'usuario__username',
+    }, ordem=['nome_completo']),
+    'mecanicos': IndiceBusca(Mecanico, {
+        'nome_completo': 'nome_completo',
+        'email': 'usuario__email',
+        'username': 'usuario__username',
+    }, ordem=['nome_completo']),
+}
+
+AGENDAMENTOS = IndiceTextual(Agendamento, {
+    'cliente': 'cliente__nome_completo',
+    'marca': 'moto__marca',
+    'modelo': 'moto__modelo',
+    'placa': 'moto__placa',
+    'servico': 'servico__nome',
+    'problema': 'descricao_problema',
+    'mecanico': 'descricao_mecanico',
+    'ordem': 'ordemservico__descricao_servico',
+    'observacoes': 'ordemservico__observacoes',
+}, ordem=['-data_hora'], pesos=[3, 4, 4, 5, 2, 1, 1, 1, 1])
+
+
+def indice_de(modelo):
+    return next(indice for indice in INDICES.values() if indice.modelo is modelo)
+
+
+def buscar_agendamentos(termo, limite=LIMITE_PADRAO, inicio=None, fim=None):
+    """Agendamentos por relevância, opcionalmente entre as datas inicio e fim (inclusive)"""
+    filtro = Q()
+    if inicio:
+        filtro &= Q(data_hora__date__gte=inicio)
+    if fim:
+        filtro &= Q(data_hora__date__lte=fim)
+    ids = AGENDAMENTOS.buscar(termo, limite, filtro=filtro)
+    encontrados = Agendamento.objects.select_related('cliente', 'moto', 'servico').in_bulk(ids)
+    return [encontrados[pk] for pk in ids if pk in encontrados]
+
+
+def buscar(tipo, termo, limite=LIMITE_PADRAO):
+    """Objetos (com o usuário carregado) na ordem da busca; tipo é 'clientes' ou 'mecanicos'"""
+    indice = INDICES[tipo]
+    ids = indice.buscar(termo, limite)
+    encontrados = indice.modelo.objects.select_related('usuario').in_bulk(ids)
+    return [encontrados[pk] for pk in ids if pk in encontrados]
@@ -0,0 +1,210 @@
+"""
+Cache de dados lidos em quase todas as páginas (configurações da oficina, de
+agendamento e de notificação), do resumo exibido no dashboard de cada cliente, do token que
+valida o papel guardado na sessão (perfis.py), dos fragmentos de HTML dos
+dashboards e do catálogo de serviços (servicos.py)
+
+Usa o framework de cache do Django (settings.CACHES), então os workers que
+apontam para o mesmo backend compartilham os valores. A invalidação é feita
+pelos sinais em signals.py sempre que os modelos de origem mudam.
+
+Os fragmentos não são apagados: a chave de cada um leva a geração das
+entidades de que depende ('agendamentos', 'cliente:7', ...), um contador que
+os sinais incrementam. Depois de uma mudança a página procura uma chave nova
+e o fragmento antigo só expira. O catálogo de serviços usa a mesma geração
+('servicos') e ainda fica na memória de cada processo entre uma mudança e
+outra.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.safestring import mark_safe
+
+from .estatisticas import resumo_cliente
+from .models import ConfiguracaoAgendamento, ConfiguracaoNotificacao, ConfiguracaoOficina, Servicos
+
+
+CHAVE_CONFIG_OFICINA = 'oficina:configuracao'
+CHAVE_CONFIG_AGENDAMENTO = 'oficina:configuracao_agendamento'
+CHAVE_CONFIG_NOTIFICACAO = 'oficina:configuracao_notificacao'
+TEMPO_CACHE_CONFIG = 60 * 60  # 1 hora - os sinais invalidam antes disso quando há mudança
+TEMPO_CACHE_TOKEN_PERFIL = 24 * 60 * 60
+# Curto porque a lista de próximos agendamentos depende da hora atual
+TEMPO_CACHE_RESUMO_CLIENTE = 5 * 60
+TEMPO_CACHE_FRAGMENTO = 60 * 60
+TEMPO_CACHE_CATALOGO = 24 * 60 * 60  # a geração troca a chave quando um serviço muda
+
+
+def configuracao_padrao():
+    """Configuração exibida enquanto o administrador não salvar uma (não é gravada no banco)"""
+    return ConfiguracaoOficina(
+        nome_oficina="MotoService",
+        endereco="Endereço não configurado",
+        telefone="(00) 0000-0000",
+        email="contato@oficina.com",
+        cnpj="00.000.000/0000-00",
+        dias_funcionamento="Segunda a Sexta",
+    )
+
+
+def obter_configuracao_oficina():
+    """Retorna a configuração da oficina, consultando o banco só quando o cache expira"""
+    config = cache.get(CHAVE_CONFIG_OFICINA)
+    if config is None:
+        config = ConfiguracaoOficina.objects.first() or configuracao_padrao()
+        cache.set(CHAVE_CONFIG_OFICINA, config, TEMPO_CACHE_CONFIG)
+    return config
+
+
+def invalidar_configuracao_oficina():
+    cache.delete(CHAVE_CONFIG_OFICINA)
+
+
+def obter_configuracao_agendamento():
+    """Regras de agendamento; sem registro salvo valem os padrões do modelo"""
+    config = cache.get(CHAVE_CONFIG_AGENDAMENTO)
+    if config is None:
+        config = ConfiguracaoAgendamento.objects.order_by('pk').first() or ConfiguracaoAgendamento()
+        cache.set(CHAVE_CONFIG_AGENDAMENTO, config, TEMPO_CACHE_CONFIG)
+    return config
+
+
+def invalidar_configuracao_agendamento():
+    cache.delete(CHAVE_CONFIG_AGENDAMENTO)
+
+
+def obter_configuracao_notificacao():
+    """Quais e-mails e lembretes estão ativos; sem registro salvo valem os padrões do modelo"""
+    config = cache.get(CHAVE_CONFIG_NOTIFICACAO)
+    if config is None:
+        config = ConfiguracaoNotificacao.objects.order_by('pk').first() or ConfiguracaoNotificacao()
+        cache.set(CHAVE_CONFIG_NOTIFICACAO, config, TEMPO_CACHE_CONFIG)
+    return config
+
+
+def invalidar_configuracao_notificacao():
+    cache.delete(CHAVE_CONFIG_NOTIFICACAO)
+
+
+def chave_resumo_cliente(cliente_id):
+    return f'oficina:cliente:{cliente_id}:resumo'
+
+
+def obter_resumo_cliente(cliente):
+    """Resumo do dashboard do cliente (estatisticas.resumo_cliente) guardado por cliente"""
+    chave = chave_resumo_cliente(cliente.pk)
+    resumo = cache.get(chave)
+    if resumo is None:
+        resumo = resumo_cliente(cliente)
+        cache.set(chave, resumo, TEMPO_CACHE_RESUMO_CLIENTE)
+    return resumo
+
+
+def invalidar_resumo_cliente(cliente_id):
+    cache.delete(chave_resumo_cliente(cliente_id))
+
+
+def chave_token_perfil(usuario_id):
+    return f'oficina:usuario:{usuario_id}:perfil'
+
+
+def token_perfil(usuario_id):
+    """
+    Token aleatório do papel do usuário, trocado quando o usuário ou um perfil muda
+
+    Um token (e não um contador) para que a expiração da chave também invalide
+    os papéis guardados nas sessões em vez de reaproveitar um valor antigo.
+    """
+    chave = chave_token_perfil(usuario_id)
+    token = cache.get(chave)
+    if token is None:
+        token = uuid.uuid4().hex
+        if not cache.add(chave, token, TEMPO_CACHE_TOKEN_PERFIL):
+            token = cache.get(chave, token)
+    return token
+
+
+def invalidar_perfil(usuario_id):
+    cache.delete(chave_token_perfil(usuario_id))
+
+
+def chave_geracao(entidade):
+    return f'oficina:geracao:{entidade}'
+
+
+def geracoes(*entidades):
+    """Geração atual de cada entidade, em uma ida ao cache"""
+    chaves = [chave_geracao(entidade) for entidade in entidades]
+    atuais = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in atuais:
+            # Começa do relógio, não de 1: uma geração expirada nunca volta a um
+            # número já usado (e a um fragmento antigo ainda no cache)
+            inicial = time.time_ns()
+            if not cache.add(chave, inicial, None):
+                inicial = cache.get(chave, inicial)
+            atuais[chave] = inicial
+    return [atuais[chave] for chave in chaves]
+
+
+def incrementar_geracao(*entidades):
+    for entidade in entidades:
+        try:
+            cache.incr(chave_geracao(entidade))
+        except ValueError:
+            # Ninguém leu a geração ainda: não há fragmento a invalidar
+            pass
+
+
+def obter_fragmento(nome, entidades, gerar, partes=(), tempo=TEMPO_CACHE_FRAGMENTO):
+    """
+    (html, contexto) de um trecho de página, guardado até alguma das entidades mudar
+
+    gerar() faz as consultas e o render e retorna (html, contexto), em que
+    contexto são as variáveis que a página ainda usa fora do fragmento; só é
+    chamado quando não há fragmento para as gerações atuais. partes
+    distingue variações do mesmo trecho (filtros, página, dia).
+    """
+    chave = make_template_fragment_key(nome, [*partes, *geracoes(*entidades)])
+    guardado = cache.get(chave)
+    if guardado is None:
+        guardado = gerar()
+        cache.set(chave, guardado, tempo)
+    html, contexto = guardado
+    return mark_safe(html), contexto
+
+
+def chave_catalogo_servicos(geracao):
+    return f'oficina:servicos:{geracao}:catalogo'
+
+
+# (geração, catálogo) lido por último neste processo
+_catalogo_servicos = (None, None)
+
+
+def obter_catalogo_servicos():
+    """
+    {'por_id': {id: Servicos}, 'por_nome': {nome_normalizado: id}} de todos os serviços
+
+    Lido do banco uma vez por geração de 'servicos' e guardado no cache e na
+    memória do processo; cada chamada só confere a geração. As instâncias são
+    compartilhadas entre as requisições: não altere.
+    """
+    global _catalogo_servicos
+    [geracao] = geracoes('servicos')
+    guardada, catalogo = _catalogo_servicos
+    if guardada == geracao:
+        return catalogo
+    chave = chave_catalogo_servicos(geracao)
+    catalogo = cache.get(chave)
+    if catalogo is None:
+        por_id = {servico.pk: servico for servico in Servicos.objects.order_by('nome_normalizado')}
+        catalogo = {
+            'por_id': por_id,
+            'por_nome': {servico.nome_normalizado: pk for pk, servico in por_id.items()},
+        }
+        cache.set(chave, catalogo, TEMPO_CACHE_CATALOGO)
+    _catalogo_servicos = (geracao, catalogo)
+    return catalogo
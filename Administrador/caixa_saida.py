@@ -0,0 +1,165 @@
+"""
+Caixa de saída (outbox) dos e-mails de confirmação, cancelamento e conclusão
+
+As views não falam com o servidor de e-mail: enfileirar() grava um EmailSaida
+na mesma transação da mudança de status, então o e-mail existe se e somente
+se a mudança foi confirmada, e a latência do SMTP não entra na requisição. A
+chave única (tipo + agendamento) impede avisos duplicados.
+
+despachar() é o worker: reserva um lote por compare-and-set (como as
+limpezas em limpeza.py), envia tudo por uma única conexão do EMAIL_BACKEND e
+reagenda as falhas com espera exponencial, até MAX_TENTATIVAS. Reservas de
+um worker que morreu voltam para a fila depois de TEMPO_RESERVA.
+
+`python manage.py enviar_emails` roda o worker em laço.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caches import obter_configuracao_notificacao, obter_configuracao_oficina
+from .models import Agendamento, EmailSaida
+
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 50
+MAX_TENTATIVAS = 5
+ESPERA_INICIAL = timedelta(minutes=1)  # dobra a cada falha
+ESPERA_MAXIMA = timedelta(hours=1)
+TEMPO_RESERVA = timedelta(minutes=10)
+
+# tipo -> flag de ConfiguracaoNotificacao
+FLAGS = {
+    'confirmacao': 'email_confirmacao',
+    'cancelamento': 'email_cancelamento',
+    'conclusao': 'email_conclusao',
+}
+
+
+def chave(tipo, agendamento_id):
+    return f'{tipo}:{agendamento_id}'
+
+
+def _mensagem(tipo, agendamento):
+    oficina = obter_configuracao_oficina()
+    quando = timezone.localtime(agendamento.data_hora).strftime('%d/%m/%Y às %H:%M')
+    servico = agendamento.servico.nome
+    saudacao = f'Olá, {agendamento.cliente.nome_completo}!'
+    if tipo == 'confirmacao':
+        return (
+            f'Agendamento #{agendamento.id} recebido: {servico}',
+            f'{saudacao} Recebemos o seu agendamento de "{servico}" para a sua '
+            f'{agendamento.moto} em {quando}.\n\n{oficina.nome_oficina}',
+        )
+    if tipo == 'cancelamento':
+        return (
+            f'Agendamento #{agendamento.id} cancelado',
+            f'{saudacao} O agendamento de "{servico}" marcado para {quando} foi '
+            f'cancelado.\n\n{oficina.nome_oficina}',
+        )
+    valor = f' Valor: R$ {agendamento.valor_servico:.2f}.' if agendamento.valor_servico is not None else ''
+    return (
+        f'Serviço concluído: {servico}',
+        f'{saudacao} O serviço "{servico}" da sua {agendamento.moto} foi concluído.'
+        f'{valor}\n\n{oficina.nome_oficina}',
+    )
+
+
+def enfileirar(tipo, agendamento):
+    """
+    Grava o e-mail na caixa de saída; chamar dentro da transação da mudança de status
+
+    `agendamento` pode ser a instância ou o id. Retorna o EmailSaida, ou None se
+    o tipo estiver desativado em ConfiguracaoNotificacao, o cliente não tiver
+    e-mail ou o aviso já tiver sido enfileirado.
+    """
+    if not getattr(obter_configuracao_notificacao(), FLAGS[tipo]):
+        return None
+    agendamento_id = getattr(agendamento, 'pk', agendamento)
+    agendamento = Agendamento.objects.select_related('cliente', 'moto', 'servico').get(pk=agendamento_id)
+    if not agendamento.cliente.email:
+        return None
+
+    assunto, corpo = _mensagem(tipo, agendamento)
+    try:
+        with transaction.atomic():
+            return EmailSaida.objects.create(
+                chave=chave(tipo, agendamento.pk),
+                tipo=tipo,
+                agendamento=agendamento,
+                destinatario=agendamento.cliente.email,
+                assunto=assunto,
+                corpo=corpo,
+            )
+    except IntegrityError:
+        return None
+
+
+def _reservar_lote(agora, tamanho):
+    disponiveis = EmailSaida.objects.filter(
+        Q(status__in=['pendente', 'erro'], proxima_tentativa__lte=agora)
+        | Q(status='enviando', atualizado_em__lt=agora - TEMPO_RESERVA)
+    )
+    ids = list(disponiveis.order_by('proxima_tentativa', 'id').values_list('pk', flat=True)[:tamanho])
+    if not ids:
+        return []
+    # Compare-and-set: um segundo worker que escolheu os mesmos ids não os leva
+    lote = uuid.uuid4().hex
+    disponiveis.filter(pk__in=ids).update(status='enviando', lote=lote, atualizado_em=agora)
+    return list(EmailSaida.objects.filter(lote=lote, status='enviando').order_by('proxima_tentativa', 'id'))
+
+
+def _espera(tentativas):
+    return min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+
+
+def _falhou(email, erro, agora):
+    tentativas = email.tentativas + 1
+    EmailSaida.objects.filter(pk=email.pk).update(
+        status='falhou' if tentativas >= MAX_TENTATIVAS else 'erro',
+        tentativas=tentativas,
+        proxima_tentativa=agora + _espera(tentativas),
+        erro=str(erro),
+        atualizado_em=agora,
+    )
+
+
+def despachar(tamanho_lote=TAMANHO_LOTE, agora=None):
+    """Envia um lote da caixa de saída. Retorna (enviados, falhas)."""
+    agora = agora or timezone.now()
+    lote = _reservar_lote(agora, tamanho_lote)
+    if not lote:
+        return 0, 0
+
+    enviados, falhados = [], []
+    try:
+        # Uma conexão (uma sessão SMTP) para o lote inteiro
+        with get_connection() as conexao:
+            for email in lote:
+                mensagem = EmailMessage(email.assunto, email.corpo, to=[email.destinatario], connection=conexao)
+                try:
+                    mensagem.send()
+                except Exception as e:
+                    logger.warning('Falha ao enviar o e-mail %s: %s', email.pk, e)
+                    _falhou(email, e, agora)
+                    falhados.append(email.pk)
+                else:
+                    enviados.append(email.pk)
+    except Exception as e:
+        # Não conseguiu abrir ou fechar a conexão: o que não foi enviado volta para a fila
+        logger.exception('Falha na conexão com o servidor de e-mail')
+        for email in lote:
+            if email.pk not in enviados and email.pk not in falhados:
+                _falhou(email, e, agora)
+                falhados.append(email.pk)
+
+    EmailSaida.objects.filter(pk__in=enviados).update(
+        status='enviado', erro='', enviado_em=timezone.now(), atualizado_em=timezone.now(),
+    )
+    return len(enviados), len(falhados)
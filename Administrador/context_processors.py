@@ -1,25 +1,17 @@
 """
 Context Processors para disponibilizar variáveis globalmente nos templates
 """
-from .models import ConfiguracaoOficina
+from .caches import obter_configuracao_oficina
 
 
 def configuracao_oficina(request):
     """
     Disponibiliza as configurações da oficina em todos os templates
+
+    A configuração vem do cache (caches.py); em regime normal nenhuma query é feita.
     """
     try:
-        config = ConfiguracaoOficina.objects.first()
-        if not config:
-            # Criar configuração padrão se não existir
-            config = ConfiguracaoOficina.objects.create(
-                nome_oficina="MotoService",
-                endereco="Endereço não configurado",
-                telefone="(00) 0000-0000",
-                email="contato@oficina.com",
-                cnpj="00.000.000/0000-00",
-                dias_funcionamento="Segunda a Sexta",
-            )
+        config = obter_configuracao_oficina()
     except Exception as e:
         # Em caso de erro, retornar configuração padrão vazia
         config = None
@@ -0,0 +1,182 @@
+"""
+Motor de disponibilidade de horários para agendamento
+
+Combina o expediente de ConfiguracaoOficina com as regras de
+ConfiguracaoAgendamento (intervalo entre horários, antecedência mínima e
+limite por dia) e com os agendamentos já existentes. Cada horário comporta
+um agendamento; cancelados não ocupam vaga.
+"""
+import re
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caches import obter_configuracao_agendamento, obter_configuracao_oficina
+from .models import Agendamento, ConfiguracaoAgendamento
+
+
+# Três primeiras letras de cada dia, na ordem de date.weekday()
+DIAS_SEMANA = ['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom']
+CONECTORES_INTERVALO = ('a', 'ate', 'as')
+
+
+class HorarioIndisponivel(Exception):
+    """O horário pedido não respeita as regras de agendamento ou já está ocupado"""
+
+
+def dias_funcionamento(texto):
+    """
+    Converte o texto livre de dias_funcionamento em um conjunto de weekday()
+
+    Aceita intervalos ('Segunda a Sexta') e listas ('Segunda, Quarta e Sábado').
+    Texto sem nenhum dia reconhecível é tratado como todos os dias.
+    """
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower()
+    if 'todos' in texto:
+        return set(range(7))
+
+    dias, anterior, intervalo = set(), None, False
+    for palavra in re.findall(r'[a-z]+', texto):
+        if palavra in CONECTORES_INTERVALO and anterior is not None:
+            intervalo = True
+        elif palavra[:3] in DIAS_SEMANA:
+            dia = DIAS_SEMANA.index(palavra[:3])
+            if intervalo:
+                dias.update((anterior + i) % 7 for i in range((dia - anterior) % 7 + 1))
+            dias.add(dia)
+            anterior, intervalo = dia, False
+        else:
+            intervalo = False
+
+    return dias or set(range(7))
+
+
+def horarios_do_dia(dia, config_oficina=None, config_agendamento=None):
+    """Todos os horários de início possíveis em um dia (sem considerar ocupação)"""
+    config_oficina = config_oficina or obter_configuracao_oficina()
+    config_agendamento = config_agendamento or obter_configuracao_agendamento()
+
+    if dia.weekday() not in dias_funcionamento(config_oficina.dias_funcionamento):
+        return []
+
+    passo = timedelta(minutes=max(config_agendamento.intervalo_agendamento, 1))
+    horario = timezone.make_aware(datetime.combine(dia, config_oficina.horario_funcionamento_inicio))
+    fim = timezone.make_aware(datetime.combine(dia, config_oficina.horario_funcionamento_fim))
+
+    horarios = []
+    while horario < fim:
+        horarios.append(horario)
+        horario += passo
+    return horarios
+
+
+def _ocupados(inicio, fim, ignorar_id=None):
+    """data_hora dos agendamentos ativos em [inicio, fim) - uma query pelo índice de data_hora"""
+    agendamentos = Agendamento.objects.filter(
+        data_hora__gte=inicio,
+        data_hora__lt=fim,
+    ).exclude(status='cancelado')
+    if ignorar_id is not None:
+        agendamentos = agendamentos.exclude(id=ignorar_id)
+    return list(agendamentos.values_list('data_hora', flat=True))
+
+
+def _limites_do_dia(dia):
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+
+
+def horarios_disponiveis(inicio, dias=7, agora=None):
+    """
+    Horários livres de `inicio` (date) até `inicio + dias`, com uma única query
+
+    Retorna uma lista com um item por dia de funcionamento:
+    {'data': date, 'horarios': [datetime, ...], 'lotado': bool}
+    """
+    config_oficina = obter_configuracao_oficina()
+    config_agendamento = obter_configuracao_agendamento()
+    agora = agora or timezone.now()
+    minimo = agora + timedelta(hours=config_agendamento.antecedencia_minima)
+
+    periodo_inicio, _ = _limites_do_dia(inicio)
+    _, periodo_fim = _limites_do_dia(inicio + timedelta(days=dias - 1))
+
+    ocupados_por_dia = {}
+    for data_hora in _ocupados(periodo_inicio, periodo_fim):
+        ocupados_por_dia.setdefault(timezone.localtime(data_hora).date(), set()).add(data_hora)
+
+    resultado = []
+    for deslocamento in range(dias):
+        dia = inicio + timedelta(days=deslocamento)
+        horarios = horarios_do_dia(dia, config_oficina, config_agendamento)
+        if not horarios:
+            continue
+
+        ocupados = ocupados_por_dia.get(dia, set())
+        lotado = len(ocupados) >= config_agendamento.limite_agendamentos_dia
+        resultado.append({
+            'data': dia,
+            'horarios': [] if lotado else [h for h in horarios if h >= minimo and h not in ocupados],
+            'lotado': lotado,
+        })
+    return resultado
+
+
+def proximo_horario_disponivel(agora=None, dias=60):
+    """Primeiro horário livre a partir de agora (None se não houver nos próximos `dias`)"""
+    agora = agora or timezone.now()
+    for dia in horarios_disponiveis(timezone.localtime(agora).date(), dias=dias, agora=agora):
+        if dia['horarios']:
+            return dia['horarios'][0]
+    return None
+
+
+def validar_horario(data_hora, ignorar_id=None, agora=None):
+    """Levanta HorarioIndisponivel se data_hora não puder ser reservado"""
+    config_oficina = obter_configuracao_oficina()
+    config_agendamento = obter_configuracao_agendamento()
+    agora = agora or timezone.now()
+    dia = timezone.localtime(data_hora).date()
+
+    if data_hora < agora + timedelta(hours=config_agendamento.antecedencia_minima):
+        raise HorarioIndisponivel(
+            f'Os agendamentos precisam de pelo menos {config_agendamento.antecedencia_minima} horas de antecedência.'
+        )
+
+    horarios = horarios_do_dia(dia, config_oficina, config_agendamento)
+    if not horarios:
+        raise HorarioIndisponivel('A oficina não funciona neste dia.')
+    if data_hora not in horarios:
+        raise HorarioIndisponivel(
+            f'Escolha um horário dentro do expediente, a cada {config_agendamento.intervalo_agendamento} minutos.'
+        )
+
+    ocupados = _ocupados(*_limites_do_dia(dia), ignorar_id=ignorar_id)
+    if len(ocupados) >= config_agendamento.limite_agendamentos_dia:
+        raise HorarioIndisponivel('Não há mais vagas para este dia. Escolha outra data.')
+    if data_hora in ocupados:
+        raise HorarioIndisponivel('Este horário já está reservado. Escolha outro horário.')
+
+
+@contextmanager
+def reservar_horario(data_hora, ignorar_id=None):
+    """
+    Valida o horário e mantém a transação aberta para gravar o agendamento
+
+    Uso:
+        with reservar_horario(data_hora):
+            Agendamento.objects.create(...)
+
+    Em bancos com bloqueio de linha, a linha de ConfiguracaoAgendamento é
+    travada para serializar reservas concorrentes. No SQLite as escritas já são
+    serializadas pelo próprio banco: a segunda transação falha em vez de
+    ultrapassar o limite.
+    """
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            list(ConfiguracaoAgendamento.objects.select_for_update().order_by('pk')[:1])
+        validar_horario(data_hora, ignorar_id=ignorar_id)
+        yield
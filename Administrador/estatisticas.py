@@ -0,0 +1,271 @@
+"""
+Estatísticas agregadas usadas pelos dashboards e badges do sistema
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import (
+    BooleanField, CharField, Count, DecimalField, ExpressionWrapper, F, Func, IntegerField,
+    OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Agendamento, AgendamentoArquivado, Cliente, Mecanico, Moto, OrdemServico
+
+
+def _uniao_contagens(consultas):
+    # COUNT como Func simples (e não Count) para não gerar GROUP BY em cada parte do UNION
+    partes = [
+        qs.order_by().values_list(
+            Value(nome, output_field=CharField()),
+            Func(F('pk'), function='COUNT', output_field=IntegerField()),
+        )
+        for nome, qs in consultas.items()
+    ]
+    primeira, *demais = partes
+    if demais:
+        primeira = primeira.union(*demais, all=True)
+    return primeira
+
+
+def contar_tabelas(**consultas):
+    """
+    Conta vários querysets em uma única ida ao banco (UNION ALL)
+
+    Ex.: contar_tabelas(clientes=Cliente.objects.all(), admins=User.objects.filter(is_staff=True))
+    retorna {'clientes': 10, 'admins': 2}
+    """
+    if not consultas:
+        return {}
+    contagens = dict(_uniao_contagens(consultas))
+    return {nome: contagens.get(nome, 0) for nome in consultas}
+
+
+async def acontar_tabelas(**consultas):
+    """contar_tabelas para as views assíncronas"""
+    if not consultas:
+        return {}
+    contagens = {nome: total async for nome, total in _uniao_contagens(consultas)}
+    return {nome: contagens.get(nome, 0) for nome in consultas}
+
+
+def _agregados_agendamentos(hoje):
+    agregados = {
+        'total': Count('id'),
+        'hoje': Count('id', filter=Q(data_hora__date=hoje)),
+    }
+    for status, _ in Agendamento.STATUS_CHOICES:
+        agregados[status] = Count('id', filter=Q(status=status))
+    return agregados
+
+
+def contagem_agendamentos(queryset=None, hoje=None):
+    """
+    Conta agendamentos por status e do dia em uma única query (agregação condicional)
+
+    Retorna um dicionário com 'total', 'hoje' e uma chave para cada status de
+    Agendamento.STATUS_CHOICES. Novos status entram na mesma query.
+    """
+    if queryset is None:
+        queryset = Agendamento.objects.all()
+    return queryset.order_by().aggregate(**_agregados_agendamentos(hoje or date.today()))
+
+
+async def acontagem_agendamentos(queryset=None, hoje=None):
+    """contagem_agendamentos para as views assíncronas"""
+    if queryset is None:
+        queryset = Agendamento.objects.all()
+    return await queryset.order_by().aaggregate(**_agregados_agendamentos(hoje or date.today()))
+
+
+def _consultas_totais():
+    return {
+        'clientes': Cliente.objects.all(),
+        'mecanicos': Mecanico.objects.all(),
+        'ordens': OrdemServico.objects.all(),
+    }
+
+
+def totais_sistema():
+    """Totais das tabelas principais exibidos no dashboard do administrador"""
+    return contar_tabelas(**_consultas_totais())
+
+
+async def atotais_sistema():
+    return await acontar_tabelas(**_consultas_totais())
+
+
+def resumo_cliente(cliente, agora=None):
+    """
+    Dados do dashboard do cliente em duas queries
+
+    1. Uma agregação agrupada pelo cliente: contagem por status, total gasto
+       (serviços concluídos) e, por subqueries, o total de motos e os
+       agendamentos já arquivados.
+    2. Os próximos agendamentos e o último serviço concluído juntos, separados
+       depois em Python.
+    """
+    agora = agora or timezone.now()
+
+    motos = Moto.objects.filter(cliente=OuterRef('pk')).order_by().values('cliente').annotate(
+        total=Count('id'),
+    ).values('total')
+
+    def arquivados(agregado):
+        # Agendamentos já arquivados entram na mesma query como subconsultas
+        return Subquery(
+            AgendamentoArquivado.objects.filter(cliente_id=OuterRef('pk')).order_by()
+            .values('cliente_id').annotate(valor=agregado).values('valor'),
+        )
+
+    totais = Cliente.objects.filter(pk=cliente.pk).annotate(
+        total_pendentes=Count('agendamento', filter=Q(agendamento__status='agendado')),
+        total_em_andamento=Count('agendamento', filter=Q(agendamento__status='em_andamento')),
+        total_finalizados=Count('agendamento', filter=Q(agendamento__status='concluido')),
+        total_cancelados=Count('agendamento', filter=Q(agendamento__status='cancelado')),
+        total_gasto=Coalesce(
+            Sum('agendamento__valor_servico', filter=Q(agendamento__status='concluido')),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        total_motos=Coalesce(Subquery(motos, output_field=IntegerField()), 0),
+        arquivados_finalizados=Coalesce(arquivados(Count('id', filter=Q(status='concluido'))), 0),
+        arquivados_cancelados=Coalesce(arquivados(Count('id', filter=Q(status='cancelado'))), 0),
+        arquivados_gasto=Coalesce(
+            arquivados(Sum('valor_servico', filter=Q(status='concluido'))),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    ).values(
+        'total_pendentes', 'total_em_andamento', 'total_finalizados',
+        'total_cancelados', 'total_gasto', 'total_motos',
+        'arquivados_finalizados', 'arquivados_cancelados', 'arquivados_gasto',
+    ).first()
+    for chave in ('finalizados', 'cancelados', 'gasto'):
+        totais[f'total_{chave}'] += totais.pop(f'arquivados_{chave}')
+
+    ultimo_concluido = Agendamento.objects.filter(
+        cliente=cliente, status='concluido',
+    ).order_by('-data_hora').values('pk')[:1]
+
+    # O último concluído é marcado e ordenado primeiro; com limite de 6 cabem
+    # ele e os 5 próximos, mesmo quando ele próprio é um agendamento futuro.
+    linhas = list(
+        Agendamento.objects.filter(cliente=cliente).filter(
+            Q(data_hora__gte=agora) & ~Q(status='cancelado') | Q(pk=Subquery(ultimo_concluido))
+        ).annotate(
+            eh_ultimo=ExpressionWrapper(Q(pk=Subquery(ultimo_concluido)), output_field=BooleanField()),
+        ).select_related('servico', 'moto', 'mecanico').order_by('-eh_ultimo', 'data_hora')[:6]
+    )
+    ultimo_servico = linhas[0] if linhas and linhas[0].eh_ultimo else None
+    if ultimo_servico is None and totais['total_finalizados']:
+        # Todos os concluídos já foram arquivados
+        ultimo_servico = AgendamentoArquivado.objects.filter(
+            cliente_id=cliente.pk, status='concluido',
+        ).order_by('-data_hora').first()
+    proximos = sorted(
+        (a for a in linhas if a.data_hora >= agora and a.status != 'cancelado'),
+        key=lambda a: a.data_hora,
+    )[:5]
+
+    return dict(
+        totais,
+        agendamentos=proximos,
+        proximo_agendamento=proximos[0] if proximos else None,
+        ultimo_servico=ultimo_servico,
+    )
+
+
+def _gasto_concluido():
+    return Coalesce(
+        Sum('valor_servico', filter=Q(status='concluido')),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def _totais_historico(queryset):
+    return queryset.order_by().aggregate(
+        total=Count('id'),
+        total_servicos=Count('id', filter=Q(status='concluido')),
+        total_cancelados=Count('id', filter=Q(status='cancelado')),
+        total_gasto=_gasto_concluido(),
+    )
+
+
+def resumo_historico(queryset, por_moto=True, arquivo=None):
+    """
+    Totais do histórico de agendamentos calculados no banco
+
+    Retorna {'total', 'total_servicos', 'total_cancelados', 'total_gasto',
+    'por_moto'}; por_moto traz, para cada moto, quantidade de serviços
+    concluídos e valor gasto (uma query agrupada por moto, omitida com
+    por_moto=False). Com arquivo (queryset de AgendamentoArquivado), as
+    mesmas agregações rodam no arquivo e os resultados são somados.
+    """
+    totais = _totais_historico(queryset)
+    if arquivo is not None:
+        for chave, valor in _totais_historico(arquivo).items():
+            totais[chave] += valor
+    if not por_moto:
+        return totais
+
+    motos = {}
+    agrupados = [
+        queryset.values('moto_id', 'moto__marca', 'moto__modelo', 'moto__placa'),
+    ]
+    if arquivo is not None:
+        # O arquivo guarda os dados da moto desnormalizados (moto_marca, ...)
+        agrupados.append(arquivo.values(
+            'moto_id', moto__marca=F('moto_marca'), moto__modelo=F('moto_modelo'), moto__placa=F('moto_placa'),
+        ))
+    for consulta in agrupados:
+        linhas = consulta.order_by().annotate(
+            servicos=Count('id', filter=Q(status='concluido')),
+            gasto=_gasto_concluido(),
+        )
+        for linha in linhas:
+            atual = motos.setdefault(linha['moto_id'], linha)
+            if atual is not linha:
+                atual['servicos'] += linha['servicos']
+                atual['gasto'] += linha['gasto']
+
+    totais['por_moto'] = sorted(
+        motos.values(), key=lambda m: (-m['gasto'], m['moto__marca'] or '', m['moto__modelo'] or ''),
+    )
+    return totais
+
+
+def produtividade_mensal(queryset, meses=12, hoje=None, arquivo=None):
+    """
+    Serviços concluídos e receita por mês, agrupados no banco
+
+    Considera os últimos `meses` meses (incluindo o atual) e retorna uma lista
+    de {'mes': datetime (início do mês), 'servicos': int, 'receita': Decimal},
+    do mais recente para o mais antigo. Meses sem serviço não aparecem. Com
+    arquivo, os meses já arquivados entram na soma.
+    """
+    hoje = hoje or timezone.localdate()
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - (meses - 1), 12)
+    inicio = timezone.make_aware(datetime(ano, mes + 1, 1))
+
+    por_mes = {}
+    for consulta in (queryset, arquivo):
+        if consulta is None:
+            continue
+        # 'inicio_mes' e não 'mes': AgendamentoArquivado já tem um campo mes (DateField)
+        linhas = consulta.order_by().filter(status='concluido', data_hora__gte=inicio).annotate(
+            inicio_mes=TruncMonth('data_hora'),
+        ).values('inicio_mes').annotate(
+            servicos=Count('id'),
+            receita=_gasto_concluido(),
+        )
+        for linha in linhas:
+            atual = por_mes.setdefault(
+                linha['inicio_mes'], {'mes': linha['inicio_mes'], 'servicos': 0, 'receita': 0},
+            )
+            atual['servicos'] += linha['servicos']
+            atual['receita'] += linha['receita']
+
+    return sorted(por_mes.values(), key=lambda linha: linha['mes'], reverse=True)
@@ -0,0 +1,269 @@
+"""
+Exportação em CSV e XLSX por streaming
+
+As linhas saem do banco com values_list().iterator(chunk_size=...) e são
+convertidas em bytes à medida que o cliente baixa o arquivo, então a memória
+do worker fica constante mesmo para exportações de vários anos. O XLSX é
+montado com zipfile (sem dependências extras): a planilha usa strings inline
+e é escrita direto no ZIP, sem arquivo temporário.
+
+No ASGI (core/asgi.py) o Django juntaria um gerador síncrono inteiro em uma
+lista antes de enviar a resposta: lá a view entrega o gerador embrulhado em
+em_partes_assincronas, que pede uma parte por vez. No WSGI o gerador vai como
+está, porque é o iterador assíncrono que seria juntado.
+"""
+import csv
+import re
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .filtros import filtrar_agendamentos
+from .models import Agendamento, Cliente, Moto, OrdemServico
+
+
+TAMANHO_LOTE = 2000
+TAMANHO_BLOCO_XLSX = 64 * 1024
+
+INICIO_FORMULA = ('=', '+', '-', '@')
+
+STATUS_AGENDAMENTO = dict(Agendamento.STATUS_CHOICES)
+STATUS_ORDEM = dict(OrdemServico._meta.get_field('status').choices)
+
+
+def _agendamentos(params):
+    return filtrar_agendamentos(params)[0].order_by('data_hora', 'id')
+
+
+def _ordens(params):
+    agendamentos, filtros = filtrar_agendamentos(params)
+    ordens = OrdemServico.objects.all()
+    if filtros:
+        ordens = ordens.filter(agendamento__in=agendamentos.values('pk'))
+    return ordens.order_by('id')
+
+
+def _clientes(params):
+    # Com filtros, só os clientes que têm agendamentos dentro deles
+    agendamentos, filtros = filtrar_agendamentos(params)
+    clientes = Cliente.objects.all()
+    if filtros:
+        clientes = clientes.filter(pk__in=agendamentos.values('cliente_id'))
+    return clientes.order_by('id')
+
+
+def _motos(params):
+    agendamentos, filtros = filtrar_agendamentos(params)
+    motos = Moto.objects.all()
+    if filtros:
+        motos = motos.filter(pk__in=agendamentos.values('moto_id'))
+    return motos.order_by('id')
+
+
+# tipo -> (função que monta o queryset a partir de request.GET, [(cabeçalho, campo)])
+EXPORTACOES = {
+    'agendamentos': (_agendamentos, [
+        ('ID', 'id'),
+        ('Data/Hora', 'data_hora'),
+        ('Status', 'status'),
+        ('Cliente', 'cliente__nome_completo'),
+        ('E-mail', 'cliente__email'),
+        ('Moto', 'moto__marca'),
+        ('Modelo', 'moto__modelo'),
+        ('Placa', 'moto__placa'),
+        ('Serviço', 'servico__nome'),
+        ('Mecânico', 'mecanico__nome_completo'),
+        ('Valor', 'valor_servico'),
+        ('Descrição do problema', 'descricao_problema'),
+    ]),
+    'ordens': (_ordens, [
+        ('ID', 'id'),
+        ('Agendamento', 'agendamento_id'),
+        ('Data do agendamento', 'agendamento__data_hora'),
+        ('Cliente', 'agendamento__cliente__nome_completo'),
+        ('Status', 'status'),
+        ('Custo', 'custo'),
+        ('Data de conclusão', 'data_conclusao'),
+        ('Descrição do serviço', 'descricao_servico'),
+        ('Observações', 'observacoes'),
+    ]),
+    'clientes': (_clientes, [
+        ('ID', 'id'),
+        ('Nome', 'nome_completo'),
+        ('E-mail', 'email'),
+        ('CPF', 'cpf'),
+        ('Telefone', 'telefone'),
+        ('Endereço', 'endereco'),
+        ('Usuário', 'usuario__username'),
+    ]),
+    'motos': (_motos, [
+        ('ID', 'id'),
+        ('Cliente', 'cliente__nome_completo'),
+        ('Marca', 'marca'),
+        ('Modelo', 'modelo'),
+        ('Ano', 'ano'),
+        ('Placa', 'placa'),
+        ('Cor', 'cor'),
+    ]),
+}
+
+
+def _formatar(campo, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M')
+    if campo == 'status':
+        return str(STATUS_AGENDAMENTO.get(valor) or STATUS_ORDEM.get(valor, valor))
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        # Texto digitado pelo usuário não pode virar fórmula na planilha
+        return "'" + valor
+    return valor
+
+
+def linhas_exportacao(tipo, params):
+    """Cabeçalho e um iterador de linhas já formatadas (levanta KeyError para tipo inválido)"""
+    montar_queryset, colunas = EXPORTACOES[tipo]
+    campos = [campo for _, campo in colunas]
+    linhas = montar_queryset(params).values_list(*campos).iterator(chunk_size=TAMANHO_LOTE)
+    return (
+        [cabecalho for cabecalho, _ in colunas],
+        ([_formatar(campo, valor) for campo, valor in zip(campos, linha)] for linha in linhas),
+    )
+
+
+class _Eco:
+    """Pseudo-arquivo para csv.writer: devolve a linha em vez de guardá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(cabecalho, linhas):
+    # BOM e ';' para o Excel em português abrir acentos e colunas corretamente
+    escritor = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff' + escritor.writerow(cabecalho)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+class _SaidaStreaming:
+    """Destino não-seekable do ZipFile: acumula bytes até o gerador entregá-los"""
+
+    def __init__(self):
+        self.partes = []
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes, self.tamanho = [], 0
+        return dados
+
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_ARQUIVOS_FIXOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Dados" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celula_xlsx(valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return f'<c t="n"><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(numero, valores):
+    celulas = ''.join(_celula_xlsx(valor) for valor in valores)
+    return f'<row r="{numero}">{celulas}</row>'.encode()
+
+
+def gerar_xlsx(cabecalho, linhas):
+    saida = _SaidaStreaming()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as arquivo:
+        for nome, conteudo in XLSX_ARQUIVOS_FIXOS.items():
+            arquivo.writestr(nome, conteudo)
+        yield saida.esvaziar()
+
+        # force_zip64: o tamanho final da planilha não é conhecido de antemão
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            planilha.write(_linha_xlsx(1, cabecalho))
+            for numero, linha in enumerate(linhas, start=2):
+                planilha.write(_linha_xlsx(numero, linha))
+                if saida.tamanho >= TAMANHO_BLOCO_XLSX:
+                    yield saida.esvaziar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.esvaziar()
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (gerar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+async def em_partes_assincronas(gerador):
+    """
+    Iterador assíncrono sobre um gerador de gerar_csv/gerar_xlsx
+
+    thread_sensitive: todas as partes saem da mesma thread, a dona da conexão
+    e do cursor aberto por iterator().
+    """
+    fim = object()
+    proxima = sync_to_async(next, thread_sensitive=True)
+    try:
+        # next() com padrão: StopIteration não atravessa o sync_to_async
+        while (parte := await proxima(gerador, fim)) is not fim:
+            yield parte
+    finally:
+        await sync_to_async(gerador.close, thread_sensitive=True)()
@@ -0,0 +1,215 @@
+"""
+Fila de trabalho dos mecânicos ao vivo (Server-Sent Events)
+
+Em vez de recarregar o painel para descobrir agendamentos novos, a página
+abre um EventSource em /fila-mecanico/eventos/ e recebe só o que mudou:
+agendamento novo, pego, devolvido, cancelado, concluído ou alterado. O
+navegador insere ou remove a linha correspondente (static/js/fila-mecanico.js).
+
+Os eventos saem dos sinais de Agendamento (post_save, post_delete e
+agendamento_transicionado, ver signals.py) depois do commit e passam por um
+pub/sub em memória: publicar() é chamado nas threads das views e entrega a
+cada assinante pelo loop de eventos dele (call_soon_threadsafe). Cada
+assinante tem uma fila limitada (FILA_MECANICO_FILA_MAX); um cliente lento
+demais recebe 'recarregar' e recarrega a página, em vez de segurar memória.
+
+Os últimos FILA_MECANICO_HISTORICO eventos ficam guardados para que uma
+reconexão com Last-Event-ID receba o que perdeu. Os ids começam com uma
+marca do processo: depois de um restart, ou se o evento pedido já saiu do
+histórico, o cliente também recebe 'recarregar'. A página renderizada leva o
+id do último evento (parâmetro ?ultimo=), então nem o que acontece entre a
+consulta da view e a abertura do stream se perde.
+
+O pub/sub é do processo: o stream precisa do servidor ASGI (core/asgi.py) e
+de um único processo atendendo o painel, senão um mecânico só vê as mudanças
+feitas no mesmo processo em que está conectado. No WSGI (runserver) o
+Django juntaria o gerador assíncrono inteiro antes de responder, então a
+thread ficaria presa para sempre: lá as páginas não abrem o stream
+(ao_vivo) e o endpoint responde 204, que faz o EventSource desistir.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+
+from .models import Agendamento
+
+
+# Marca do processo nos ids: ids de outra execução não são confiáveis
+_EPOCA = uuid.uuid4().hex[:8]
+
+# status -> tipo do evento, para gravações fora de transicoes.py
+TIPOS_POR_STATUS = {
+    'agendado': 'alterado',
+    'em_andamento': 'pego',
+    'concluido': 'concluido',
+    'cancelado': 'cancelado',
+}
+
+
+def ao_vivo(request):
+    """Se a requisição chegou pelo servidor ASGI, o único que consegue manter o stream aberto"""
+    return isinstance(request, ASGIRequest)
+
+
+def _config(nome, padrao):
+    return getattr(settings, f'FILA_MECANICO_{nome}', padrao)
+
+
+class Assinante:
+    """Um stream aberto: a fila do loop de eventos que o atende"""
+
+    def __init__(self, loop, fila_max):
+        self.loop = loop
+        self.fila = asyncio.Queue(maxsize=fila_max)
+
+    def _entregar(self, evento):
+        # Roda no loop do assinante
+        if self.fila.full():
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            evento = {'id': evento['id'], 'tipo': 'recarregar'}
+        self.fila.put_nowait(evento)
+
+
+class FilaMecanico:
+    """Pub/sub em memória com histórico curto para reconexões"""
+
+    def __init__(self, historico, fila_max):
+        self.fila_max = fila_max
+        self.historico = deque(maxlen=historico)
+        self._assinantes = set()
+        self._ultimo = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ultimo_id(self):
+        """Id do último evento publicado; a página o passa ao stream para não perder nada"""
+        return f'{_EPOCA}-{self._ultimo}'
+
+    def publicar(self, dados):
+        """Numera o evento e o entrega a todos os assinantes; seguro de qualquer thread"""
+        with self._lock:
+            self._ultimo += 1
+            evento = {'id': f'{_EPOCA}-{self._ultimo}', **dados}
+            self.historico.append(evento)
+            assinantes = list(self._assinantes)
+        for assinante in assinantes:
+            try:
+                assinante.loop.call_soon_threadsafe(assinante._entregar, evento)
+            except RuntimeError:
+                # Loop já encerrado: o stream morreu sem cancelar a assinatura
+                self.cancelar(assinante)
+        return evento
+
+    def assinar(self, ultimo_id=None):
+        """
+        Registra um assinante no loop corrente
+
+        Retorna (assinante, eventos perdidos desde ultimo_id). Se não há como
+        saber o que foi perdido, a lista é um único evento 'recarregar'.
+        """
+        assinante = Assinante(asyncio.get_running_loop(), self.fila_max)
+        with self._lock:
+            self._assinantes.add(assinante)
+            perdidos = self._desde(ultimo_id) if ultimo_id else []
+        return assinante, perdidos
+
+    def _desde(self, ultimo_id):
+        epoca, _, numero = ultimo_id.partition('-')
+        if epoca == _EPOCA and numero.isdigit():
+            numero = int(numero)
+            # Número do evento mais antigo ainda no histórico
+            primeiro = self._ultimo - len(self.historico) + 1
+            if primeiro - 1 <= numero <= self._ultimo:
+                return list(self.historico)[numero - primeiro + 1:]
+        return [{'id': self.ultimo_id, 'tipo': 'recarregar'}]
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    @property
+    def total_assinantes(self):
+        return len(self._assinantes)
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def fila():
+    global _fila
+    if _fila is None:
+        with _fila_lock:
+            if _fila is None:
+                _fila = FilaMecanico(
+                    historico=_config('HISTORICO', 200),
+                    fila_max=_config('FILA_MAX', 100),
+                )
+    return _fila
+
+
+def dados_agendamento(agendamento_id, tipo):
+    """Evento com o que a linha da tabela de pendentes precisa; uma query"""
+    agendamento = Agendamento.objects.select_related('cliente', 'moto', 'servico').filter(
+        pk=agendamento_id,
+    ).first()
+    if agendamento is None:
+        return {'tipo': 'removido', 'agendamento': agendamento_id, 'status': None}
+    data_hora = timezone.localtime(agendamento.data_hora)
+    return {
+        'tipo': tipo,
+        'agendamento': agendamento.pk,
+        'status': agendamento.status,
+        'mecanico': agendamento.mecanico_id,
+        'data_hora': data_hora.isoformat(),
+        'data': data_hora.strftime('%d/%m/%Y'),
+        'hora': data_hora.strftime('%H:%M'),
+        'cliente': agendamento.cliente.nome_completo,
+        'moto': f'{agendamento.moto.marca} {agendamento.moto.modelo}',
+        'ano': agendamento.moto.ano,
+        'servico': agendamento.servico.nome,
+        'descricao': agendamento.descricao_problema or '',
+    }
+
+
+def publicar_agendamento(agendamento_id, tipo):
+    return fila().publicar(dados_agendamento(agendamento_id, tipo))
+
+
+def publicar_remocao(agendamento_id):
+    return fila().publicar({'tipo': 'removido', 'agendamento': agendamento_id, 'status': None})
+
+
+def formatar(evento):
+    """Um evento no formato text/event-stream"""
+    if evento['tipo'] == 'recarregar':
+        return f"id: {evento['id']}\nevent: recarregar\ndata: {{}}\n\n"
+    return f"id: {evento['id']}\nevent: agendamento\ndata: {json.dumps(evento)}\n\n"
+
+
+async def fluxo(ultimo_id=None, heartbeat=None):
+    """Gerador assíncrono do stream SSE; a assinatura é cancelada quando o cliente desconecta"""
+    heartbeat = heartbeat or _config('HEARTBEAT', 15)
+    assinante, perdidos = fila().assinar(ultimo_id)
+    try:
+        # Em quanto tempo o navegador reconecta se a conexão cair
+        yield 'retry: 5000\n\n'
+        for evento in perdidos:
+            yield formatar(evento)
+        while True:
+            try:
+                evento = await asyncio.wait_for(assinante.fila.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém proxies e o balanceador com a conexão aberta
+                yield ': ping\n\n'
+                continue
+            yield formatar(evento)
+    finally:
+        fila().cancelar(assinante)
@@ -0,0 +1,69 @@
+"""
+Filtros de agendamentos aplicados no banco (listagem do administrador e exportações)
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Agendamento
+
+
+def _ler_data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _ler_id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def filtrar_agendamentos(params, queryset=None):
+    """
+    Aplica os filtros de status, mecânico, serviço e período vindos de request.GET
+
+    Retorna (queryset, filtros) onde filtros contém apenas os valores válidos,
+    prontos para reaproveitar no template e nos links de paginação.
+    """
+    if queryset is None:
+        queryset = Agendamento.objects.all()
+    filtros = {}
+
+    status = params.get('status', '')
+    if status in dict(Agendamento.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+        filtros['status'] = status
+
+    mecanico = params.get('mecanico', '')
+    if mecanico == 'nenhum':
+        queryset = queryset.filter(mecanico__isnull=True)
+        filtros['mecanico'] = mecanico
+    elif _ler_id(mecanico) is not None:
+        queryset = queryset.filter(mecanico_id=_ler_id(mecanico))
+        filtros['mecanico'] = mecanico
+
+    servico = _ler_id(params.get('servico'))
+    if servico is not None:
+        queryset = queryset.filter(servico_id=servico)
+        filtros['servico'] = str(servico)
+
+    # Intervalo como comparação direta em data_hora (usa índice, ao contrário de __date)
+    data_inicio = _ler_data(params.get('data_inicio'))
+    if data_inicio:
+        queryset = queryset.filter(
+            data_hora__gte=timezone.make_aware(datetime.combine(data_inicio, time.min))
+        )
+        filtros['data_inicio'] = data_inicio.isoformat()
+
+    data_fim = _ler_data(params.get('data_fim'))
+    if data_fim:
+        queryset = queryset.filter(
+            data_hora__lt=timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), time.min))
+        )
+        filtros['data_fim'] = data_fim.isoformat()
+
+    return queryset, filtros
@@ -0,0 +1,181 @@
+"""
+Lembretes de agendamento (24h e 1h antes) de ConfiguracaoNotificacao
+
+A cada ciclo, enviar_lembretes() procura os agendamentos devidos com uma
+consulta por intervalo em data_hora (índice agend_status_data_idx), então o
+custo depende de quantos agendamentos caem na janela, não do tamanho da
+tabela. As janelas não se sobrepõem: o lembrete de 24h vale para quem está
+entre 1h e 24h no futuro e o de 1h para quem está a menos de 1h, então um
+agendamento marcado em cima da hora recebe só o lembrete mais próximo.
+
+Cada envio é registrado em LembreteEnviado antes de chamar o backend (a
+restrição única decide quem envia), então um lembrete nunca sai duas vezes,
+mesmo com dois agendadores rodando. Falhas ficam com status 'erro' e são
+tentadas de novo nos ciclos seguintes, até MAX_TENTATIVAS, enquanto o
+agendamento estiver na janela.
+
+Os canais são plugáveis (settings.LEMBRETES_BACKENDS): o e-mail usa o
+EMAIL_BACKEND do Django e o SMS, por padrão, só escreve no console; há
+também um backend que grava os SMS em arquivo, para testes e
+desenvolvimento.
+
+`python manage.py agendar_lembretes` roda o laço do agendador.
+"""
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .caches import obter_configuracao_notificacao, obter_configuracao_oficina
+from .models import Agendamento, LembreteEnviado
+
+
+logger = logging.getLogger(__name__)
+
+# Agendamentos que ainda vão acontecer; concluídos e cancelados não recebem lembrete
+STATUS_COM_LEMBRETE = ['agendado', 'em_andamento']
+
+MAX_TENTATIVAS = 3
+# O que passar disso fica para o ciclo seguinte
+LIMITE_POR_CICLO = 1000
+
+# tipo -> (antecedência, flag de ConfiguracaoNotificacao), do mais distante para o mais próximo
+TIPOS = {
+    '24h': (timedelta(hours=24), 'notificar_24h_antes'),
+    '1h': (timedelta(hours=1), 'notificar_1h_antes'),
+}
+
+BACKENDS_PADRAO = {
+    'email': 'Administrador.lembretes.BackendEmail',
+    'sms': 'Administrador.lembretes.BackendSmsConsole',
+}
+
+
+class BackendEmail:
+    """Envia pelo EMAIL_BACKEND do Django (console, arquivo, SMTP...)"""
+
+    def destino(self, cliente):
+        return cliente.email
+
+    def enviar(self, destino, assunto, mensagem):
+        send_mail(assunto, mensagem, None, [destino])
+
+
+class BackendSmsConsole:
+    """Substituto de um provedor de SMS: só registra a mensagem no log"""
+
+    def destino(self, cliente):
+        return cliente.telefone
+
+    def enviar(self, destino, assunto, mensagem):
+        logger.info('SMS para %s: %s', destino, mensagem)
+
+
+class BackendSmsArquivo(BackendSmsConsole):
+    """Grava cada SMS como uma linha em LEMBRETES_SMS_ARQUIVO"""
+
+    def enviar(self, destino, assunto, mensagem):
+        arquivo = Path(settings.LEMBRETES_SMS_ARQUIVO)
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        with arquivo.open('a', encoding='utf-8') as saida:
+            saida.write(f'{destino}\t{mensagem}\n')
+
+
+def backend(canal):
+    caminhos = {**BACKENDS_PADRAO, **getattr(settings, 'LEMBRETES_BACKENDS', {})}
+    return import_string(caminhos[canal])()
+
+
+def janelas(config, agora):
+    """[(tipo, início exclusivo, fim inclusivo)] dos tipos ativos, sem sobreposição"""
+    resultado = []
+    fim_anterior = None
+    for tipo, (antecedencia, flag) in reversed(TIPOS.items()):
+        if getattr(config, flag):
+            resultado.append((tipo, fim_anterior or agora, agora + antecedencia))
+            fim_anterior = agora + antecedencia
+    return resultado
+
+
+def canais(config):
+    return ['email', 'sms'] if config.sms_lembrete else ['email']
+
+
+def agendamentos_devidos(tipo, canal, inicio, fim):
+    """Agendamentos na janela que ainda não têm este lembrete resolvido para o horário atual"""
+    resolvido = LembreteEnviado.objects.filter(
+        agendamento=OuterRef('pk'),
+        tipo=tipo,
+        canal=canal,
+        data_hora=OuterRef('data_hora'),
+    ).filter(~Q(status='erro') | Q(tentativas__gte=MAX_TENTATIVAS))
+    # Em andamento também: o mecânico pode pegar o agendamento da fila antes do horário
+    return Agendamento.objects.filter(
+        status__in=STATUS_COM_LEMBRETE, data_hora__gt=inicio, data_hora__lte=fim,
+    ).exclude(Exists(resolvido)).select_related('cliente', 'moto', 'servico').order_by('data_hora', 'id')
+
+
+def _reservar(agendamento, tipo, canal):
+    """Registra o envio; None se outro agendador já o fez (ou está fazendo)"""
+    try:
+        with transaction.atomic():
+            return LembreteEnviado.objects.create(
+                agendamento=agendamento, tipo=tipo, canal=canal, data_hora=agendamento.data_hora,
+            )
+    except IntegrityError:
+        pass
+    # Já existe: só uma nova tentativa de um envio que falhou, por compare-and-set
+    anterior = LembreteEnviado.objects.filter(
+        agendamento=agendamento, tipo=tipo, canal=canal, data_hora=agendamento.data_hora,
+        status='erro', tentativas__lt=MAX_TENTATIVAS,
+    )
+    lembrete = anterior.first()
+    if lembrete is None or not anterior.filter(pk=lembrete.pk, tentativas=lembrete.tentativas).update(
+        status='enviando', tentativas=lembrete.tentativas + 1,
+    ):
+        return None
+    return lembrete
+
+
+def mensagem_lembrete(agendamento):
+    oficina = obter_configuracao_oficina()
+    quando = timezone.localtime(agendamento.data_hora).strftime('%d/%m/%Y às %H:%M')
+    assunto = f'Lembrete: {agendamento.servico.nome} em {quando}'
+    mensagem = (
+        f'Olá, {agendamento.cliente.nome_completo}! Lembramos que o serviço '
+        f'"{agendamento.servico.nome}" da sua {agendamento.moto} está marcado para '
+        f'{quando} na {oficina.nome_oficina}.'
+    )
+    return assunto, mensagem
+
+
+def enviar_lembretes(agora=None, config=None):
+    """Um ciclo do agendador. Retorna {(tipo, canal): quantidade enviada}."""
+    agora = agora or timezone.now()
+    config = config or obter_configuracao_notificacao()
+    enviados = {}
+
+    for tipo, inicio, fim in janelas(config, agora):
+        for canal in canais(config):
+            envio = backend(canal)
+            for agendamento in agendamentos_devidos(tipo, canal, inicio, fim)[:LIMITE_POR_CICLO]:
+                lembrete = _reservar(agendamento, tipo, canal)
+                if lembrete is None:
+                    continue
+                try:
+                    envio.enviar(envio.destino(agendamento.cliente), *mensagem_lembrete(agendamento))
+                except Exception as e:
+                    logger.exception('Falha no lembrete %s/%s do agendamento %s', tipo, canal, agendamento.pk)
+                    LembreteEnviado.objects.filter(pk=lembrete.pk).update(status='erro', erro=str(e))
+                    continue
+                LembreteEnviado.objects.filter(pk=lembrete.pk).update(
+                    status='enviado', erro='', enviado_em=timezone.now(),
+                )
+                enviados[tipo, canal] = enviados.get((tipo, canal), 0) + 1
+    return enviados
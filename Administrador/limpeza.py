@@ -0,0 +1,170 @@
+"""
+Limpeza e arquivamento de dados em segundo plano, em lotes
+
+limpar_dados_sistema apenas registra uma TarefaLimpeza; o trabalho roda em uma
+thread iniciada depois do commit. Cada lote apaga (ou arquiva) no máximo
+TAMANHO_LOTE linhas pela chave primária, em uma transação curta que também grava o
+progresso, e entre lotes a thread dorme PAUSA_ENTRE_LOTES para que os outros
+workers consigam escrever no SQLite.
+
+Como cada lote é refeito a partir da consulta (e não de uma lista guardada),
+uma tarefa interrompida pode ser retomada do ponto em que parou:
+`python manage.py executar_limpezas` processa as pendentes e as que ficaram
+em 'executando' sem progresso por TEMPO_SEM_PROGRESSO.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .arquivamento import agendamentos_arquivaveis, arquivar_lote, data_limite_padrao
+from .estatisticas import contar_tabelas
+from .models import Agendamento, AgendamentoArquivado, Cliente, Mecanico, Moto, OrdemServico, TarefaLimpeza
+
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 500
+PAUSA_ENTRE_LOTES = 0.05  # segundos
+TEMPO_SEM_PROGRESSO = timedelta(minutes=5)
+DIAS_AGENDAMENTOS_ANTIGOS = 180
+
+
+def _apagar(consulta):
+    return lambda ids: consulta.model.objects.filter(pk__in=ids).delete()
+
+
+def _etapas(tarefa):
+    """[(nome da etapa, queryset a processar, ação sobre um lote de ids)] na ordem de execução"""
+    if tarefa.tipo == 'agendamentos':
+        antigos = Agendamento.objects.filter(
+            status__in=['cancelado', 'concluido'],
+            data_hora__lt=tarefa.data_limite,
+        )
+        return [('agendamentos', antigos, _apagar(antigos))]
+    if tarefa.tipo == 'arquivamento':
+        return [('arquivamento', agendamentos_arquivaveis(tarefa.data_limite), arquivar_lote)]
+    # reset_total: dependentes primeiro, para que cada lote não cascateie em tabelas grandes
+    consultas = [
+        ('ordens', OrdemServico.objects.all()),
+        ('agendamentos', Agendamento.objects.all()),
+        ('motos', Moto.objects.all()),
+        ('clientes', Cliente.objects.all()),
+        ('mecanicos', Mecanico.objects.all()),
+        ('arquivo', AgendamentoArquivado.objects.all()),
+    ]
+    return [(nome, consulta, _apagar(consulta)) for nome, consulta in consultas]
+
+
+def tarefa_ativa(tipo):
+    return TarefaLimpeza.objects.filter(tipo=tipo, status__in=['pendente', 'executando']).first()
+
+
+def criar_tarefa(tipo, usuario=None, em_segundo_plano=True):
+    """
+    Registra a limpeza e agenda a execução para depois do commit
+
+    em_segundo_plano=False apenas registra; quem chamou executa com executar_tarefa.
+    """
+    tarefa = TarefaLimpeza(tipo=tipo, criada_por=usuario)
+    if tipo == 'agendamentos':
+        tarefa.data_limite = timezone.now() - timedelta(days=DIAS_AGENDAMENTOS_ANTIGOS)
+    elif tipo == 'arquivamento':
+        tarefa.data_limite = data_limite_padrao()
+    consultas = {nome: consulta for nome, consulta, _ in _etapas(tarefa)}
+    tarefa.total_estimado = sum(contar_tabelas(**consultas).values())
+    tarefa.save()
+
+    if em_segundo_plano:
+        transaction.on_commit(lambda: iniciar_em_segundo_plano(tarefa.pk))
+    return tarefa
+
+
+def iniciar_em_segundo_plano(tarefa_id):
+    def executar():
+        try:
+            executar_tarefa(tarefa_id)
+        finally:
+            connection.close()
+
+    threading.Thread(target=executar, name=f'limpeza-{tarefa_id}', daemon=True).start()
+
+
+def _reservar(tarefa_id, retomar_erro=False):
+    """Compare-and-set: só um executor assume a tarefa"""
+    disponivel = Q(status='pendente') | Q(
+        status='executando', atualizada_em__lt=timezone.now() - TEMPO_SEM_PROGRESSO
+    )
+    if retomar_erro:
+        disponivel |= Q(status='erro')
+    return TarefaLimpeza.objects.filter(disponivel, pk=tarefa_id).update(
+        status='executando', erro='', atualizada_em=timezone.now(),
+    ) == 1
+
+
+def executar_tarefa(tarefa_id, retomar_erro=False, pausa=PAUSA_ENTRE_LOTES):
+    """Executa (ou retoma) a tarefa. Retorna False se outro executor já a assumiu."""
+    if not _reservar(tarefa_id, retomar_erro):
+        return False
+
+    tarefa = TarefaLimpeza.objects.get(pk=tarefa_id)
+    etapas = _etapas(tarefa)
+    nomes = [nome for nome, _, _ in etapas]
+    inicio = nomes.index(tarefa.etapa) if tarefa.etapa in nomes else 0
+
+    try:
+        for etapa, consulta, acao in etapas[inicio:]:
+            while True:
+                with transaction.atomic():
+                    ids = list(consulta.order_by('pk').values_list('pk', flat=True)[:TAMANHO_LOTE])
+                    if not ids:
+                        break
+                    acao(ids)
+                    TarefaLimpeza.objects.filter(pk=tarefa_id).update(
+                        etapa=etapa,
+                        total_removidos=F('total_removidos') + len(ids),
+                        atualizada_em=timezone.now(),
+                    )
+                time.sleep(pausa)
+    except Exception as e:
+        logger.exception('Falha na limpeza %s', tarefa_id)
+        TarefaLimpeza.objects.filter(pk=tarefa_id).update(
+            status='erro', erro=str(e), atualizada_em=timezone.now(),
+        )
+        return True
+
+    TarefaLimpeza.objects.filter(pk=tarefa_id).update(
+        status='concluida', etapa='', atualizada_em=timezone.now(),
+    )
+    return True
+
+
+def tarefas_para_retomar(incluir_erros=False):
+    retomaveis = Q(status='pendente') | Q(
+        status='executando', atualizada_em__lt=timezone.now() - TEMPO_SEM_PROGRESSO
+    )
+    if incluir_erros:
+        retomaveis |= Q(status='erro')
+    return TarefaLimpeza.objects.filter(retomaveis).order_by('criada_em')
+
+
+def progresso(tarefa):
+    """Dados da tarefa para o endpoint de status"""
+    percentual = 100 if tarefa.status == 'concluida' else 0
+    if tarefa.total_estimado and tarefa.status != 'concluida':
+        percentual = min(99, int(tarefa.total_removidos * 100 / tarefa.total_estimado))
+    return {
+        'id': tarefa.pk,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'etapa': tarefa.etapa,
+        'total_estimado': tarefa.total_estimado,
+        'total_removidos': tarefa.total_removidos,
+        'progresso': percentual,
+        'erro': tarefa.erro,
+        'atualizada_em': tarefa.atualizada_em.isoformat(),
+    }
@@ -0,0 +1,18 @@
+from django.conf import settings
+
+from Administrador.lembretes import enviar_lembretes
+from Administrador.management.laco import ComandoPeriodico
+
+
+class Command(ComandoPeriodico):
+    help = (
+        'Agendador dos lembretes de 24h e 1h antes dos agendamentos '
+        '(processo contínuo; use --uma-vez para um único ciclo, ex.: cron)'
+    )
+
+    def intervalo_padrao(self):
+        return getattr(settings, 'LEMBRETES_INTERVALO', 60)
+
+    def ciclo(self):
+        for (tipo, canal), quantidade in sorted(enviar_lembretes().items()):
+            self.stdout.write(f'{quantidade} lembrete(s) de {tipo} enviado(s) por {canal}.')
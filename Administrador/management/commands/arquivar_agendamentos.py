@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from Administrador.limpeza import criar_tarefa, executar_tarefa, tarefa_ativa
+
+
+class Command(BaseCommand):
+    help = (
+        'Move agendamentos concluídos e cancelados antigos para o arquivo '
+        '(para rodar periodicamente, ex.: cron diário)'
+    )
+
+    def handle(self, *args, **options):
+        tarefa = tarefa_ativa('arquivamento')
+        if tarefa is None:
+            tarefa = criar_tarefa('arquivamento', em_segundo_plano=False)
+        self.stdout.write(f'Arquivamento #{tarefa.pk}: {tarefa.total_estimado} agendamentos a arquivar...')
+
+        if not executar_tarefa(tarefa.pk):
+            self.stdout.write('O arquivamento já está sendo executado por outro processo.')
+            return
+
+        tarefa.refresh_from_db()
+        if tarefa.status == 'erro':
+            self.stdout.write(self.style.ERROR(f'Erro no arquivamento: {tarefa.erro}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{tarefa.total_removidos} agendamentos arquivados.'))
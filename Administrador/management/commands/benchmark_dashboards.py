@@ -0,0 +1,183 @@
+"""
+Vazão dos dashboards no caminho WSGI e no ASGI, sob carga concorrente
+
+Os dois handlers do Django são chamados diretamente, no lugar do servidor:
+o WSGIHandler por um pool de --threads threads (como um gunicorn gthread) e
+o ASGIHandler por um único loop de eventos (como um worker do uvicorn ou do
+daphne), com --concorrencia requisições em voo. Fica de fora só a rede;
+sessão, middlewares, views e templates são os de produção.
+
+Usa o banco configurado (rode contra uma cópia com volume realista) e uma
+sessão do usuário informado. Com DEBUG = True o Django guarda cada query em
+memória: meça com DEBUG = False.
+"""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from Administrador.perfis import ADMINISTRADOR, CLIENTE, MECANICO, resolver_perfil
+
+
+# Dashboards de cada papel (as views assíncronas)
+ROTAS_POR_PAPEL = {
+    ADMINISTRADOR: ['dashboard-admin'],
+    CLIENTE: ['dashboard-cliente', 'historico-cliente'],
+    MECANICO: ['dashboard-mecanico'],
+}
+
+HOST = 'localhost'
+
+
+def requisicao_wsgi(handler, caminho, cookie):
+    """Uma requisição GET pelo WSGIHandler; retorna o status"""
+    environ = {'PATH_INFO': caminho, 'HTTP_COOKIE': cookie, 'HTTP_HOST': HOST, 'SERVER_NAME': HOST}
+    setup_testing_defaults(environ)
+    status = []
+    resposta = handler(environ, lambda linha, cabecalhos, exc_info=None: status.append(linha))
+    try:
+        for _ in resposta:
+            pass
+    finally:
+        resposta.close()
+    return int(status[0].split()[0])
+
+
+async def requisicao_asgi(handler, caminho, cookie):
+    """Uma requisição GET pelo ASGIHandler, como o servidor ASGI a entregaria; retorna o status"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': caminho,
+        'raw_path': caminho.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    corpo_enviado = False
+    status = []
+
+    async def receive():
+        nonlocal corpo_enviado
+        if not corpo_enviado:
+            corpo_enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # O cliente nunca desconecta; o Django cancela esta espera ao terminar
+        await asyncio.Event().wait()
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+
+    await handler(scope, receive, send)
+    return status[0]
+
+
+def _medir(requisicao):
+    inicio = time.perf_counter()
+    try:
+        ok = requisicao() == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - inicio, ok
+
+
+def carga_wsgi(caminho, cookie, requisicoes, threads):
+    """[(segundos, ok)] de cada requisição e o tempo total"""
+    handler = WSGIHandler()
+    requisicao_wsgi(handler, caminho, cookie)  # aquecimento
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        medidas = list(pool.map(
+            lambda _: _medir(lambda: requisicao_wsgi(handler, caminho, cookie)), range(requisicoes),
+        ))
+    return medidas, time.perf_counter() - inicio
+
+
+def carga_asgi(caminho, cookie, requisicoes, concorrencia):
+    handler = ASGIHandler()
+
+    async def medir(limite):
+        async with limite:
+            inicio = time.perf_counter()
+            try:
+                ok = await requisicao_asgi(handler, caminho, cookie) == 200
+            except Exception:
+                ok = False
+            return time.perf_counter() - inicio, ok
+
+    async def executar():
+        await requisicao_asgi(handler, caminho, cookie)  # aquecimento
+        limite = asyncio.Semaphore(concorrencia)
+        inicio = time.perf_counter()
+        medidas = await asyncio.gather(*(medir(limite) for _ in range(requisicoes)))
+        return medidas, time.perf_counter() - inicio
+
+    return asyncio.run(executar())
+
+
+def resumo(medidas, total):
+    tempos = sorted(segundos * 1000 for segundos, _ in medidas)
+    return {
+        'vazao': len(medidas) / total,
+        'p50': statistics.median(tempos),
+        'p95': tempos[max(0, round(len(tempos) * 0.95) - 1)],
+        'falhas': sum(1 for _, ok in medidas if not ok),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão dos dashboards servidos pelo WSGIHandler e pelo ASGIHandler sob carga concorrente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Username cuja sessão faz as requisições')
+        parser.add_argument(
+            '--rota', action='append', dest='rotas',
+            help='Nome de URL a medir (repetível; padrão: os dashboards do papel do usuário)',
+        )
+        parser.add_argument('--requisicoes', type=int, default=200, help='Requisições por rota e caminho')
+        parser.add_argument('--concorrencia', type=int, default=20, help='Requisições em voo no caminho ASGI')
+        parser.add_argument('--threads', type=int, default=8, help='Threads do servidor no caminho WSGI')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+        rotas = options['rotas'] or ROTAS_POR_PAPEL.get(resolver_perfil(usuario).papel)
+        if not rotas:
+            raise CommandError('O usuário não tem papel com dashboards; informe --rota.')
+
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.stdout.write(
+            f"{options['requisicoes']} requisições por rota; WSGI com {options['threads']} threads, "
+            f"ASGI com {options['concorrencia']} em voo"
+        )
+
+        for rota in rotas:
+            caminho = reverse(rota)
+            for modo, medidas, total in (
+                ('wsgi', *carga_wsgi(caminho, cookie, options['requisicoes'], options['threads'])),
+                ('asgi', *carga_asgi(caminho, cookie, options['requisicoes'], options['concorrencia'])),
+            ):
+                dados = resumo(medidas, total)
+                self.stdout.write(
+                    f"{rota:<20} {modo}  {dados['vazao']:8.1f} req/s  p50 {dados['p50']:7.1f} ms  "
+                    f"p95 {dados['p95']:7.1f} ms  falhas {dados['falhas']}"
+                )
@@ -0,0 +1,23 @@
+from django.conf import settings
+
+from Administrador.caixa_saida import despachar
+from Administrador.management.laco import ComandoPeriodico
+
+
+class Command(ComandoPeriodico):
+    help = (
+        'Worker da caixa de saída: envia os e-mails de confirmação, cancelamento e conclusão '
+        '(processo contínuo; use --uma-vez para esvaziar a fila uma vez, ex.: cron)'
+    )
+
+    def intervalo_padrao(self):
+        return getattr(settings, 'EMAILS_INTERVALO', 5)
+
+    def ciclo(self):
+        # Lotes seguidos enquanto houver e-mails prontos para envio
+        while True:
+            enviados, falhas = despachar()
+            if enviados or falhas:
+                self.stdout.write(f'{enviados} e-mail(s) enviado(s), {falhas} falha(s).')
+            if not enviados and not falhas:
+                break
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from Administrador.limpeza import executar_tarefa, tarefas_para_retomar
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as limpezas de dados pendentes e retoma as que foram interrompidas '
+        '(ex.: o servidor reiniciou no meio da execução)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--erros', action='store_true',
+            help='Também tenta de novo as tarefas que terminaram com erro',
+        )
+
+    def handle(self, *args, **options):
+        tarefas = list(tarefas_para_retomar(incluir_erros=options['erros']))
+        if not tarefas:
+            self.stdout.write('Nenhuma limpeza pendente.')
+            return
+
+        for tarefa in tarefas:
+            self.stdout.write(f'Executando limpeza #{tarefa.pk} ({tarefa.get_tipo_display()})...')
+            if not executar_tarefa(tarefa.pk, retomar_erro=options['erros']):
+                self.stdout.write(f'  #{tarefa.pk} já está sendo executada por outro processo.')
+                continue
+            tarefa.refresh_from_db()
+            mensagem = f'  #{tarefa.pk}: {tarefa.get_status_display()} - {tarefa.total_removidos} registros removidos'
+            if tarefa.status == 'erro':
+                self.stdout.write(self.style.ERROR(f'{mensagem} ({tarefa.erro})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(mensagem))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from Administrador import busca
+from Administrador.caches import incrementar_geracao, invalidar_resumo_cliente
+from Administrador.motos import mesclar_motos
+
+
+class Command(BaseCommand):
+    help = (
+        'Separa as motos compartilhadas entre clientes e junta as motos duplicadas de cada cliente, '
+        'apontando os agendamentos para a moto que fica'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Motos lidas por lote ao preencher a chave da placa')
+
+    def handle(self, *args, **options):
+        resultado = mesclar_motos(lote=options['lote'])
+
+        # As atualizações em massa não passam pelos sinais
+        if resultado['motos']:
+            busca.AGENDAMENTOS.atualizar(moto_id__in=resultado['motos'])
+        for cliente_id in resultado['clientes']:
+            invalidar_resumo_cliente(cliente_id)
+        incrementar_geracao('agendamentos', 'motos', *(f'cliente:{pk}' for pk in resultado['clientes']))
+
+        self.stdout.write(
+            f"{resultado['criadas']} motos criadas para clientes que usavam a moto de outro, "
+            f"{resultado['mescladas']} duplicadas mescladas, {resultado['orfas']} sem dono removidas."
+        )
+        self.stdout.write(self.style.SUCCESS('Motos mescladas.'))
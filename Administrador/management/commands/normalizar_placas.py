@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Administrador.models import Moto
+from Administrador.placas import preencher_placas
+
+
+class Command(BaseCommand):
+    help = (
+        'Preenche Moto.placa_normalizada das motos existentes em lotes por id '
+        '(depois de cargas feitas por fora do ORM, que não passam pelo save())'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Motos lidas por transação')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        lidas = atualizadas = 0
+        for lidas, atualizadas, ultimo_id in preencher_placas(Moto, options['lote']):
+            self.stdout.write(f'{lidas} motos lidas, {atualizadas} atualizadas (até o id {ultimo_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Placas normalizadas: {atualizadas} de {lidas} motos atualizadas.'))
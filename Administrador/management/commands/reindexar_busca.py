@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Administrador.busca import AGENDAMENTOS, INDICES
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói os índices do autocompletar de clientes e mecânicos e da busca textual '
+        'de agendamentos (depois de cargas feitas por fora do ORM, que não passam pelos sinais)'
+    )
+
+    def handle(self, *args, **options):
+        for tipo, indice in {**INDICES, 'agendamentos': AGENDAMENTOS}.items():
+            if not indice.disponivel:
+                self.stdout.write(f'{tipo}: o banco não usa índice próprio, nada a fazer.')
+                continue
+            with transaction.atomic():
+                linhas = indice.reconstruir()
+            self.stdout.write(f'{tipo}: {linhas} registros indexados.')
+        self.stdout.write(self.style.SUCCESS('Índices de busca reconstruídos.'))
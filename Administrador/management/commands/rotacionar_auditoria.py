@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from Administrador.particoes import rotacionar
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os meses fechados de LogAuditoria para as partições mensais e descarta '
+        'as partições fora da retenção (para rodar periodicamente, ex.: cron diário)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=None,
+            help='Meses mantidos, contando o corrente (padrão: AUDITORIA_MESES_RETENCAO)',
+        )
+
+    def handle(self, *args, **options):
+        resultado = rotacionar(meses_retencao=options['meses'])
+        for (ano, mes), linhas in sorted(resultado['movidos'].items()):
+            self.stdout.write(f'{mes:02d}/{ano}: {linhas} registros movidos para a partição.')
+        for ano, mes in resultado['descartadas']:
+            self.stdout.write(f'{mes:02d}/{ano}: partição descartada (fora da retenção).')
+        self.stdout.write(self.style.SUCCESS('Rotação da auditoria concluída.'))
@@ -0,0 +1,59 @@
+"""
+Base dos comandos que rodam como processo contínuo (agendar_lembretes, enviar_emails)
+"""
+import abc
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class ComandoPeriodico(BaseCommand, metaclass=abc.ABCMeta):
+    """
+    Executa ciclo() a cada `--intervalo` segundos até receber SIGTERM ou Ctrl+C
+
+    Com --uma-vez executa um único ciclo (para cron). Subclasses precisam
+    definir ciclo() e podem trocar intervalo_padrao().
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=None, help='Segundos entre os ciclos')
+        parser.add_argument('--uma-vez', action='store_true', help='Executa um ciclo e termina')
+
+    def intervalo_padrao(self):
+        return 60
+
+    @abc.abstractmethod
+    def ciclo(self):
+        """Uma rodada do trabalho; exceções são registradas e o laço continua"""
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo'] or self.intervalo_padrao()
+        self.parar = False
+        if options['uma_vez']:
+            self._executar_ciclo()
+            return
+
+        signal.signal(signal.SIGTERM, self._pedir_parada)
+        self.stdout.write(f'Iniciado (ciclo de {intervalo:g}s).')
+        try:
+            while not self.parar:
+                inicio = time.monotonic()
+                self._executar_ciclo()
+                # Dorme em passos curtos para atender ao SIGTERM rapidamente
+                while not self.parar and time.monotonic() - inicio < intervalo:
+                    time.sleep(min(1, intervalo))
+        except KeyboardInterrupt:
+            pass
+
+    def _executar_ciclo(self):
+        # Processo longo: descarta conexões quebradas ou velhas entre os ciclos
+        close_old_connections()
+        try:
+            self.ciclo()
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'Falha no ciclo: {e}'))
+
+    def _pedir_parada(self, signum, frame):
+        self.parar = True
@@ -0,0 +1,92 @@
+"""
+Middlewares do sistema da oficina
+
+Os dois atendem requisições síncronas e assíncronas: no servidor ASGI uma
+view assíncrona (os dashboards) não passa por nenhuma troca de thread só
+por causa deles.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from . import auditoria
+from .perfis import perfil_da_requisicao
+
+
+class MiddlewareSincronoAssincrono:
+    """Base: __call__ devolve a corrotina __acall__ quando a cadeia é assíncrona"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.processar(request)
+
+
+class PerfilMiddleware(MiddlewareSincronoAssincrono):
+    """
+    Expõe request.perfil (perfis.Perfil) com o papel do usuário logado
+
+    Preguiçoso: a sessão só é consultada quando a view usa request.perfil.
+    Views assíncronas usam perfis.aperfil_da_requisicao.
+    Deve vir depois de SessionMiddleware e AuthenticationMiddleware.
+    """
+
+    def processar(self, request):
+        request.perfil = SimpleLazyObject(lambda: perfil_da_requisicao(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.perfil = SimpleLazyObject(lambda: perfil_da_requisicao(request))
+        return await self.get_response(request)
+
+
+class AuditoriaMiddleware(MiddlewareSincronoAssincrono):
+    """
+    Registra em LogAuditoria as requisições que alteram dados
+
+    Também torna a requisição corrente visível para os sinais de auditoria
+    (usuário e IP). Métodos seguros (GET, HEAD, OPTIONS) não geram evento e
+    não tocam o banco. A gravação é em lote, ver auditoria.py.
+    """
+
+    METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def processar(self, request):
+        token = auditoria.iniciar_requisicao(request)
+        try:
+            response = self.get_response(request)
+            if request.method not in self.METODOS_SEGUROS:
+                self._registrar(request, response)
+            return response
+        finally:
+            auditoria.encerrar_requisicao(token)
+
+    async def __acall__(self, request):
+        token = auditoria.iniciar_requisicao(request)
+        try:
+            response = await self.get_response(request)
+            if request.method not in self.METODOS_SEGUROS:
+                # request.user pode ainda não ter sido carregado da sessão
+                await sync_to_async(self._registrar)(request, response)
+            return response
+        finally:
+            await auditoria.aencerrar_requisicao(token)
+
+    def _registrar(self, request, response):
+        rota = request.resolver_match
+        objeto_id = next(
+            (valor for valor in (rota.kwargs.values() if rota else ()) if isinstance(valor, int)), 0,
+        )
+        auditoria.registrar(
+            acao=request.method,
+            modelo=(rota.view_name if rota else '')[:50],
+            objeto_id=objeto_id,
+            descricao=f'{request.path} -> {response.status_code}',
+        )
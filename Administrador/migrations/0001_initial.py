@@ -0,0 +1,159 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:31
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfiguracaoAgendamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intervalo_agendamento', models.IntegerField(default=60, help_text='Intervalo em minutos')),
+                ('antecedencia_minima', models.IntegerField(default=24, help_text='Horas de antecedência')),
+                ('limite_agendamentos_dia', models.IntegerField(default=10)),
+                ('permite_agendamento_feriados', models.BooleanField(default=False)),
+                ('permite_reagendamento', models.BooleanField(default=True)),
+                ('tempo_limite_cancelamento', models.IntegerField(default=2, help_text='Horas antes do agendamento')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConfiguracaoNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_confirmacao', models.BooleanField(default=True)),
+                ('sms_lembrete', models.BooleanField(default=False)),
+                ('notificar_24h_antes', models.BooleanField(default=True)),
+                ('notificar_1h_antes', models.BooleanField(default=True)),
+                ('email_cancelamento', models.BooleanField(default=True)),
+                ('email_conclusao', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConfiguracaoOficina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome_oficina', models.CharField(default='Minha Oficina', max_length=200)),
+                ('endereco', models.TextField()),
+                ('telefone', models.CharField(max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('cnpj', models.CharField(max_length=18)),
+                ('horario_funcionamento_inicio', models.TimeField(default=datetime.time(8, 0))),
+                ('horario_funcionamento_fim', models.TimeField(default=datetime.time(18, 0))),
+                ('dias_funcionamento', models.CharField(default='Segunda a Sexta', max_length=100)),
+                ('logo', models.ImageField(blank=True, null=True, upload_to='logos/')),
+                ('tema', models.CharField(choices=[('azul', 'Azul Oficial'), ('verde', 'Verde Mecânico'), ('roxo', 'Roxo Premium'), ('vermelho', 'Vermelho Dinâmico'), ('escuro', 'Modo Escuro')], default='azul', max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Servicos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=150)),
+                ('data', models.DateField(auto_now_add=True)),
+                ('hora', models.TimeField(auto_now_add=True)),
+                ('descricao', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Administrador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('telefone', models.CharField(max_length=15)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Cliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome_completo', models.CharField(default='Nome Completo', max_length=255)),
+                ('cpf', models.CharField(default='000.000.000-00', max_length=14)),
+                ('email', models.EmailField(default='email@exemplo.com', max_length=254, unique=True)),
+                ('telefone', models.CharField(max_length=15)),
+                ('endereco', models.CharField(max_length=255)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cliente', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LogAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('acao', models.CharField(max_length=100)),
+                ('modelo', models.CharField(max_length=50)),
+                ('objeto_id', models.IntegerField()),
+                ('descricao', models.TextField()),
+                ('data_hora', models.DateTimeField(auto_now_add=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-data_hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mecanico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('especialidade', models.CharField(max_length=100)),
+                ('telefone', models.CharField(max_length=15)),
+                ('nome_completo', models.CharField(default='Nome Completo', max_length=200)),
+                ('disponibilidade', models.CharField(default='Segunda a Sexta 8h-17h', max_length=100)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='mecanico', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Moto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marca', models.CharField(max_length=100)),
+                ('modelo', models.CharField(max_length=100)),
+                ('ano', models.IntegerField()),
+                ('placa', models.CharField(blank=True, max_length=10, null=True)),
+                ('cor', models.CharField(blank=True, max_length=50, null=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='motos', to='Administrador.cliente')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Agendamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao_problema', models.TextField(blank=True, null=True)),
+                ('descricao_mecanico', models.TextField(blank=True, null=True, verbose_name='Descrição do Mecânico')),
+                ('valor_servico', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Valor do Serviço')),
+                ('data_hora', models.DateTimeField()),
+                ('status', models.CharField(choices=[('agendado', 'Agendado'), ('em_andamento', 'Em Andamento'), ('concluido', 'Concluído'), ('cancelado', 'Cancelado')], default='agendado', max_length=50)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Administrador.cliente')),
+                ('mecanico', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='Administrador.mecanico')),
+                ('moto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Administrador.moto')),
+                ('servico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Administrador.servicos')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrdemServico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao_cliente', models.TextField(blank=True, null=True)),
+                ('descricao_servico', models.TextField()),
+                ('custo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True)),
+                ('observacoes', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('em_andamento', 'Em Andamento'), ('concluido', 'Concluído'), ('cancelado', 'Cancelado')], default='pendente', max_length=50)),
+                ('agendamento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='Administrador.agendamento')),
+            ],
+        ),
+    ]
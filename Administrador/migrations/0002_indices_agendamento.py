@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['cliente', 'status', 'data_hora'], name='agend_cliente_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['mecanico', 'status', 'data_hora'], name='agend_mecanico_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['status', 'data_hora'], name='agend_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['data_hora', 'id'], name='agend_data_hora_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(condition=models.Q(('status', 'agendado')), fields=['data_hora'], name='agend_fila_pendente_idx'),
+        ),
+    ]
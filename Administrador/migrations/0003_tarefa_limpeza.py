@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0002_indices_agendamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaLimpeza',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('agendamentos', 'Agendamentos antigos'), ('reset_total', 'Reset total')], max_length=30)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('data_limite', models.DateTimeField(blank=True, null=True)),
+                ('etapa', models.CharField(blank=True, default='', max_length=50)),
+                ('total_estimado', models.IntegerField(default=0)),
+                ('total_removidos', models.IntegerField(default=0)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizada_em', models.DateTimeField(auto_now=True)),
+                ('criada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-criada_em'],
+            },
+        ),
+    ]
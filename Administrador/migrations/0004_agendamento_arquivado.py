@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0003_tarefa_limpeza'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarefalimpeza',
+            name='tipo',
+            field=models.CharField(choices=[('agendamentos', 'Agendamentos antigos'), ('arquivamento', 'Arquivamento de agendamentos antigos'), ('reset_total', 'Reset total')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='AgendamentoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('mes', models.DateField()),
+                ('data_hora', models.DateTimeField()),
+                ('status', models.CharField(choices=[('agendado', 'Agendado'), ('em_andamento', 'Em Andamento'), ('concluido', 'Concluído'), ('cancelado', 'Cancelado')], max_length=50)),
+                ('valor_servico', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('cliente_id', models.BigIntegerField()),
+                ('cliente_nome', models.CharField(max_length=255)),
+                ('mecanico_id', models.BigIntegerField(blank=True, null=True)),
+                ('mecanico_nome', models.CharField(blank=True, default='', max_length=200)),
+                ('moto_id', models.BigIntegerField(blank=True, null=True)),
+                ('moto_marca', models.CharField(max_length=100)),
+                ('moto_modelo', models.CharField(max_length=100)),
+                ('moto_ano', models.IntegerField(blank=True, null=True)),
+                ('moto_placa', models.CharField(blank=True, default='', max_length=10)),
+                ('servico_nome', models.CharField(max_length=150)),
+                ('conteudo', models.BinaryField()),
+                ('arquivado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente_id', 'status', 'data_hora'], name='arq_cliente_status_idx'), models.Index(fields=['mecanico_id', 'status', 'data_hora'], name='arq_mecanico_status_idx'), models.Index(fields=['mes'], name='arq_mes_idx')],
+            },
+        ),
+    ]
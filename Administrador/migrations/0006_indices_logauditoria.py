@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0005_logauditoria_data_hora_evento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['data_hora'], name='logaud_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['usuario', 'data_hora'], name='logaud_usuario_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['modelo', 'objeto_id'], name='logaud_modelo_objeto_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0006_indices_logauditoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LembreteEnviado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('24h', '24 horas antes'), ('1h', '1 hora antes')], max_length=10)),
+                ('canal', models.CharField(choices=[('email', 'E-mail'), ('sms', 'SMS')], max_length=10)),
+                ('data_hora', models.DateTimeField()),
+                ('status', models.CharField(choices=[('enviando', 'Enviando'), ('enviado', 'Enviado'), ('erro', 'Erro')], default='enviando', max_length=20)),
+                ('tentativas', models.PositiveSmallIntegerField(default=1)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('agendamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to='Administrador.agendamento')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('agendamento', 'tipo', 'canal', 'data_hora'), name='lembrete_unico')],
+            },
+        ),
+    ]
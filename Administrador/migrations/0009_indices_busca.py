@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+# Tabelas FTS5 (trigram) do autocompletar de clientes e mecânicos (ver busca.py).
+# Só no SQLite; nos outros bancos a busca não usa tabela própria.
+INDICES = {
+    'Administrador_cliente_busca': (
+        ['nome_completo', 'cpf', 'email', 'username'],
+        'SELECT c.id, c.nome_completo, c.cpf, c.email, u.username '
+        'FROM Administrador_cliente c INNER JOIN auth_user u ON u.id = c.usuario_id',
+    ),
+    'Administrador_mecanico_busca': (
+        ['nome_completo', 'email', 'username'],
+        'SELECT m.id, m.nome_completo, u.email, u.username '
+        'FROM Administrador_mecanico m INNER JOIN auth_user u ON u.id = m.usuario_id',
+    ),
+}
+
+
+def criar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabela, (colunas, select) in INDICES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {tabela} USING fts5({', '.join(colunas)}, tokenize='trigram')"
+        )
+        schema_editor.execute(f"INSERT INTO {tabela} (rowid, {', '.join(colunas)}) {select}")
+
+
+def descartar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabela in INDICES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {tabela}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0008_email_saida'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, descartar_indices),
+    ]
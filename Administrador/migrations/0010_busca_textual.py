@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+# Tabela FTS5 da busca textual de agendamentos (ver busca.AGENDAMENTOS).
+# Só no SQLite; no PostgreSQL a busca usa SearchVector sobre as próprias tabelas.
+TABELA = 'Administrador_agendamento_busca'
+COLUNAS = ['cliente', 'marca', 'modelo', 'placa', 'servico', 'problema', 'mecanico', 'ordem', 'observacoes']
+SELECT = (
+    'SELECT a.id, c.nome_completo, m.marca, m.modelo, m.placa, s.nome, a.descricao_problema, '
+    'a.descricao_mecanico, o.descricao_servico, o.observacoes '
+    'FROM Administrador_agendamento a '
+    'INNER JOIN Administrador_cliente c ON c.id = a.cliente_id '
+    'INNER JOIN Administrador_moto m ON m.id = a.moto_id '
+    'INNER JOIN Administrador_servicos s ON s.id = a.servico_id '
+    'LEFT OUTER JOIN Administrador_ordemservico o ON o.agendamento_id = a.id'
+)
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {TABELA} USING fts5({', '.join(COLUNAS)}, "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(f"INSERT INTO {TABELA} (rowid, {', '.join(COLUNAS)}) {SELECT}")
+
+
+def descartar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0009_indices_busca'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, descartar_indice),
+    ]
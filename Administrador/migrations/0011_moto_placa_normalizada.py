@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0010_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moto',
+            name='placa_normalizada',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=10, null=True),
+        ),
+    ]
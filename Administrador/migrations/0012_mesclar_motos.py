@@ -0,0 +1,112 @@
+import re
+
+from django.db import migrations
+from django.db.models import Count, F, Min, Q, Value
+from django.db.models.functions import Lower
+
+
+# As restrições únicas de Moto (0013) exigem que cada cliente tenha uma moto
+# por placa e que motos compartilhadas entre clientes sejam separadas antes.
+# Cópia congelada de placas.normalizar_placa / preencher_placas e de
+# motos.mesclar_motos: a migração não pode mudar junto com o código da app.
+PLACA_ANTIGA = re.compile(r'[A-Z]{3}[0-9]{4}')
+LETRAS_MERCOSUL = 'ABCDEFGHIJ'
+LOTE = 500
+
+
+def normalizar_placa(valor):
+    placa = re.sub(r'[^0-9A-Z]', '', (valor or '').upper())
+    if PLACA_ANTIGA.fullmatch(placa):
+        return f'{placa[:4]}{LETRAS_MERCOSUL[int(placa[4])]}{placa[5:]}'
+    return placa or None
+
+
+def preencher_placas(Moto):
+    ultimo_id = 0
+    while True:
+        motos = list(
+            Moto.objects.filter(pk__gt=ultimo_id).order_by('pk').only('pk', 'placa', 'placa_normalizada')[:LOTE]
+        )
+        if not motos:
+            return
+        ultimo_id = motos[-1].pk
+        mudaram = []
+        for moto in motos:
+            chave = normalizar_placa(moto.placa)
+            if moto.placa_normalizada != chave:
+                moto.placa_normalizada = chave
+                mudaram.append(moto)
+        Moto.objects.bulk_update(mudaram, ['placa_normalizada'])
+
+
+def procurar(motos, moto):
+    if moto.placa_normalizada:
+        return motos.filter(placa_normalizada=moto.placa_normalizada).first()
+    return motos.filter(placa_normalizada__isnull=True, ano=moto.ano).alias(
+        marca_chave=Lower('marca'), modelo_chave=Lower('modelo'),
+    ).filter(marca_chave=Lower(Value(moto.marca)), modelo_chave=Lower(Value(moto.modelo))).first()
+
+
+def separar_compartilhadas(Moto, Agendamento, AgendamentoArquivado):
+    # Cada agendamento passa a usar uma moto do próprio cliente
+    pares = list(
+        Agendamento.objects.filter(Q(moto__cliente__isnull=True) | ~Q(moto__cliente_id=F('cliente_id')))
+        .values_list('moto_id', 'cliente_id').distinct().order_by('moto_id', 'cliente_id')
+    )
+    originais = Moto.objects.in_bulk({moto_id for moto_id, _ in pares})
+    for moto_id, cliente_id in pares:
+        original = originais[moto_id]
+        destino = procurar(Moto.objects.filter(cliente_id=cliente_id), original)
+        if destino is None and original.cliente_id is None:
+            # Moto sem dono: fica com o primeiro cliente que a usou
+            Moto.objects.filter(pk=moto_id).update(cliente_id=cliente_id)
+            original.cliente_id = cliente_id
+            continue
+        if destino is None:
+            destino = Moto.objects.create(
+                cliente_id=cliente_id, marca=original.marca, modelo=original.modelo, ano=original.ano,
+                placa=original.placa, placa_normalizada=original.placa_normalizada, cor=original.cor,
+            )
+        Agendamento.objects.filter(moto_id=moto_id, cliente_id=cliente_id).update(moto_id=destino.pk)
+        AgendamentoArquivado.objects.filter(moto_id=moto_id, cliente_id=cliente_id).update(moto_id=destino.pk)
+
+
+def juntar_duplicadas(Moto, Agendamento, AgendamentoArquivado):
+    # Motos do mesmo cliente com a mesma identidade ficam na mais antiga
+    for filtro, campos in (
+        (Q(placa_normalizada__isnull=False), ['cliente_id', 'placa_normalizada']),
+        (Q(placa_normalizada__isnull=True), ['cliente_id', 'marca_chave', 'modelo_chave', 'ano']),
+    ):
+        motos = Moto.objects.filter(filtro, cliente__isnull=False).annotate(
+            marca_chave=Lower('marca'), modelo_chave=Lower('modelo'),
+        )
+        grupos = motos.values(*campos).annotate(fica=Min('pk'), total=Count('pk')).filter(total__gt=1).order_by()
+        for grupo in grupos:
+            fica = grupo.pop('fica')
+            del grupo['total']
+            sairam = list(motos.filter(**grupo).exclude(pk=fica).values_list('pk', flat=True))
+            Agendamento.objects.filter(moto_id__in=sairam).update(moto_id=fica)
+            AgendamentoArquivado.objects.filter(moto_id__in=sairam).update(moto_id=fica)
+            Moto.objects.filter(pk__in=sairam).delete()
+
+
+def mesclar(apps, schema_editor):
+    Moto = apps.get_model('Administrador', 'Moto')
+    Agendamento = apps.get_model('Administrador', 'Agendamento')
+    AgendamentoArquivado = apps.get_model('Administrador', 'AgendamentoArquivado')
+
+    preencher_placas(Moto)
+    separar_compartilhadas(Moto, Agendamento, AgendamentoArquivado)
+    juntar_duplicadas(Moto, Agendamento, AgendamentoArquivado)
+    Moto.objects.filter(cliente__isnull=True, agendamento__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0011_moto_placa_normalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(mesclar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:29
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0012_mesclar_motos'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='moto',
+            constraint=models.UniqueConstraint(condition=models.Q(('placa_normalizada__isnull', False)), fields=('cliente', 'placa_normalizada'), name='moto_placa_unica_por_cliente'),
+        ),
+        migrations.AddConstraint(
+            model_name='moto',
+            constraint=models.UniqueConstraint(models.F('cliente'), django.db.models.functions.text.Lower('marca'), django.db.models.functions.text.Lower('modelo'), models.F('ano'), condition=models.Q(('placa_normalizada__isnull', True)), name='moto_sem_placa_unica_por_cliente'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Preenche Servicos.nome_normalizado e junta no mais antigo os serviços com o
+# mesmo nome normalizado (get_or_create por nome exato criava "Revisão" e
+# "revisao"), para o índice único da 0015.
+def normalizar_nome(nome):
+    # Cópia congelada de Servicos.normalizar_nome
+    decomposto = unicodedata.normalize('NFKD', nome or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def preencher(apps, schema_editor):
+    Servicos = apps.get_model('Administrador', 'Servicos')
+    Agendamento = apps.get_model('Administrador', 'Agendamento')
+
+    ficam, preenchidos, sairam = {}, [], {}
+    for servico in Servicos.objects.order_by('pk').only('pk', 'nome'):
+        chave = normalizar_nome(servico.nome)
+        if chave in ficam:
+            sairam.setdefault(ficam[chave], []).append(servico.pk)
+        else:
+            ficam[chave] = servico.pk
+            servico.nome_normalizado = chave
+            preenchidos.append(servico)
+    Servicos.objects.bulk_update(preenchidos, ['nome_normalizado'], batch_size=500)
+    for fica, ids in sairam.items():
+        Agendamento.objects.filter(servico_id__in=ids).update(servico_id=fica)
+        Servicos.objects.filter(pk__in=ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0013_moto_unica_por_cliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicos',
+            name='nome_normalizado',
+            field=models.CharField(editable=False, max_length=150, null=True),
+        ),
+        migrations.RunPython(preencher, migrations.RunPython.noop),
+    ]
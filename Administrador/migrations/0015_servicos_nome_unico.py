@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Administrador', '0014_servicos_nome_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicos',
+            name='nome_normalizado',
+            field=models.CharField(editable=False, max_length=150, unique=True),
+        ),
+    ]
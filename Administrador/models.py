@@ -1,11 +1,22 @@
+import json
+import unicodedata
+import zlib
+from types import SimpleNamespace
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.functional import cached_property
 from datetime import time
 
+from .placas import normalizar_placa
+
 
 class Servicos(models.Model):
     nome = models.CharField(max_length=150)
+    # Chave do catálogo (servicos.py), mantida pelo save(): um serviço por nome
+    nome_normalizado = models.CharField(max_length=150, unique=True, editable=False)
     data = models.DateField(auto_now_add=True)
     hora = models.TimeField(auto_now_add=True)
     descricao = models.TextField()
@@ -13,6 +24,19 @@ class Servicos(models.Model):
     def __str__(self):
         return self.nome
     
+    @staticmethod
+    def normalizar_nome(nome):
+        """Sem acentos, maiúsculas ou espaços repetidos: 'Revisão  Geral' e 'revisao geral' são o mesmo serviço"""
+        decomposto = unicodedata.normalize('NFKD', nome or '')
+        return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+    
+    def save(self, *args, **kwargs):
+        self.nome_normalizado = self.normalizar_nome(self.nome)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nome_normalizado'}
+        super().save(*args, **kwargs)
+    
     
     
     
@@ -22,13 +46,35 @@ class Moto(models.Model):
     modelo = models.CharField(max_length=100)
     ano = models.IntegerField()
     placa = models.CharField(max_length=10, null=True, blank=True)
+    # Chave de busca da placa (placas.py), mantida pelo save()
+    placa_normalizada = models.CharField(max_length=10, null=True, blank=True, editable=False, db_index=True)
     cor = models.CharField(max_length=50, null=True, blank=True)
     
     def __str__(self):
         return f"{self.marca} {self.modelo} ({self.ano})"
     
+    def save(self, *args, **kwargs):
+        self.placa_normalizada = normalizar_placa(self.placa)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'placa' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'placa_normalizada'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['-id']
+        # Identidade da moto dentro do cliente (motos.resolver_moto)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cliente', 'placa_normalizada'],
+                condition=models.Q(placa_normalizada__isnull=False),
+                name='moto_placa_unica_por_cliente',
+            ),
+            models.UniqueConstraint(
+                'cliente', Lower('marca'), Lower('modelo'), 'ano',
+                condition=models.Q(placa_normalizada__isnull=True),
+                name='moto_sem_placa_unica_por_cliente',
+            ),
+        ]
     
 #Sem __str__ mostraria: <Moto object (1)>
 # Com __str__ mostra: "Yamaha MT-07 - XYZ-9876"
@@ -75,6 +121,13 @@ class Cliente(models.Model):
     
     
 class Agendamento(models.Model):
+    STATUS_CHOICES = [
+        ('agendado', 'Agendado'),
+        ('em_andamento', 'Em Andamento'),
+        ('concluido', 'Concluído'),
+        ('cancelado', 'Cancelado')
+    ]
+
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
     mecanico = models.ForeignKey(Mecanico, on_delete=models.CASCADE, null=True, blank=True)  # Agora é opcional
     servico = models.ForeignKey(Servicos, on_delete=models.CASCADE)
@@ -83,16 +136,26 @@ class Agendamento(models.Model):
     valor_servico = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Valor do Serviço')
     data_hora = models.DateTimeField()
     moto = models.ForeignKey(Moto, on_delete=models.CASCADE)
-    status = models.CharField(max_length=50, choices=[
-        ('agendado', 'Agendado'),
-        ('em_andamento', 'Em Andamento'),
-        ('concluido', 'Concluído'),
-        ('cancelado', 'Cancelado')
-    ], default='agendado')
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='agendado')
     
     def __str__(self):
         return f"{self.servico.nome} - {self.cliente.usuario.username}"
     
+    class Meta:
+        # Índices pensados para as consultas mais frequentes das views
+        indexes = [
+            # Dashboard e histórico do cliente: cliente + status, ordenado por data
+            models.Index(fields=['cliente', 'status', 'data_hora'], name='agend_cliente_status_idx'),
+            # Serviços do mecânico (em andamento / histórico)
+            models.Index(fields=['mecanico', 'status', 'data_hora'], name='agend_mecanico_status_idx'),
+            # Filtro por status com ordenação por data (listagens e lembretes)
+            models.Index(fields=['status', 'data_hora'], name='agend_status_data_idx'),
+            # Intervalos de data e paginação por cursor em (data_hora, id)
+            models.Index(fields=['data_hora', 'id'], name='agend_data_hora_id_idx'),
+            # Fila de serviços disponíveis para os mecânicos (índice parcial)
+            models.Index(fields=['data_hora'], condition=models.Q(status='agendado'), name='agend_fila_pendente_idx'),
+        ]
+    
     
     
 class OrdemServico(models.Model):
@@ -165,7 +228,8 @@ class LogAuditoria(models.Model):
     modelo = models.CharField(max_length=50)
     objeto_id = models.IntegerField()
     descricao = models.TextField()
-    data_hora = models.DateTimeField(auto_now_add=True)
+    # default e não auto_now_add: a gravação é em lote (auditoria.py) e o horário é o do evento
+    data_hora = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
     def __str__(self):
@@ -173,6 +237,205 @@ class LogAuditoria(models.Model):
     
     class Meta:
         ordering = ['-data_hora']
+        # Só o mês corrente fica nesta tabela; os meses fechados vão para as
+        # partições mensais de particoes.py, criadas com os mesmos índices
+        indexes = [
+            models.Index(fields=['data_hora'], name='logaud_data_idx'),
+            models.Index(fields=['usuario', 'data_hora'], name='logaud_usuario_data_idx'),
+            models.Index(fields=['modelo', 'objeto_id'], name='logaud_modelo_objeto_idx'),
+        ]
+
+
+ 
+
+class TarefaLimpeza(models.Model):
+    """Limpeza de dados executada em segundo plano, em lotes (ver limpeza.py)"""
+    TIPO_CHOICES = [
+        ('agendamentos', 'Agendamentos antigos'),
+        ('arquivamento', 'Arquivamento de agendamentos antigos'),
+        ('reset_total', 'Reset total'),
+    ]
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
+    data_limite = models.DateTimeField(null=True, blank=True)
+    etapa = models.CharField(max_length=50, blank=True, default='')
+    total_estimado = models.IntegerField(default=0)
+    total_removidos = models.IntegerField(default=0)
+    erro = models.TextField(blank=True, default='')
+    criada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    atualizada_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.get_status_display()}"
+
+    class Meta:
+        ordering = ['-criada_em']
 
 
- 
\ No newline at end of file
+
+class AgendamentoArquivado(models.Model):
+    """
+    Agendamento concluído ou cancelado movido para o arquivo (ver arquivamento.py)
+
+    Cópia desnormalizada: não depende de Cliente, Moto ou Mecânico continuarem
+    existindo. As descrições e a ordem de serviço ficam compactadas em conteudo.
+    """
+    id = models.BigIntegerField(primary_key=True)  # mesmo id do Agendamento original
+    mes = models.DateField()  # primeiro dia do mês de data_hora - partição do arquivo
+    data_hora = models.DateTimeField()
+    status = models.CharField(max_length=50, choices=Agendamento.STATUS_CHOICES)
+    valor_servico = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    cliente_id = models.BigIntegerField()
+    cliente_nome = models.CharField(max_length=255)
+    mecanico_id = models.BigIntegerField(null=True, blank=True)
+    mecanico_nome = models.CharField(max_length=200, blank=True, default='')
+    moto_id = models.BigIntegerField(null=True, blank=True)
+    moto_marca = models.CharField(max_length=100)
+    moto_modelo = models.CharField(max_length=100)
+    moto_ano = models.IntegerField(null=True, blank=True)
+    moto_placa = models.CharField(max_length=10, blank=True, default='')
+    servico_nome = models.CharField(max_length=150)
+    conteudo = models.BinaryField()
+    arquivado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.servico_nome} - {self.cliente_nome} (arquivado)"
+
+    @cached_property
+    def dados(self):
+        """Descrições e ordem de serviço descompactadas"""
+        return json.loads(zlib.decompress(bytes(self.conteudo)))
+
+    # Mesma interface de Agendamento usada pelos templates de histórico
+    @property
+    def descricao_problema(self):
+        return self.dados.get('descricao_problema')
+
+    @property
+    def descricao_mecanico(self):
+        return self.dados.get('descricao_mecanico')
+
+    @property
+    def cliente(self):
+        return SimpleNamespace(id=self.cliente_id, nome_completo=self.cliente_nome)
+
+    @property
+    def mecanico(self):
+        if self.mecanico_id is None:
+            return None
+        return SimpleNamespace(id=self.mecanico_id, nome_completo=self.mecanico_nome)
+
+    @property
+    def moto(self):
+        return SimpleNamespace(
+            id=self.moto_id, marca=self.moto_marca, modelo=self.moto_modelo,
+            ano=self.moto_ano, placa=self.moto_placa,
+        )
+
+    @property
+    def servico(self):
+        return SimpleNamespace(nome=self.servico_nome)
+
+    class Meta:
+        indexes = [
+            # Mesmas consultas dos históricos do cliente e do mecânico
+            models.Index(fields=['cliente_id', 'status', 'data_hora'], name='arq_cliente_status_idx'),
+            models.Index(fields=['mecanico_id', 'status', 'data_hora'], name='arq_mecanico_status_idx'),
+            models.Index(fields=['mes'], name='arq_mes_idx'),
+        ]
+
+
+class LembreteEnviado(models.Model):
+    """
+    Lembrete de agendamento (24h/1h antes) por canal, registrado antes do envio (ver lembretes.py)
+
+    A restrição única garante no máximo um envio por agendamento, tipo, canal e
+    horário: um agendamento remarcado recebe os lembretes do novo horário.
+    """
+    TIPO_CHOICES = [
+        ('24h', '24 horas antes'),
+        ('1h', '1 hora antes'),
+    ]
+    CANAL_CHOICES = [
+        ('email', 'E-mail'),
+        ('sms', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('erro', 'Erro'),
+    ]
+
+    agendamento = models.ForeignKey(Agendamento, on_delete=models.CASCADE, related_name='lembretes')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    canal = models.CharField(max_length=10, choices=CANAL_CHOICES)
+    data_hora = models.DateTimeField()  # horário do agendamento quando o lembrete foi enviado
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='enviando')
+    tentativas = models.PositiveSmallIntegerField(default=1)
+    erro = models.TextField(blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.get_canal_display()}) - agendamento {self.agendamento_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['agendamento', 'tipo', 'canal', 'data_hora'], name='lembrete_unico',
+            ),
+        ]
+
+
+class EmailSaida(models.Model):
+    """
+    Caixa de saída de e-mails transacionais (ver caixa_saida.py)
+
+    Gravado na mesma transação da mudança de status do agendamento e enviado
+    depois pelo worker; chave impede que o mesmo aviso seja enfileirado duas vezes.
+    """
+    TIPO_CHOICES = [
+        ('confirmacao', 'Confirmação de agendamento'),
+        ('cancelamento', 'Cancelamento de agendamento'),
+        ('conclusao', 'Conclusão de serviço'),
+    ]
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('erro', 'Erro (nova tentativa agendada)'),
+        ('falhou', 'Falhou'),
+    ]
+
+    chave = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    agendamento = models.ForeignKey(Agendamento, on_delete=models.SET_NULL, null=True, blank=True)
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    lote = models.CharField(max_length=32, blank=True, default='')
+    erro = models.TextField(blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} para {self.destinatario} - {self.get_status_display()}"
+
+    class Meta:
+        ordering = ['-criado_em']
+        indexes = [
+            # Fila do worker: pendentes e erros cuja próxima tentativa já venceu
+            models.Index(fields=['status', 'proxima_tentativa'], name='email_saida_fila_idx'),
+        ]
@@ -0,0 +1,144 @@
+"""
+Motos dos agendamentos: resolução por cliente e placa e mescla de duplicadas
+
+Os formulários de agendamento mandam marca, modelo, ano e, opcionalmente, a
+placa. resolver_moto devolve a moto que o cliente já tem com esses dados e só
+cria uma quando não há nenhuma:
+
+- com placa, pela chave normalizada (cliente, placa_normalizada);
+- sem placa, entre as motos sem placa do cliente, por marca e modelo sem
+  diferenciar maiúsculas e pelo ano.
+
+As duas identidades são restrições únicas de Moto (migração 0013), que também
+servem de índice para a busca. Duas submissões simultâneas não criam duas
+motos: a segunda esbarra na restrição e relê a moto gravada pela primeira.
+
+Versões antigas procuravam só por marca, modelo e ano, criando motos sem
+cliente e reaproveitando a moto de um cliente no agendamento de outro.
+mesclar_motos (comando mesclar_motos; a migração 0012 tem uma cópia
+congelada) dá a cada cliente a própria moto, junta as duplicadas na mais
+antiga e aponta os agendamentos, inclusive os arquivados, para a que fica.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Value
+from django.db.models.functions import Lower
+
+from .models import Agendamento, AgendamentoArquivado, Moto
+from .placas import normalizar_placa, preencher_placas
+
+
+def _sem_placa(motos, marca, modelo, ano):
+    # Lower dos dois lados, como na restrição: a mesma regra do banco
+    return motos.filter(placa_normalizada__isnull=True, ano=ano).alias(
+        marca_chave=Lower('marca'), modelo_chave=Lower('modelo'),
+    ).filter(marca_chave=Lower(Value(marca)), modelo_chave=Lower(Value(modelo)))
+
+
+def _procurar(motos, marca, modelo, ano, chave):
+    if chave:
+        return motos.filter(placa_normalizada=chave).first()
+    return _sem_placa(motos, marca, modelo, ano).first()
+
+
+def resolver_moto(cliente, marca, modelo, ano, placa=None):
+    """
+    Moto do cliente com esses dados, criada só se ele ainda não a tiver
+
+    Uma placa nova vai para a moto sem placa do cliente com a mesma marca,
+    modelo e ano, se houver, em vez de virar outra moto.
+    """
+    marca, modelo, ano = marca.strip(), modelo.strip(), int(ano)
+    placa = (placa or '').strip().upper() or None
+    chave = normalizar_placa(placa)
+    motos = Moto.objects.filter(cliente=cliente)
+
+    moto = _procurar(motos, marca, modelo, ano, chave)
+    if moto is not None:
+        return moto
+    try:
+        # Savepoint: a transação de quem chamou continua válida depois do erro
+        with transaction.atomic():
+            moto = _sem_placa(motos, marca, modelo, ano).first() if chave else None
+            if moto is not None:
+                moto.placa = placa
+                moto.save(update_fields=['placa'])
+                return moto
+            return Moto.objects.create(cliente=cliente, marca=marca, modelo=modelo, ano=ano, placa=placa)
+    except IntegrityError:
+        # Outra requisição gravou a mesma moto primeiro
+        return _procurar(motos, marca, modelo, ano, chave)
+
+
+def _separar_compartilhadas(afetados):
+    """Cada agendamento passa a usar uma moto do próprio cliente; retorna as motos criadas"""
+    pares = list(
+        Agendamento.objects.filter(Q(moto__cliente__isnull=True) | ~Q(moto__cliente_id=F('cliente_id')))
+        .values_list('moto_id', 'cliente_id').distinct().order_by('moto_id', 'cliente_id')
+    )
+    originais = Moto.objects.in_bulk({moto_id for moto_id, _ in pares})
+    criadas = 0
+    for moto_id, cliente_id in pares:
+        original = originais[moto_id]
+        motos = Moto.objects.filter(cliente_id=cliente_id)
+        destino = _procurar(motos, original.marca, original.modelo, original.ano, original.placa_normalizada)
+        if destino is None and original.cliente_id is None:
+            # Moto sem dono: fica com o primeiro cliente que a usou
+            Moto.objects.filter(pk=moto_id).update(cliente_id=cliente_id)
+            original.cliente_id = cliente_id
+            afetados['clientes'].add(cliente_id)
+            continue
+        if destino is None:
+            destino = Moto.objects.create(
+                cliente_id=cliente_id, marca=original.marca, modelo=original.modelo, ano=original.ano,
+                placa=original.placa, placa_normalizada=original.placa_normalizada, cor=original.cor,
+            )
+            criadas += 1
+        Agendamento.objects.filter(moto_id=moto_id, cliente_id=cliente_id).update(moto_id=destino.pk)
+        AgendamentoArquivado.objects.filter(moto_id=moto_id, cliente_id=cliente_id).update(moto_id=destino.pk)
+        afetados['motos'].add(destino.pk)
+        afetados['clientes'].add(cliente_id)
+    return criadas
+
+
+def _juntar_duplicadas(afetados):
+    """Junta na moto mais antiga as motos do mesmo cliente com a mesma identidade; retorna as removidas"""
+    removidas = 0
+    for filtro, campos in (
+        (Q(placa_normalizada__isnull=False), ['cliente_id', 'placa_normalizada']),
+        (Q(placa_normalizada__isnull=True), ['cliente_id', 'marca_chave', 'modelo_chave', 'ano']),
+    ):
+        motos = Moto.objects.filter(filtro, cliente__isnull=False).annotate(
+            marca_chave=Lower('marca'), modelo_chave=Lower('modelo'),
+        )
+        grupos = motos.values(*campos).annotate(fica=Min('pk'), total=Count('pk')).filter(total__gt=1).order_by()
+        for grupo in grupos:
+            fica = grupo.pop('fica')
+            del grupo['total']
+            sairam = list(motos.filter(**grupo).exclude(pk=fica).values_list('pk', flat=True))
+            Agendamento.objects.filter(moto_id__in=sairam).update(moto_id=fica)
+            AgendamentoArquivado.objects.filter(moto_id__in=sairam).update(moto_id=fica)
+            Moto.objects.filter(pk__in=sairam).delete()
+            removidas += len(sairam)
+            afetados['motos'].add(fica)
+            afetados['clientes'].add(grupo['cliente_id'])
+    return removidas
+
+
+def mesclar_motos(lote=500):
+    """
+    Separa as motos compartilhadas entre clientes e junta as duplicadas
+
+    Retorna quantas motos foram criadas, mescladas e removidas por não terem
+    dono nem agendamento, e os ids de motos e clientes cujos agendamentos
+    mudaram.
+    """
+    afetados = {'motos': set(), 'clientes': set()}
+
+    # As identidades dependem da chave da placa
+    for _ in preencher_placas(Moto, lote):
+        pass
+    with transaction.atomic():
+        criadas = _separar_compartilhadas(afetados)
+        mescladas = _juntar_duplicadas(afetados)
+        orfas, _ = Moto.objects.filter(cliente__isnull=True, agendamento__isnull=True).delete()
+    return {'criadas': criadas, 'mescladas': mescladas, 'orfas': orfas, **afetados}
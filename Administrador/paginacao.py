@@ -0,0 +1,114 @@
+"""
+Paginação por cursor (keyset) sobre (data_hora, id)
+
+Em vez de OFFSET, cada página continua a partir da última linha da anterior,
+então o custo de uma página não cresce com o tamanho da tabela.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def codificar_cursor(data_hora, pk):
+    valor = f"{data_hora.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (data_hora, pk) ou None se o cursor for inválido"""
+    if not cursor:
+        return None
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data_hora, pk = valor.split('|')
+        return datetime.fromisoformat(data_hora), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def ler_por_pagina(valor):
+    """Tamanho de página vindo da URL, limitado por AGENDAMENTOS_POR_PAGINA_MAX"""
+    try:
+        por_pagina = int(valor)
+    except (TypeError, ValueError):
+        por_pagina = settings.AGENDAMENTOS_POR_PAGINA
+    return max(1, min(por_pagina, settings.AGENDAMENTOS_POR_PAGINA_MAX))
+
+
+class PaginaKeyset:
+    """Uma página de resultados e os cursores para navegar a partir dela"""
+
+    def __init__(self, itens, proximo_cursor=None, anterior_cursor=None):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.anterior_cursor = anterior_cursor
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def tem_anterior(self):
+        return self.anterior_cursor is not None
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _linhas(queryset, posicao, anterior, limite):
+    if posicao is None:
+        return list(queryset.order_by('-data_hora', '-id')[:limite])
+    data_hora, pk = posicao
+    if anterior:
+        depois = Q(data_hora__gt=data_hora) | Q(data_hora=data_hora, id__gt=pk)
+        return list(queryset.filter(depois).order_by('data_hora', 'id')[:limite])
+    antes = Q(data_hora__lt=data_hora) | Q(data_hora=data_hora, id__lt=pk)
+    return list(queryset.filter(antes).order_by('-data_hora', '-id')[:limite])
+
+
+def paginar_por_data(queryset, cursor=None, por_pagina=50, anterior=False, arquivo=None):
+    """
+    Pagina um queryset do mais recente para o mais antigo por (data_hora, id)
+
+    cursor: valor de PaginaKeyset.proximo_cursor ou anterior_cursor
+    anterior: True quando o cursor veio de anterior_cursor (voltando uma página)
+    arquivo: queryset de AgendamentoArquivado paginado junto com o principal;
+    as duas consultas usam o mesmo cursor e o resultado é intercalado, então a
+    navegação passa da tabela quente para o arquivo sem o usuário perceber
+    (os ids arquivados são os mesmos do Agendamento original e não se repetem).
+    """
+    posicao = decodificar_cursor(cursor)
+    if posicao is None:
+        anterior = False
+
+    linhas = _linhas(queryset, posicao, anterior, por_pagina + 1)
+    if arquivo is not None:
+        linhas = sorted(
+            linhas + _linhas(arquivo, posicao, anterior, por_pagina + 1),
+            key=lambda linha: (linha.data_hora, linha.pk),
+            reverse=not anterior,
+        )
+
+    ha_mais = len(linhas) > por_pagina
+    itens = linhas[:por_pagina]
+
+    if anterior:
+        itens.reverse()
+        tem_proxima, tem_anterior = True, ha_mais
+    else:
+        tem_proxima, tem_anterior = ha_mais, posicao is not None
+
+    if not itens:
+        return PaginaKeyset(itens)
+
+    primeiro, ultimo = itens[0], itens[-1]
+    return PaginaKeyset(
+        itens,
+        proximo_cursor=codificar_cursor(ultimo.data_hora, ultimo.pk) if tem_proxima else None,
+        anterior_cursor=codificar_cursor(primeiro.data_hora, primeiro.pk) if tem_anterior else None,
+    )
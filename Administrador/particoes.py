@@ -0,0 +1,178 @@
+"""
+Partições mensais de LogAuditoria
+
+LogAuditoria guarda só o mês corrente. rotacionar() copia cada mês fechado
+para uma tabela própria (Administrador_logauditoria_AAAAMM, com os mesmos
+índices) em um único INSERT ... SELECT e apaga o intervalo da tabela quente.
+A retenção (AUDITORIA_MESES_RETENCAO) descarta partições inteiras com DROP
+TABLE, sem apagar linha por linha.
+
+Cada partição tem um modelo não gerenciado criado sob demanda
+(modelo_particao), que o LogAuditoriaAdmin usa para consultar só o mês
+escolhido. Nas partições o usuário não é chave estrangeira no banco: o log
+de um usuário excluído continua no histórico.
+
+`python manage.py rotacionar_auditoria` executa a rotação (cron diário ou
+mensal).
+"""
+import re
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import LogAuditoria
+
+
+MESES_RETENCAO_PADRAO = 12
+
+PREFIXO_TABELA = f'{LogAuditoria._meta.db_table}_'
+_TABELA_PARTICAO = re.compile(rf'^{re.escape(PREFIXO_TABELA)}(\d{{4}})(\d{{2}})$')
+
+_modelos = {}
+_modelos_lock = threading.Lock()
+
+
+def inicio_do_mes(ano, mes):
+    ano, mes = divmod(ano * 12 + mes - 1, 12)
+    return timezone.make_aware(datetime(ano, mes + 1, 1))
+
+
+def intervalo_do_mes(periodo):
+    """(início, início do mês seguinte) de um período (ano, mês)"""
+    ano, mes = periodo
+    return inicio_do_mes(ano, mes), inicio_do_mes(ano, mes + 1)
+
+
+def ler_periodo(valor):
+    """'AAAA-MM' -> (ano, mês); None se inválido"""
+    encontrado = re.fullmatch(r'(\d{4})-(\d{2})', valor or '')
+    if not encontrado or not 1 <= int(encontrado[2]) <= 12:
+        return None
+    return int(encontrado[1]), int(encontrado[2])
+
+
+def periodo_de(data_hora):
+    local = timezone.localtime(data_hora)
+    return local.year, local.month
+
+
+def tabela_particao(periodo):
+    return f'{PREFIXO_TABELA}{periodo[0]:04d}{periodo[1]:02d}'
+
+
+def modelo_particao(periodo):
+    """Modelo não gerenciado com os campos e índices de LogAuditoria sobre a tabela do período"""
+    with _modelos_lock:
+        if periodo not in _modelos:
+            _modelos[periodo] = _construir_modelo(periodo)
+        return _modelos[periodo]
+
+
+def _construir_modelo(periodo):
+    sufixo = f'{periodo[0]:04d}{periodo[1]:02d}'
+    campos = {
+        '__module__': __name__,
+        # Sem restrição no banco: a partição guarda o log mesmo depois que o usuário é excluído
+        'usuario': models.ForeignKey(
+            User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+',
+        ),
+        'Meta': type('Meta', (), {
+            'app_label': LogAuditoria._meta.app_label,
+            'db_table': tabela_particao(periodo),
+            'managed': False,
+            'ordering': ['-data_hora'],
+            # Nomes de índice são globais no SQLite: cada partição usa o sufixo do período
+            'indexes': [
+                models.Index(fields=indice.fields, name=f"{indice.name.removesuffix('_idx')}_{sufixo}")
+                for indice in LogAuditoria._meta.indexes
+            ],
+        }),
+    }
+    for campo in LogAuditoria._meta.local_fields:
+        if campo.name not in campos:
+            campos[campo.name] = campo.clone()
+
+    return type(f'LogAuditoria{sufixo}', (models.Model,), campos)
+
+
+def particoes_existentes():
+    """Períodos (ano, mês) com partição no banco, do mais recente para o mais antigo"""
+    periodos = []
+    for tabela in connection.introspection.table_names():
+        encontrado = _TABELA_PARTICAO.match(tabela)
+        if encontrado:
+            periodos.append((int(encontrado[1]), int(encontrado[2])))
+    return sorted(periodos, reverse=True)
+
+
+def _criar_particao(periodo):
+    """
+    CREATE TABLE e índices da partição, executados direto no cursor: o
+    schema_editor do SQLite não pode ser aberto dentro de uma transação
+    """
+    modelo = modelo_particao(periodo)
+    editor = connection.schema_editor()
+    sql, params = editor.table_sql(modelo)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for indice in modelo._meta.indexes:
+            cursor.execute(str(indice.create_sql(modelo, editor)))
+    return modelo
+
+
+def _descartar_particao(periodo):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {connection.ops.quote_name(tabela_particao(periodo))}')
+
+
+def mover_mes(periodo, existentes=None):
+    """Copia um mês da tabela quente para a partição e o apaga da tabela quente"""
+    existentes = particoes_existentes() if existentes is None else existentes
+    inicio, fim = intervalo_do_mes(periodo)
+    colunas = [campo.column for campo in LogAuditoria._meta.local_fields]
+
+    with transaction.atomic():
+        modelo = modelo_particao(periodo) if periodo in existentes else _criar_particao(periodo)
+        do_mes = LogAuditoria.objects.filter(data_hora__gte=inicio, data_hora__lt=fim)
+        select, params = do_mes.order_by().values_list(*colunas).query.sql_with_params()
+        nomes = ', '.join(connection.ops.quote_name(coluna) for coluna in colunas)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {connection.ops.quote_name(modelo._meta.db_table)} ({nomes}) {select}', params,
+            )
+            movidos = cursor.rowcount
+        do_mes.delete()
+    return movidos
+
+
+def rotacionar(meses_retencao=None, agora=None):
+    """
+    Move os meses fechados para as partições e descarta as partições fora da
+    retenção. Retorna {'movidos': {periodo: linhas}, 'descartadas': [periodo]}.
+    """
+    if meses_retencao is None:
+        meses_retencao = getattr(settings, 'AUDITORIA_MESES_RETENCAO', MESES_RETENCAO_PADRAO)
+    ano, mes = periodo_de(agora or timezone.now())
+    mes_atual = inicio_do_mes(ano, mes)
+    # Meses anteriores a este saem da retenção (o mês corrente conta como um)
+    corte = inicio_do_mes(ano, mes - meses_retencao + 1)
+
+    # O que já está fora da retenção nem chega a ser copiado
+    LogAuditoria.objects.filter(data_hora__lt=corte).delete()
+
+    existentes = particoes_existentes()
+    movidos = {}
+    fechados = list(LogAuditoria.objects.filter(data_hora__lt=mes_atual).dates('data_hora', 'month'))
+    for dia in fechados:
+        periodo = (dia.year, dia.month)
+        movidos[periodo] = mover_mes(periodo, existentes)
+        existentes.append(periodo)
+
+    descartadas = [periodo for periodo in existentes if inicio_do_mes(*periodo) < corte]
+    for periodo in descartadas:
+        _descartar_particao(periodo)
+    return {'movidos': movidos, 'descartadas': sorted(descartadas)}
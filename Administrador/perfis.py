@@ -0,0 +1,157 @@
+"""
+Papel do usuário logado (administrador, cliente ou mecânico)
+
+O papel é resolvido com uma única query (o User com os três perfis
+OneToOne em LEFT JOIN) e guardado na sessão junto com o id do perfil. O
+PerfilMiddleware expõe o resultado em request.perfil, então as views não
+precisam repetir Cliente.objects.get(usuario=request.user).
+
+A sessão guarda também um token por usuário (caches.token_perfil) que os
+sinais trocam quando User ou algum perfil muda; com o token diferente o
+papel é resolvido de novo na requisição seguinte.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+
+from .caches import token_perfil
+from .models import Administrador, Cliente, Mecanico
+
+
+ADMINISTRADOR = 'administrador'
+CLIENTE = 'cliente'
+MECANICO = 'mecanico'
+PAPEIS = (ADMINISTRADOR, CLIENTE, MECANICO)  # ordem de prioridade
+
+CHAVE_SESSAO = 'perfil'
+
+
+class Perfil:
+    """
+    Papel principal do usuário e os ids dos perfis que ele possui
+
+    papel segue a prioridade do login (administrador, cliente, mecânico) e
+    decide o redirecionamento; ids guarda o pk de cada perfil existente, pois
+    um administrador também pode ter perfil de cliente.
+
+    cliente e mecanico carregam o objeto sob demanda (uma query por pk, no
+    máximo uma vez por requisição) e levantam DoesNotExist quando o usuário
+    não tem esse perfil, como Cliente.objects.get(usuario=...) faria.
+    """
+
+    def __init__(self, usuario, papel=None, ids=None, objetos=None):
+        self.usuario = usuario
+        self.papel = papel
+        self.ids = ids or {}
+        self._objetos = objetos or {}
+
+    @property
+    def eh_administrador(self):
+        return self.papel == ADMINISTRADOR
+
+    @property
+    def eh_cliente(self):
+        return self.papel == CLIENTE
+
+    @property
+    def eh_mecanico(self):
+        return self.papel == MECANICO
+
+    def _carregar(self, nome, modelo):
+        if self.ids.get(nome) is None:
+            raise modelo.DoesNotExist(f'Usuário sem perfil de {nome}.')
+        if nome not in self._objetos:
+            objeto = modelo.objects.get(pk=self.ids[nome])
+            objeto.usuario = self.usuario
+            self._objetos[nome] = objeto
+        return self._objetos[nome]
+
+    @property
+    def cliente(self):
+        return self._carregar(CLIENTE, Cliente)
+
+    @property
+    def mecanico(self):
+        return self._carregar(MECANICO, Mecanico)
+
+    def para_sessao(self):
+        return {
+            'usuario_id': self.usuario.pk,
+            'papel': self.papel,
+            'ids': self.ids,
+            'token': token_perfil(self.usuario.pk),
+        }
+
+
+def resolver_perfil(user):
+    """
+    Resolve papel e perfis com uma query (o User com os três OneToOne em
+    LEFT JOIN), na mesma prioridade do login: staff/superuser ou
+    Administrador, depois Cliente, depois Mecânico
+    """
+    if not user.is_authenticated:
+        return Perfil(user)
+
+    usuario = User.objects.select_related(*PAPEIS).get(pk=user.pk)
+    objetos = {}
+    for nome in PAPEIS:
+        try:
+            objetos[nome] = getattr(usuario, nome)
+        except (Administrador.DoesNotExist, Cliente.DoesNotExist, Mecanico.DoesNotExist):
+            pass
+
+    if usuario.is_staff or usuario.is_superuser:
+        papel = ADMINISTRADOR
+    else:
+        papel = next((nome for nome in PAPEIS if nome in objetos), None)
+
+    return Perfil(
+        user,
+        papel,
+        ids={nome: objeto.pk for nome, objeto in objetos.items()},
+        objetos=objetos,
+    )
+
+
+def guardar_perfil(request, perfil):
+    request.session[CHAVE_SESSAO] = perfil.para_sessao()
+
+
+def perfil_da_requisicao(request):
+    """Perfil guardado na sessão ou, se ausente ou desatualizado, resolvido de novo"""
+    user = request.user
+    if not user.is_authenticated:
+        return Perfil(user)
+
+    dados = request.session.get(CHAVE_SESSAO)
+    if (
+        dados
+        and dados.get('usuario_id') == user.pk
+        and dados.get('token') == token_perfil(user.pk)
+    ):
+        return Perfil(user, dados['papel'], dados['ids'])
+
+    perfil = resolver_perfil(user)
+    guardar_perfil(request, perfil)
+    return perfil
+
+
+async def aperfil_da_requisicao(request, carregar=None):
+    """
+    request.perfil para as views assíncronas: (perfil, objeto do perfil `carregar`)
+
+    A sessão e as queries rodam em uma única ida a sync_to_async; o objeto é
+    None se o usuário não tiver o perfil pedido ('cliente' ou 'mecanico').
+    """
+    def resolver():
+        perfil = request.perfil
+        perfil.papel  # resolve o SimpleLazyObject aqui, fora do loop de eventos
+        objeto = None
+        if carregar:
+            try:
+                objeto = getattr(perfil, carregar)
+            except ObjectDoesNotExist:
+                pass
+        return perfil, objeto
+
+    return await sync_to_async(resolver)()
@@ -0,0 +1,63 @@
+"""
+Placas de moto: chave normalizada para a busca por placa
+
+Moto.placa guarda a placa como foi digitada; Moto.placa_normalizada (indexada)
+guarda a chave: maiúsculas, sem hífen, ponto ou espaço e no padrão Mercosul.
+Uma placa antiga (ABC-1234) vira a Mercosul correspondente (ABC1C34: o
+segundo dígito vira letra, 0=A ... 9=J), que é a placa que a moto recebe na
+conversão, então as duas formas acham a mesma moto. Texto fora dos dois
+padrões fica só em maiúsculas e sem separadores, para que a mesma digitação
+continue encontrando a moto.
+
+preencher_placas grava a chave das motos que ainda não a têm (comandos
+normalizar_placas e mesclar_motos).
+"""
+import re
+
+from django.db import transaction
+
+
+PLACA_ANTIGA = re.compile(r'[A-Z]{3}[0-9]{4}')
+LETRAS_MERCOSUL = 'ABCDEFGHIJ'
+
+
+def normalizar_placa(valor):
+    """Chave de busca da placa; None quando não há placa"""
+    placa = re.sub(r'[^0-9A-Z]', '', (valor or '').upper())
+    if PLACA_ANTIGA.fullmatch(placa):
+        return f'{placa[:4]}{LETRAS_MERCOSUL[int(placa[4])]}{placa[5:]}'
+    return placa or None
+
+
+
+def preencher_placas(Moto, lote=500):
+    """
+    Grava placa_normalizada das motos em que ela falta ou ficou velha, em lotes por id
+
+    Recebe o modelo porque models.py importa este módulo. Gera (lidas,
+    atualizadas, último id) a cada lote.
+    """
+    ultimo_id = 0
+    lidas = atualizadas = 0
+    while True:
+        # Faixas de id em vez de OFFSET: cada lote parte do índice da chave primária
+        motos = list(
+            Moto.objects.filter(pk__gt=ultimo_id).order_by('pk')
+            .only('pk', 'placa', 'placa_normalizada')[:lote]
+        )
+        if not motos:
+            return
+        ultimo_id = motos[-1].pk
+
+        mudaram = []
+        for moto in motos:
+            chave = normalizar_placa(moto.placa)
+            if moto.placa_normalizada != chave:
+                moto.placa_normalizada = chave
+                mudaram.append(moto)
+        with transaction.atomic():
+            Moto.objects.bulk_update(mudaram, ['placa_normalizada'])
+
+        lidas += len(motos)
+        atualizadas += len(mudaram)
+        yield lidas, atualizadas, ultimo_id
@@ -0,0 +1,47 @@
+"""
+Catálogo de serviços usado pelos formulários de agendamento
+
+Os serviços mudam pouco e são lidos em todo agendamento: a lista dos
+selects, o serviço escolhido pelo id e o serviço digitado pelo nome. Tudo sai
+de caches.obter_catalogo_servicos, que lê a tabela uma vez por mudança.
+
+O nome digitado é comparado pela chave Servicos.nome_normalizado (sem
+acentos, maiúsculas ou espaços repetidos), que é única no banco: "Revisão" e
+"revisao" são o mesmo serviço. Um serviço novo é criado só quando a chave não
+está no catálogo, e duas submissões simultâneas com o mesmo nome não criam
+dois: a segunda esbarra no índice único e lê o serviço gravado pela primeira.
+"""
+from django.db import IntegrityError, transaction
+from django.http import Http404
+
+from .caches import obter_catalogo_servicos
+from .models import Servicos
+
+
+def listar_servicos():
+    """Todos os serviços em ordem de nome, para os selects"""
+    return list(obter_catalogo_servicos()['por_id'].values())
+
+
+def obter_servico(servico_id):
+    """Serviço do id (texto do formulário); Http404 se não existir"""
+    try:
+        return obter_catalogo_servicos()['por_id'][int(servico_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Http404('Serviço não encontrado')
+
+
+def servico_por_nome(nome, descricao):
+    """Serviço com esse nome, criado com a descrição se ainda não existir"""
+    nome = ' '.join(nome.split())
+    chave = Servicos.normalizar_nome(nome)
+    catalogo = obter_catalogo_servicos()
+    if chave in catalogo['por_nome']:
+        return catalogo['por_id'][catalogo['por_nome'][chave]]
+    try:
+        # Savepoint: a transação de quem chamou continua válida depois do erro
+        with transaction.atomic():
+            return Servicos.objects.create(nome=nome, descricao=descricao)
+    except IntegrityError:
+        # Criado por outra requisição depois da leitura do catálogo
+        return Servicos.objects.get(nome_normalizado=chave)
@@ -0,0 +1,258 @@
+"""
+Sinais dos modelos - mantêm os caches de caches.py (dados e gerações dos
+fragmentos) e os índices de busca (busca.py) coerentes com o banco,
+enfileiram os eventos de auditoria (auditoria.py) e alimentam a fila ao vivo
+dos mecânicos (fila_mecanico.py)
+"""
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import auditoria, busca, fila_mecanico
+from .caches import (
+    incrementar_geracao,
+    invalidar_configuracao_agendamento,
+    invalidar_configuracao_notificacao,
+    invalidar_configuracao_oficina,
+    invalidar_perfil,
+    invalidar_resumo_cliente,
+)
+from .models import (
+    Administrador, Agendamento, Cliente, ConfiguracaoAgendamento, ConfiguracaoNotificacao, ConfiguracaoOficina,
+    Mecanico, Moto, OrdemServico, Servicos,
+)
+
+
+# Enviado por transicoes.py: as transições usam QuerySet.update(), que não
+# dispara post_save. Argumentos: agendamento_id, status.
+agendamento_transicionado = Signal()
+
+
+@receiver(post_save, sender=ConfiguracaoOficina)
+@receiver(post_delete, sender=ConfiguracaoOficina)
+def limpar_cache_configuracao_oficina(sender, **kwargs):
+    invalidar_configuracao_oficina()
+
+
+@receiver(post_save, sender=ConfiguracaoAgendamento)
+@receiver(post_delete, sender=ConfiguracaoAgendamento)
+def limpar_cache_configuracao_agendamento(sender, **kwargs):
+    invalidar_configuracao_agendamento()
+
+
+@receiver(post_save, sender=ConfiguracaoNotificacao)
+@receiver(post_delete, sender=ConfiguracaoNotificacao)
+def limpar_cache_configuracao_notificacao(sender, **kwargs):
+    invalidar_configuracao_notificacao()
+
+
+def _nova_geracao(*entidades):
+    """
+    Invalida os fragmentos das entidades (caches.obter_fragmento)
+
+    De novo depois do commit: um fragmento gerado por quem leu os dados antes
+    do commit fica com a geração antiga.
+    """
+    incrementar_geracao(*entidades)
+    transaction.on_commit(lambda: incrementar_geracao(*entidades))
+
+
+# Donos com fragmentos próprios (cliente:<id>, mecanico:<id>) em cada modelo
+CAMPOS_DONO = {Agendamento: {'cliente', 'mecanico'}, Moto: {'cliente'}}
+
+
+@receiver(pre_save, sender=Agendamento)
+@receiver(pre_save, sender=Moto)
+def guardar_donos_anteriores(sender, instance, update_fields=None, **kwargs):
+    # Quem perde o agendamento (ou a moto) numa edição também tem o cache invalidado
+    campos = CAMPOS_DONO[sender]
+    instance._donos_anteriores = {}
+    if instance.pk is None:
+        return
+    if update_fields is not None and not campos & {campo.removesuffix('_id') for campo in update_fields}:
+        return
+    anteriores = sender.objects.filter(pk=instance.pk).values(*(f'{campo}_id' for campo in campos)).first()
+    if anteriores is not None:
+        instance._donos_anteriores = anteriores
+
+
+@receiver(post_save, sender=Agendamento)
+@receiver(post_delete, sender=Agendamento)
+@receiver(post_save, sender=Moto)
+@receiver(post_delete, sender=Moto)
+def limpar_cache_resumo_cliente(sender, instance, **kwargs):
+    anteriores = getattr(instance, '_donos_anteriores', {})
+    clientes = {instance.cliente_id, anteriores.get('cliente_id', instance.cliente_id)}
+    entidades = ['agendamentos' if sender is Agendamento else 'motos']
+    for cliente_id in clientes:
+        invalidar_resumo_cliente(cliente_id)
+        entidades.append(f'cliente:{cliente_id}')
+    if sender is Agendamento:
+        mecanicos = {instance.mecanico_id, anteriores.get('mecanico_id')} - {None}
+        entidades += [f'mecanico:{mecanico_id}' for mecanico_id in mecanicos]
+    _nova_geracao(*entidades)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def limpar_cache_resumo_do_proprio_cliente(sender, instance, **kwargs):
+    invalidar_resumo_cliente(instance.pk)
+    _nova_geracao(f'cliente:{instance.pk}', 'clientes')
+
+
+@receiver(post_save, sender=Servicos)
+@receiver(post_delete, sender=Servicos)
+def nova_geracao_servicos(sender, **kwargs):
+    _nova_geracao('servicos')
+
+
+@receiver(agendamento_transicionado)
+def limpar_cache_resumo_apos_transicao(sender, agendamento_id, **kwargs):
+    donos = Agendamento.objects.filter(pk=agendamento_id).values_list('cliente_id', 'mecanico_id').first()
+    if donos is not None:
+        cliente_id, mecanico_id = donos
+        invalidar_resumo_cliente(cliente_id)
+        entidades = [f'cliente:{cliente_id}', 'agendamentos']
+        if mecanico_id:
+            entidades.append(f'mecanico:{mecanico_id}')
+        _nova_geracao(*entidades)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def limpar_perfil_do_usuario(sender, instance, update_fields=None, **kwargs):
+    # O login só grava last_login, que não muda o papel
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidar_perfil(instance.pk)
+
+
+@receiver(post_save, sender=Administrador)
+@receiver(post_delete, sender=Administrador)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=Mecanico)
+@receiver(post_delete, sender=Mecanico)
+def limpar_perfil_do_dono(sender, instance, **kwargs):
+    invalidar_perfil(instance.usuario_id)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Mecanico)
+def atualizar_indice_busca(sender, instance, **kwargs):
+    busca.indice_de(sender).atualizar(pk=instance.pk)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Mecanico)
+def remover_do_indice_busca(sender, instance, **kwargs):
+    busca.indice_de(sender).remover(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def atualizar_busca_do_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # O username e o e-mail estão no índice; um usuário novo ainda não tem perfil
+    if created or (update_fields and not {'username', 'email'} & set(update_fields)):
+        return
+    for indice in busca.INDICES.values():
+        indice.atualizar(usuario_id=instance.pk)
+
+
+# Busca textual: o documento de um agendamento junta o cliente, a moto, o
+# serviço e a ordem de serviço, então regrava quando qualquer um deles muda
+@receiver(post_save, sender=Agendamento)
+def atualizar_busca_agendamento(sender, instance, **kwargs):
+    busca.AGENDAMENTOS.atualizar(pk=instance.pk)
+
+
+@receiver(post_delete, sender=Agendamento)
+def remover_busca_agendamento(sender, instance, **kwargs):
+    busca.AGENDAMENTOS.remover(instance.pk)
+
+
+@receiver(post_save, sender=OrdemServico)
+@receiver(post_delete, sender=OrdemServico)
+def atualizar_busca_da_ordem(sender, instance, **kwargs):
+    busca.AGENDAMENTOS.atualizar(pk=instance.agendamento_id)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Moto)
+@receiver(post_save, sender=Servicos)
+def atualizar_busca_dos_agendamentos(sender, instance, created, **kwargs):
+    # Um registro novo ainda não tem agendamentos
+    if not created:
+        campo = {Cliente: 'cliente_id', Moto: 'moto_id', Servicos: 'servico_id'}[sender]
+        busca.AGENDAMENTOS.atualizar(**{campo: instance.pk})
+
+
+@receiver(agendamento_transicionado)
+def atualizar_busca_apos_transicao(sender, agendamento_id, **kwargs):
+    # concluir grava a descrição do mecânico
+    busca.AGENDAMENTOS.atualizar(pk=agendamento_id)
+
+
+# Campos copiados para a descrição do evento; só atributos da própria linha,
+# para que a auditoria não faça queries (o __str__ dos modelos faz)
+CAMPOS_AUDITADOS = {
+    Agendamento: ('status', 'data_hora', 'mecanico_id', 'valor_servico'),
+    Cliente: ('nome_completo', 'email'),
+    Mecanico: ('nome_completo', 'especialidade'),
+    OrdemServico: ('agendamento_id', 'status', 'custo'),
+}
+
+
+def _descrever(instance):
+    return '; '.join(f'{campo}={getattr(instance, campo)}' for campo in CAMPOS_AUDITADOS[type(instance)])
+
+
+@receiver(post_save, sender=Agendamento)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Mecanico)
+@receiver(post_save, sender=OrdemServico)
+def auditar_gravacao(sender, instance, created, **kwargs):
+    auditoria.registrar('criar' if created else 'alterar', sender.__name__, instance.pk, _descrever(instance))
+
+
+@receiver(post_delete, sender=Agendamento)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Mecanico)
+@receiver(post_delete, sender=OrdemServico)
+def auditar_exclusao(sender, instance, **kwargs):
+    auditoria.registrar('excluir', sender.__name__, instance.pk, _descrever(instance))
+
+
+@receiver(agendamento_transicionado)
+def auditar_transicao(sender, agendamento_id, status, **kwargs):
+    auditoria.registrar('alterar', 'Agendamento', agendamento_id, f'status={status}')
+
+
+@receiver(user_logged_in)
+def auditar_login(sender, request, user, **kwargs):
+    ip = request.META.get('REMOTE_ADDR') if request is not None else None
+    auditoria.registrar('login', 'User', user.pk, usuario=user, ip=ip)
+
+
+# Fila dos mecânicos: só depois do commit, para não anunciar o que pode ser desfeito
+TIPOS_TRANSICAO = {'em_andamento': 'pego', 'agendado': 'devolvido', 'concluido': 'concluido'}
+
+
+@receiver(post_save, sender=Agendamento)
+def publicar_agendamento_gravado(sender, instance, created, **kwargs):
+    tipo = 'novo' if created else fila_mecanico.TIPOS_POR_STATUS.get(instance.status, 'alterado')
+    agendamento_id = instance.pk
+    transaction.on_commit(lambda: fila_mecanico.publicar_agendamento(agendamento_id, tipo))
+
+
+@receiver(post_delete, sender=Agendamento)
+def publicar_agendamento_excluido(sender, instance, **kwargs):
+    agendamento_id = instance.pk
+    transaction.on_commit(lambda: fila_mecanico.publicar_remocao(agendamento_id))
+
+
+@receiver(agendamento_transicionado)
+def publicar_transicao(sender, agendamento_id, status, **kwargs):
+    tipo = TIPOS_TRANSICAO.get(status, 'alterado')
+    transaction.on_commit(lambda: fila_mecanico.publicar_agendamento(agendamento_id, tipo))
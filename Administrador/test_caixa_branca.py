@@ -28,6 +28,7 @@ from .forms import (
     ClienteRegistrationForm, EditarClienteForm,
     MecanicoRegistrationForm, EditarMecanicoForm
 )
+from .disponibilidade import proximo_horario_disponivel
 
 
 # ============================================================================
@@ -556,8 +557,10 @@ class AgendarServicoTesteCaixaBranca(TestCase):
         """Testa POST criando nova moto - branch: else (moto_id == 'nova')"""
         self.client.login(username='cliente', password='senha123')
         
-        data_hora = (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-        hora = '10:00'
+        # Primeiro horário que respeita as regras de ConfiguracaoAgendamento
+        horario = timezone.localtime(proximo_horario_disponivel())
+        data_hora = horario.strftime('%Y-%m-%d')
+        hora = horario.strftime('%H:%M')
         
         response = self.client.post(reverse('agendar-servico'), {
             'moto_id': 'nova',
@@ -578,8 +581,10 @@ class AgendarServicoTesteCaixaBranca(TestCase):
         """Testa POST usando moto cadastrada - branch: if moto_id and moto_id != 'nova'"""
         self.client.login(username='cliente', password='senha123')
         
-        data_hora = (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-        hora = '10:00'
+        # Primeiro horário que respeita as regras de ConfiguracaoAgendamento
+        horario = timezone.localtime(proximo_horario_disponivel())
+        data_hora = horario.strftime('%Y-%m-%d')
+        hora = horario.strftime('%H:%M')
         
         response = self.client.post(reverse('agendar-servico'), {
             'moto_id': str(self.moto.id),
@@ -26,12 +26,14 @@ from django.test.utils import override_settings
 from datetime import timedelta, datetime
 from decimal import Decimal
 import threading
+from unittest import skipUnless
 from unittest.mock import patch
 
 from .models import (
     Servicos, Moto, Cliente, Mecanico, Administrador,
     Agendamento, OrdemServico, ConfiguracaoOficina
 )
+from .disponibilidade import proximo_horario_disponivel
 
 
 # ============================================================================
@@ -205,15 +207,16 @@ class ResponseTimeTest(TestCase, PerformanceTestMixin):
         """Testa tempo de resposta do POST de agendamento"""
         self.client.login(username='cliente', password='cliente123')
         
-        data_hora = (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        # Primeiro horário que respeita as regras de ConfiguracaoAgendamento
+        horario = timezone.localtime(proximo_horario_disponivel())
         
         def agendar_post():
             return self.client.post(reverse('agendar-servico'), {
                 'moto_id': str(self.moto.id),
                 'servico': 'Troca de Óleo',
                 'descricao': 'Preciso trocar o óleo da moto',
-                'data': data_hora,
-                'hora': '10:00'
+                'data': horario.strftime('%Y-%m-%d'),
+                'hora': horario.strftime('%H:%M')
             })
         
         response, execution_time = self.measure_time(agendar_post)
@@ -396,9 +399,16 @@ class DatabaseQueryTest(TestCase, PerformanceTestMixin):
 # TESTES DE CARGA (Load Testing)
 # ============================================================================
 
+# Carga concorrente com a auditoria como em produção: gravada em lote pela
+# thread de auditoria.py, fora do caminho da requisição
+@override_settings(AUDITORIA_EM_SEGUNDO_PLANO=True)
 class LoadTest(TransactionTestCase, PerformanceTestMixin):
     """Testes de carga simulando múltiplos usuários"""
     
+    def tearDown(self):
+        from .auditoria import gravador
+        gravador().parar()
+
     def setUp(self):
         """Configuração inicial para testes de carga"""
         # Criar usuários de teste
@@ -853,6 +863,55 @@ class ScalabilityTest(TestCase, PerformanceTestMixin):
                 )
 
 
+# ============================================================================
+# PLANOS DE EXECUÇÃO (Query Plan Testing)
+# ============================================================================
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é específico do SQLite')
+class QueryPlanTest(TestCase):
+    """Garante que as consultas mais frequentes em Agendamento usam índice (sem full scan)"""
+    
+    def setUp(self):
+        user = User.objects.create_user(username='plano', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        mec_user = User.objects.create_user(username='plano_mec', password='p')
+        self.mecanico = Mecanico.objects.create(usuario=mec_user, especialidade='Motor', telefone='1')
+    
+    def consultas_quentes(self):
+        """Consultas equivalentes às das views de mecânico, cliente e administrador"""
+        agora = timezone.now()
+        return {
+            'fila do mecânico': Agendamento.objects.filter(status='agendado').order_by('data_hora'),
+            'serviços em andamento do mecânico': Agendamento.objects.filter(
+                mecanico=self.mecanico, status='em_andamento'
+            ).order_by('data_hora'),
+            'histórico do mecânico': Agendamento.objects.filter(
+                mecanico=self.mecanico, status__in=['concluido', 'cancelado']
+            ).order_by('-data_hora'),
+            'último serviço do cliente': Agendamento.objects.filter(
+                cliente=self.cliente, status='concluido'
+            ).order_by('-data_hora'),
+            'próximos agendamentos do cliente': Agendamento.objects.filter(
+                cliente=self.cliente, data_hora__gte=agora
+            ).exclude(status='cancelado').order_by('data_hora'),
+            'listagem do administrador': Agendamento.objects.order_by('-data_hora', '-id')[:51],
+            'agendamentos de um período': Agendamento.objects.filter(
+                data_hora__gte=agora, data_hora__lt=agora + timedelta(days=1)
+            ),
+        }
+    
+    def test_consultas_quentes_nao_fazem_full_scan(self):
+        tabela = Agendamento._meta.db_table
+        for nome, queryset in self.consultas_quentes().items():
+            with self.subTest(consulta=nome):
+                plano = queryset.explain()
+                scans = [
+                    linha for linha in plano.splitlines()
+                    if f'SCAN {tabela}' in linha and 'USING' not in linha
+                ]
+                self.assertFalse(scans, f"'{nome}' faz full scan em {tabela}:\n{plano}")
+
+
 # ============================================================================
 # RELATÓRIO FINAL DE PERFORMANCE
 # ============================================================================
@@ -889,5 +948,9 @@ print("""
 ✅ TESTES DE ESCALABILIDADE (1 teste)
    - Escalabilidade com crescimento de dados
 
+✅ TESTES DE PLANO DE EXECUÇÃO (1 teste)
+   - Consultas frequentes de Agendamento sem full scan (SQLite)
+
 TOTAL: 15+ testes de performance
 """)
+
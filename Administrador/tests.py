@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -369,4 +369,1976 @@ class ViewsSmokeTest(TestCase):
         resp = self.client.get(url)
         # Deve redirecionar para a rota 'agendar-servico'
         self.assertEqual(resp.status_code, 302)
-        self.assertIn(reverse('agendar-servico'), resp.headers.get('Location', ''))
\ No newline at end of file
+        self.assertIn(reverse('agendar-servico'), resp.headers.get('Location', ''))
+
+class EstatisticasTest(TestCase):
+    """Testes do serviço de estatísticas agregadas (estatisticas.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='est', password='p')
+        self.cliente = Cliente.objects.create(usuario=self.user, telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Revisão geral')
+        for status in ['agendado', 'agendado', 'em_andamento', 'concluido', 'cancelado']:
+            Agendamento.objects.create(
+                cliente=self.cliente, servico=self.servico, moto=self.moto,
+                data_hora=timezone.now() + timedelta(days=3), status=status
+            )
+
+    def test_contagem_agendamentos_em_uma_query(self):
+        """Todos os status e o total saem de uma única query"""
+        from .estatisticas import contagem_agendamentos
+
+        with self.assertNumQueries(1):
+            contagem = contagem_agendamentos()
+
+        self.assertEqual(contagem['total'], 5)
+        self.assertEqual(contagem['agendado'], 2)
+        self.assertEqual(contagem['em_andamento'], 1)
+        self.assertEqual(contagem['concluido'], 1)
+        self.assertEqual(contagem['cancelado'], 1)
+        self.assertEqual(contagem['hoje'], 0)
+
+    def test_contar_tabelas_em_uma_query(self):
+        """Totais de várias tabelas saem de um único UNION ALL"""
+        from .estatisticas import contar_tabelas
+
+        with self.assertNumQueries(1):
+            totais = contar_tabelas(
+                clientes=Cliente.objects.all(),
+                motos=Moto.objects.all(),
+                ordens=OrdemServico.objects.all(),
+                staff=User.objects.filter(is_staff=True),
+            )
+
+        self.assertEqual(totais, {'clientes': 1, 'motos': 1, 'ordens': 0, 'staff': 0})
+
+    def test_dashboard_admin_usa_contagens(self):
+        """O dashboard expõe as mesmas contagens calculadas pelo serviço"""
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        self.client.login(username='adm', password='p')
+
+        response = self.client.get(reverse('dashboard-admin'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_clientes'], 1)
+        self.assertEqual(response.context['total_agendamentos'], 5)
+        self.assertEqual(response.context['agendamentos_pendentes'], 2)
+        self.assertEqual(response.context['agendamentos_cancelados'], 1)
+
+
+class ConfiguracaoOficinaCacheTest(TestCase):
+    """Testes do cache da configuração da oficina usado pelo context processor"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_leitura_nao_cria_configuracao(self):
+        """Sem configuração salva, o context processor não grava nada no banco"""
+        from .context_processors import configuracao_oficina
+        from .models import ConfiguracaoOficina
+
+        contexto = configuracao_oficina(None)
+
+        self.assertEqual(contexto['config_oficina'].nome_oficina, 'MotoService')
+        self.assertFalse(ConfiguracaoOficina.objects.exists())
+
+    def test_leituras_seguintes_sem_query(self):
+        """Depois da primeira leitura, a configuração vem do cache"""
+        from .context_processors import configuracao_oficina
+        from .models import ConfiguracaoOficina
+        ConfiguracaoOficina.objects.create(nome_oficina='Oficina X', endereco='R', telefone='1', email='a@b.com', cnpj='1')
+
+        configuracao_oficina(None)
+        with self.assertNumQueries(0):
+            contexto = configuracao_oficina(None)
+
+        self.assertEqual(contexto['config_oficina'].nome_oficina, 'Oficina X')
+
+    def test_salvar_invalida_cache(self):
+        """post_save e post_delete de ConfiguracaoOficina limpam o cache"""
+        from .context_processors import configuracao_oficina
+        from .models import ConfiguracaoOficina
+        config = ConfiguracaoOficina.objects.create(nome_oficina='Antiga', endereco='R', telefone='1', email='a@b.com', cnpj='1')
+        configuracao_oficina(None)
+
+        config.nome_oficina = 'Nova'
+        config.save()
+        self.assertEqual(configuracao_oficina(None)['config_oficina'].nome_oficina, 'Nova')
+
+        config.delete()
+        self.assertEqual(configuracao_oficina(None)['config_oficina'].nome_oficina, 'MotoService')
+
+    def test_configuracoes_admin_invalida_cache(self):
+        """Salvar pelo painel de configurações atualiza o nome exibido"""
+        from .context_processors import configuracao_oficina
+        User.objects.create_user(username='staff', password='p', is_staff=True)
+        self.client.login(username='staff', password='p')
+        configuracao_oficina(None)
+
+        self.client.post(reverse('configuracoes_admin'), {
+            'form_type': 'oficina', 'nome_oficina': 'Oficina Atualizada',
+        })
+
+        self.assertEqual(configuracao_oficina(None)['config_oficina'].nome_oficina, 'Oficina Atualizada')
+
+
+class AgendamentosAdminPaginacaoTest(TestCase):
+    """Testes da listagem paginada por cursor em agendamentos_admin"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='adm', password='p', is_staff=True)
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        mec_user = User.objects.create_user(username='mec', password='p')
+        self.mecanico = Mecanico.objects.create(usuario=mec_user, especialidade='Motor', telefone='1')
+        self.moto = Moto.objects.create(marca='Honda', modelo='CG', ano=2020)
+        self.oleo = Servicos.objects.create(nome='Óleo', descricao='Troca')
+        self.freio = Servicos.objects.create(nome='Freio', descricao='Pastilhas')
+        base = timezone.make_aware(datetime(2025, 3, 10, 9, 0))
+        self.agendamentos = [
+            Agendamento.objects.create(
+                cliente=self.cliente, moto=self.moto,
+                servico=self.freio if i % 2 else self.oleo,
+                mecanico=self.mecanico if i < 3 else None,
+                data_hora=base + timedelta(days=i // 2),  # pares com o mesmo horário
+                status='concluido' if i < 3 else 'agendado',
+            )
+            for i in range(7)
+        ]
+        self.client.login(username='adm', password='p')
+
+    def _ids(self, response):
+        return [a.id for a in response.context['agendamentos']]
+
+    def test_percorre_paginas_sem_repetir(self):
+        """Avançar e voltar pelos cursores cobre todas as linhas na ordem (data_hora, id) decrescente"""
+        url = reverse('adm-agendamentos')
+        esperado = [a.id for a in sorted(self.agendamentos, key=lambda a: (a.data_hora, a.id), reverse=True)]
+
+        primeira = self.client.get(url, {'por_pagina': 3})
+        pagina = primeira.context['pagina']
+        self.assertFalse(pagina.tem_anterior)
+        segunda = self.client.get(url, {'por_pagina': 3, 'cursor': pagina.proximo_cursor})
+        terceira = self.client.get(url, {'por_pagina': 3, 'cursor': segunda.context['pagina'].proximo_cursor})
+
+        self.assertEqual(self._ids(primeira) + self._ids(segunda) + self._ids(terceira), esperado)
+        self.assertFalse(terceira.context['pagina'].tem_proxima)
+
+        voltando = self.client.get(url, {
+            'por_pagina': 3, 'cursor': terceira.context['pagina'].anterior_cursor, 'direcao': 'anterior',
+        })
+        self.assertEqual(self._ids(voltando), self._ids(segunda))
+
+    def test_filtros_aplicados_no_banco(self):
+        """status, mecânico, serviço e período restringem a listagem"""
+        url = reverse('adm-agendamentos')
+
+        response = self.client.get(url, {'status': 'concluido', 'mecanico': self.mecanico.id})
+        self.assertEqual(len(self._ids(response)), 3)
+
+        response = self.client.get(url, {'mecanico': 'nenhum', 'servico': self.freio.id})
+        self.assertEqual(len(self._ids(response)), 2)
+
+        response = self.client.get(url, {'data_inicio': '2025-03-11', 'data_fim': '2025-03-11'})
+        self.assertEqual(len(self._ids(response)), 2)
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        response = self.client.get(reverse('adm-agendamentos'), {'cursor': 'lixo', 'por_pagina': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._ids(response)), 2)
+        self.assertFalse(response.context['pagina'].tem_anterior)
+
+
+class TransicoesConcorrentesTest(TransactionTestCase):
+    """Testes do compare-and-set em transicoes.py com mecânicos simultâneos"""
+
+    NUM_MECANICOS = 8
+
+    def setUp(self):
+        user = User.objects.create_user(username='cli', password='p')
+        cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.mecanicos = [
+            Mecanico.objects.create(
+                usuario=User.objects.create_user(username=f'mec{i}', password='p'),
+                especialidade='Motor', telefone='1'
+            )
+            for i in range(self.NUM_MECANICOS)
+        ]
+        self.agendamento = Agendamento.objects.create(
+            cliente=cliente,
+            servico=Servicos.objects.create(nome='Revisão', descricao='Geral'),
+            moto=Moto.objects.create(marca='Honda', modelo='CG', ano=2020),
+            data_hora=timezone.now() + timedelta(days=1),
+        )
+
+    def _em_paralelo(self, funcao, argumentos):
+        """Executa funcao(*args) em threads liberadas ao mesmo tempo e retorna os resultados"""
+        import threading
+        from django.db import connection
+
+        barreira = threading.Barrier(len(argumentos))
+        resultados = [None] * len(argumentos)
+
+        def executar(indice, args):
+            try:
+                barreira.wait()
+                resultados[indice] = funcao(*args)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=executar, args=(i, a)) for i, a in enumerate(argumentos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultados
+
+    def test_apenas_um_mecanico_pega_o_agendamento(self):
+        from .transicoes import pegar_agendamento
+
+        resultados = self._em_paralelo(
+            pegar_agendamento, [(self.agendamento.id, m) for m in self.mecanicos]
+        )
+
+        self.assertEqual(resultados.count(True), 1)
+        vencedor = self.mecanicos[resultados.index(True)]
+        self.agendamento.refresh_from_db()
+        self.assertEqual(self.agendamento.status, 'em_andamento')
+        self.assertEqual(self.agendamento.mecanico, vencedor)
+
+    def test_concluir_e_devolver_simultaneos_apenas_um_vence(self):
+        from decimal import Decimal
+        from .transicoes import concluir_agendamento, devolver_agendamento, pegar_agendamento
+        mecanico = self.mecanicos[0]
+        self.assertTrue(pegar_agendamento(self.agendamento.id, mecanico))
+
+        def concluir():
+            return 'concluido' if concluir_agendamento(self.agendamento.id, mecanico, 'Feito', Decimal('90')) else None
+
+        def devolver():
+            return 'agendado' if devolver_agendamento(self.agendamento.id, mecanico) else None
+
+        resultados = self._em_paralelo(lambda f: f(), [(concluir,), (devolver,)] * 3)
+
+        vencedores = [r for r in resultados if r]
+        self.assertEqual(len(vencedores), 1)
+        self.agendamento.refresh_from_db()
+        self.assertEqual(self.agendamento.status, vencedores[0])
+
+    def test_outro_mecanico_nao_conclui(self):
+        from .transicoes import concluir_agendamento, pegar_agendamento
+        self.assertTrue(pegar_agendamento(self.agendamento.id, self.mecanicos[0]))
+
+        self.assertFalse(concluir_agendamento(self.agendamento.id, self.mecanicos[1], 'x', 10))
+        self.agendamento.refresh_from_db()
+        self.assertEqual(self.agendamento.status, 'em_andamento')
+
+
+class DisponibilidadeTest(TestCase):
+    """Testes do motor de horários disponíveis (disponibilidade.py)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import ConfiguracaoAgendamento, ConfiguracaoOficina
+        from datetime import time
+        cache.clear()
+        ConfiguracaoOficina.objects.create(
+            nome_oficina='Oficina', endereco='R', telefone='1', email='a@b.com', cnpj='1',
+            horario_funcionamento_inicio=time(8, 0), horario_funcionamento_fim=time(12, 0),
+            dias_funcionamento='Segunda a Sexta',
+        )
+        ConfiguracaoAgendamento.objects.create(
+            intervalo_agendamento=60, antecedencia_minima=24, limite_agendamentos_dia=3,
+        )
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        # Segunda-feira daqui a duas semanas: sempre além da antecedência mínima
+        hoje = timezone.localdate()
+        self.segunda = hoje + timedelta(days=14 - hoje.weekday())
+
+    def _horario(self, dia, hora):
+        return timezone.make_aware(datetime.combine(dia, datetime.min.time()).replace(hour=hora))
+
+    def _agendar(self, dia, hora, status='agendado'):
+        return Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto,
+            data_hora=self._horario(dia, hora), status=status,
+        )
+
+    def test_dias_funcionamento(self):
+        from .disponibilidade import dias_funcionamento
+        self.assertEqual(dias_funcionamento('Segunda a Sexta'), {0, 1, 2, 3, 4})
+        self.assertEqual(dias_funcionamento('Segunda a Sábado'), {0, 1, 2, 3, 4, 5})
+        self.assertEqual(dias_funcionamento('Segunda, Quarta e Sexta-feira'), {0, 2, 4})
+        self.assertEqual(dias_funcionamento('Todos os dias'), set(range(7)))
+
+    def test_horarios_livres_em_uma_query(self):
+        """Expediente, ocupação e limite diário saem de uma única query"""
+        from .disponibilidade import horarios_disponiveis
+        self._agendar(self.segunda, 9)
+        self._agendar(self.segunda, 10, status='cancelado')  # cancelado não ocupa vaga
+        for hora in (8, 9, 10):
+            self._agendar(self.segunda + timedelta(days=1), hora)
+        horarios_disponiveis(self.segunda)  # aquece o cache das configurações
+
+        with self.assertNumQueries(1):
+            dias = horarios_disponiveis(self.segunda, dias=7)
+
+        self.assertEqual(len(dias), 5)  # sábado e domingo fora do expediente
+        segunda, terca = dias[0], dias[1]
+        self.assertEqual(
+            [timezone.localtime(h).hour for h in segunda['horarios']], [8, 10, 11]
+        )
+        self.assertTrue(terca['lotado'])
+        self.assertEqual(terca['horarios'], [])
+
+    def test_reserva_aplica_regras(self):
+        from .disponibilidade import HorarioIndisponivel, reservar_horario
+        self._agendar(self.segunda, 9)
+
+        casos = {
+            'ocupado': self._horario(self.segunda, 9),
+            'fora do expediente': self._horario(self.segunda, 13),
+            'fim de semana': self._horario(self.segunda - timedelta(days=1), 9),
+            'sem antecedência': timezone.now() + timedelta(hours=1),
+        }
+        for nome, data_hora in casos.items():
+            with self.subTest(nome):
+                with self.assertRaises(HorarioIndisponivel):
+                    with reservar_horario(data_hora):
+                        pass
+
+        for hora in (8, 10):
+            with reservar_horario(self._horario(self.segunda, hora)):
+                self._agendar(self.segunda, hora)
+        with self.assertRaises(HorarioIndisponivel):  # limite de 3 por dia
+            with reservar_horario(self._horario(self.segunda, 11)):
+                pass
+
+    def test_agendar_servico_recusa_horario_ocupado(self):
+        self._agendar(self.segunda, 9)
+        self.client.login(username='cli', password='p')
+
+        self.client.post(reverse('agendar-servico'), {
+            'moto_id': str(self.moto.id), 'servico': 'Revisão', 'descricao': 'x',
+            'data': self.segunda.isoformat(), 'hora': '09:00',
+        })
+
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_endpoint_json(self):
+        self._agendar(self.segunda, 8)
+        self.client.login(username='cli', password='p')
+
+        response = self.client.get(reverse('horarios-disponiveis'), {'inicio': self.segunda.isoformat(), 'dias': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dias'], [
+            {'data': self.segunda.isoformat(), 'horarios': ['09:00', '10:00', '11:00'], 'lotado': False}
+        ])
+
+
+class ResumoClienteTest(TestCase):
+    """Testes do resumo do dashboard do cliente (estatisticas.resumo_cliente e cache)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from decimal import Decimal
+        cache.clear()
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Fazer', ano=2021)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        agora = timezone.now()
+        self.antigo = self._agendar(agora - timedelta(days=30), 'concluido', Decimal('100.00'))
+        self.ultimo = self._agendar(agora - timedelta(days=10), 'concluido', Decimal('50.50'))
+        self._agendar(agora - timedelta(days=5), 'cancelado')
+        self.proximo = self._agendar(agora + timedelta(days=2), 'agendado')
+        self._agendar(agora + timedelta(days=3), 'em_andamento')
+        self._agendar(agora + timedelta(days=1), 'cancelado')
+
+    def _agendar(self, data_hora, status, valor=None):
+        return Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto,
+            data_hora=data_hora, status=status, valor_servico=valor,
+        )
+
+    def test_resumo_em_duas_queries(self):
+        from decimal import Decimal
+        from .estatisticas import resumo_cliente
+
+        with self.assertNumQueries(2):
+            resumo = resumo_cliente(self.cliente)
+
+        self.assertEqual(resumo['total_pendentes'], 1)
+        self.assertEqual(resumo['total_em_andamento'], 1)
+        self.assertEqual(resumo['total_finalizados'], 2)
+        self.assertEqual(resumo['total_cancelados'], 2)
+        self.assertEqual(resumo['total_motos'], 2)
+        self.assertEqual(resumo['total_gasto'], Decimal('150.50'))
+        self.assertEqual(resumo['ultimo_servico'], self.ultimo)
+        self.assertEqual(resumo['proximo_agendamento'], self.proximo)
+        self.assertEqual([a.status for a in resumo['agendamentos']], ['agendado', 'em_andamento'])
+
+    def test_cliente_sem_dados(self):
+        from .estatisticas import resumo_cliente
+        user = User.objects.create_user(username='novo', password='p')
+        novo = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua', email='novo@x.com')
+
+        resumo = resumo_cliente(novo)
+
+        self.assertEqual(resumo['total_motos'], 0)
+        self.assertEqual(resumo['total_gasto'], 0)
+        self.assertIsNone(resumo['ultimo_servico'])
+        self.assertEqual(resumo['agendamentos'], [])
+
+    def test_cache_invalidado_por_agendamento_moto_e_transicao(self):
+        from .caches import obter_resumo_cliente
+        from .transicoes import pegar_agendamento
+        obter_resumo_cliente(self.cliente)
+        with self.assertNumQueries(0):
+            obter_resumo_cliente(self.cliente)
+
+        Moto.objects.create(cliente=self.cliente, marca='Suzuki', modelo='Yes', ano=2019)
+        self.assertEqual(obter_resumo_cliente(self.cliente)['total_motos'], 3)
+
+        self._agendar(timezone.now() + timedelta(days=4), 'agendado')
+        self.assertEqual(obter_resumo_cliente(self.cliente)['total_pendentes'], 2)
+
+        # update() das transições não dispara post_save; o sinal próprio invalida
+        mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'),
+            especialidade='Motor', telefone='1'
+        )
+        self.assertTrue(pegar_agendamento(self.proximo.id, mecanico))
+        self.assertEqual(obter_resumo_cliente(self.cliente)['total_em_andamento'], 2)
+
+    def test_dashboard_cliente_usa_resumo(self):
+        self.client.login(username='cli', password='p')
+        self.client.get(reverse('dashboard-cliente'))
+
+        response = self.client.get(reverse('dashboard-cliente'))
+
+        self.assertEqual(response.context['total_finalizados'], 2)
+        self.assertEqual(response.context['proximo_agendamento'], self.proximo)
+
+
+class HistoricoClienteTest(TestCase):
+    """Testes do histórico do cliente paginado e com totais agregados no banco"""
+
+    def setUp(self):
+        from decimal import Decimal
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.cg = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.fazer = Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Fazer', ano=2021)
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        agora = timezone.now()
+        for i in range(5):
+            Agendamento.objects.create(
+                cliente=self.cliente, servico=servico, moto=self.cg, status='concluido',
+                data_hora=agora - timedelta(days=i + 1), valor_servico=Decimal('10.00'),
+            )
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=servico, moto=self.fazer, status='concluido',
+            data_hora=agora - timedelta(days=10), valor_servico=Decimal('99.90'),
+        )
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=servico, moto=self.fazer, status='cancelado',
+            data_hora=agora - timedelta(days=7),
+        )
+        # Fora do histórico
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=servico, moto=self.cg, data_hora=agora + timedelta(days=1),
+        )
+        self.client.login(username='cli', password='p')
+
+    def test_totais_agregados(self):
+        from decimal import Decimal
+        response = self.client.get(reverse('historico-cliente'))
+
+        self.assertEqual(response.context['total_historico'], 7)
+        self.assertEqual(response.context['total_servicos'], 6)
+        self.assertEqual(response.context['total_cancelados'], 1)
+        self.assertEqual(response.context['total_gasto'], Decimal('149.90'))
+        por_moto = {m['moto_id']: m for m in response.context['gasto_por_moto']}
+        self.assertEqual(por_moto[self.cg.id]['servicos'], 5)
+        self.assertEqual(por_moto[self.fazer.id]['gasto'], Decimal('99.90'))
+
+    def test_paginacao_e_filtro_de_status(self):
+        response = self.client.get(reverse('historico-cliente'), {'por_pagina': 4})
+        pagina = response.context['pagina']
+        self.assertEqual(len(pagina), 4)
+        self.assertTrue(pagina.tem_proxima)
+
+        response = self.client.get(
+            reverse('historico-cliente'), {'por_pagina': 4, 'cursor': pagina.proximo_cursor}
+        )
+        self.assertEqual(len(response.context['pagina']), 3)
+        self.assertFalse(response.context['pagina'].tem_proxima)
+
+        response = self.client.get(reverse('historico-cliente'), {'status': 'cancelado'})
+        self.assertEqual([a.status for a in response.context['pagina']], ['cancelado'])
+        # Os contadores continuam cobrindo todo o histórico
+        self.assertEqual(response.context['total_servicos'], 6)
+
+    def test_numero_de_queries_constante(self):
+        """Totais, gasto por moto e página não dependem do tamanho do histórico"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.get(reverse('historico-cliente'))  # papel resolvido e guardado na sessão
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(reverse('historico-cliente'))
+
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=Servicos.objects.first(), moto=self.cg,
+            status='concluido', data_hora=timezone.now() - timedelta(days=20),
+        )
+        with CaptureQueriesContext(connection) as depois:
+            self.client.get(reverse('historico-cliente'))
+
+        self.assertEqual(len(antes), len(depois))
+
+
+class HistoricoMecanicoTest(TestCase):
+    """Testes do histórico do mecânico paginado e da produtividade mensal"""
+
+    def setUp(self):
+        from decimal import Decimal
+        user = User.objects.create_user(username='cli', password='p')
+        cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'),
+            especialidade='Motor', telefone='1'
+        )
+        moto = Moto.objects.create(cliente=cliente, marca='Honda', modelo='CG', ano=2020)
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        hoje = timezone.localdate()
+        self.inicio_mes = timezone.make_aware(datetime(hoje.year, hoje.month, 1, 10))
+        self.mes_anterior = (self.inicio_mes - timedelta(days=1)).replace(day=15)
+
+        def agendar(data_hora, status, valor=None):
+            Agendamento.objects.create(
+                cliente=cliente, servico=servico, moto=moto, mecanico=self.mecanico,
+                data_hora=data_hora, status=status, valor_servico=valor,
+            )
+
+        for i in range(3):
+            agendar(self.inicio_mes + timedelta(minutes=i), 'concluido', Decimal('100.00'))
+        agendar(self.mes_anterior, 'concluido', Decimal('50.00'))
+        agendar(self.mes_anterior + timedelta(hours=1), 'cancelado')
+        agendar(timezone.now() + timedelta(days=1), 'em_andamento')  # fora do histórico
+        self.client.login(username='mec', password='p')
+
+    def test_contadores_e_paginacao(self):
+        response = self.client.get(reverse('historico-mecanico'), {'por_pagina': 3})
+
+        self.assertEqual(response.context['total_historico'], 5)
+        self.assertEqual(response.context['total_concluidos'], 4)
+        self.assertEqual(response.context['total_cancelados'], 1)
+        pagina = response.context['pagina']
+        self.assertEqual(len(pagina), 3)
+        self.assertTrue(pagina.tem_proxima)
+
+        response = self.client.get(
+            reverse('historico-mecanico'), {'por_pagina': 3, 'cursor': pagina.proximo_cursor}
+        )
+        self.assertEqual(
+            [a.status for a in response.context['pagina']], ['cancelado', 'concluido']
+        )
+
+    def test_produtividade_mensal(self):
+        from decimal import Decimal
+        from .estatisticas import produtividade_mensal
+
+        meses = produtividade_mensal(Agendamento.objects.filter(mecanico=self.mecanico))
+
+        self.assertEqual(
+            [(m['mes'].month, m['servicos'], m['receita']) for m in meses],
+            [(self.inicio_mes.month, 3, Decimal('300.00')), (self.mes_anterior.month, 1, Decimal('50.00'))],
+        )
+
+
+class PerfilTest(TestCase):
+    """Testes da resolução de papel (perfis.py) e do PerfilMiddleware"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=self.user, telefone='1', endereco='Rua')
+
+    def test_resolver_em_uma_query(self):
+        from .perfis import CLIENTE, resolver_perfil
+        staff = User.objects.create_user(username='staff', password='p', is_staff=True)
+        Cliente.objects.create(usuario=staff, telefone='1', endereco='Rua', email='staff@x.com')
+
+        with self.assertNumQueries(1):
+            perfil = resolver_perfil(self.user)
+            self.assertEqual(perfil.cliente, self.cliente)
+        self.assertEqual(perfil.papel, CLIENTE)
+        with self.assertRaises(Mecanico.DoesNotExist):
+            perfil.mecanico
+
+        # Staff tem prioridade, mas continua acessando o próprio perfil de cliente
+        perfil = resolver_perfil(staff)
+        self.assertTrue(perfil.eh_administrador)
+        self.assertEqual(perfil.cliente.usuario, staff)
+
+    def test_login_guarda_papel_na_sessao(self):
+        from .perfis import CHAVE_SESSAO
+        response = self.client.post(reverse('login'), {'username': 'cli', 'senha': 'p'})
+
+        self.assertRedirects(response, reverse('dashboard-cliente'), fetch_redirect_response=False)
+        dados = self.client.session[CHAVE_SESSAO]
+        self.assertEqual(dados['papel'], 'cliente')
+        self.assertEqual(dados['ids']['cliente'], self.cliente.pk)
+
+    def test_admin_perde_acesso_quando_staff_removido(self):
+        """Os sinais trocam o token e o papel guardado na sessão deixa de valer"""
+        staff = User.objects.create_user(username='staff', password='p', is_staff=True)
+        self.client.login(username='staff', password='p')
+        self.assertEqual(self.client.get(reverse('configuracoes_admin')).status_code, 200)
+
+        staff.is_staff = False
+        staff.save()
+
+        response = self.client.get(reverse('configuracoes_admin'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    def test_perfil_criado_depois_do_login(self):
+        from .perfis import perfil_da_requisicao
+        from django.test import RequestFactory
+        from django.contrib.sessions.backends.db import SessionStore
+        request = RequestFactory().get('/')
+        request.user, request.session = self.user, SessionStore()
+        self.assertTrue(perfil_da_requisicao(request).eh_cliente)
+
+        Mecanico.objects.create(usuario=self.user, especialidade='Motor', telefone='1')
+
+        self.assertIn('mecanico', perfil_da_requisicao(request).ids)
+
+
+class ExportacaoTest(TestCase):
+    """Testes das exportações em CSV/XLSX por streaming"""
+
+    def setUp(self):
+        from decimal import Decimal
+        User.objects.create_user(username='staff', password='p', is_staff=True)
+        user = User.objects.create_user(username='cli', password='p')
+        cliente = Cliente.objects.create(
+            usuario=user, nome_completo='=Cliente Teste', telefone='1', endereco='Rua'
+        )
+        moto = Moto.objects.create(cliente=cliente, marca='Honda', modelo='CG', ano=2020)
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        agora = timezone.now()
+        self.concluido = Agendamento.objects.create(
+            cliente=cliente, servico=servico, moto=moto, status='concluido',
+            data_hora=agora - timedelta(days=2), valor_servico=Decimal('120.50'),
+        )
+        Agendamento.objects.create(
+            cliente=cliente, servico=servico, moto=moto, data_hora=agora + timedelta(days=2),
+        )
+        OrdemServico.objects.create(
+            agendamento=self.concluido, descricao_servico='Troca de óleo', custo=Decimal('80.00'),
+        )
+
+    def _baixar(self, tipo, formato, **params):
+        response = self.client.get(reverse('exportar_dados', args=[tipo, formato]), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_com_filtros(self):
+        import csv
+        import io
+        self.client.login(username='staff', password='p')
+
+        conteudo = self._baixar('agendamentos', 'csv', status='concluido').decode('utf-8-sig')
+
+        linhas = list(csv.reader(io.StringIO(conteudo), delimiter=';'))
+        self.assertEqual(linhas[0][:3], ['ID', 'Data/Hora', 'Status'])
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(linhas[1][2], 'Concluído')
+        self.assertEqual(linhas[1][3], "'=Cliente Teste")  # sem injeção de fórmula
+        self.assertEqual(linhas[1][10], '120.50')
+
+    def test_xlsx_valido(self):
+        import io
+        import zipfile
+        self.client.login(username='staff', password='p')
+
+        conteudo = self._baixar('ordens', 'xlsx')
+
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as arquivo:
+            self.assertIsNone(arquivo.testzip())
+            planilha = arquivo.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('Troca de óleo', planilha)
+        self.assertIn('<v>80.00</v>', planilha)
+        self.assertEqual(planilha.count('<row '), 2)
+
+    def test_clientes_e_motos(self):
+        self.client.login(username='staff', password='p')
+        self.assertIn(b'Honda', self._baixar('motos', 'csv'))
+        # Nenhum agendamento cancelado: o filtro restringe os clientes exportados
+        self.assertEqual(self._baixar('clientes', 'csv', status='cancelado').count(b'\n'), 1)
+
+    async def test_asgi_em_partes(self):
+        import warnings
+        from asgiref.sync import sync_to_async
+        await sync_to_async(self.async_client.login)(username='staff', password='p')
+        url = reverse('exportar_dados', args=['agendamentos', 'csv'])
+
+        response = await self.async_client.get(url)
+        self.assertTrue(response.is_async)
+        # Como o ASGIHandler lê: um iterador síncrono seria juntado com aviso
+        with warnings.catch_warnings(record=True) as avisos:
+            warnings.simplefilter('always')
+            partes = [parte async for parte in response]
+
+        self.assertEqual(avisos, [])
+        self.assertEqual(len(partes), 3)  # cabeçalho e uma parte por agendamento
+        self.assertIn(b'Concl', partes[1] + partes[2])
+
+    def test_apenas_administrador(self):
+        self.client.login(username='cli', password='p')
+        response = self.client.get(reverse('exportar_dados', args=['agendamentos', 'csv']))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+
+class LimpezaEmSegundoPlanoTest(TestCase):
+    """Testes da limpeza de dados em lotes (limpeza.py)"""
+
+    def setUp(self):
+        from decimal import Decimal
+        User.objects.create_user(username='staff', password='p', is_staff=True)
+        user = User.objects.create_user(username='cli', password='p')
+        cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        moto = Moto.objects.create(cliente=cliente, marca='Honda', modelo='CG', ano=2020)
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        antigo = timezone.now() - timedelta(days=365)
+        for i in range(7):
+            agendamento = Agendamento.objects.create(
+                cliente=cliente, servico=servico, moto=moto, status='concluido',
+                data_hora=antigo + timedelta(hours=i),
+            )
+            OrdemServico.objects.create(agendamento=agendamento, descricao_servico='OS', custo=Decimal('1'))
+        self.recente = Agendamento.objects.create(
+            cliente=cliente, servico=servico, moto=moto, status='concluido',
+            data_hora=timezone.now() - timedelta(days=10),
+        )
+        self.client.login(username='staff', password='p')
+
+    def test_view_agenda_tarefa_e_lotes_apagam(self):
+        from unittest import mock
+        from .limpeza import executar_tarefa
+        from .models import TarefaLimpeza
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('limpar_dados_sistema'), {'tipo': 'agendamentos'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)  # a thread só sairia depois do commit
+        tarefa = TarefaLimpeza.objects.get(pk=response.json()['tarefa_id'])
+        self.assertEqual(tarefa.total_estimado, 7)
+        self.assertEqual(Agendamento.objects.count(), 8)  # nada apagado durante a requisição
+
+        with mock.patch('Administrador.limpeza.TAMANHO_LOTE', 3):
+            self.assertTrue(executar_tarefa(tarefa.pk, pausa=0))
+
+        self.assertEqual(list(Agendamento.objects.all()), [self.recente])
+        self.assertEqual(OrdemServico.objects.count(), 0)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((status['status'], status['total_removidos'], status['progresso']), ('concluida', 7, 100))
+
+    def test_retoma_tarefa_interrompida(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from .limpeza import executar_tarefa
+        from .models import TarefaLimpeza
+
+        # Tarefa que morreu no meio do reset: já passou das ordens de serviço
+        tarefa = TarefaLimpeza.objects.create(tipo='reset_total', status='executando', etapa='agendamentos')
+        self.assertFalse(executar_tarefa(tarefa.pk, pausa=0))  # ainda parece viva
+
+        TarefaLimpeza.objects.filter(pk=tarefa.pk).update(atualizada_em=timezone.now() - timedelta(hours=1))
+        call_command('executar_limpezas', stdout=StringIO())
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'concluida')
+        self.assertFalse(Agendamento.objects.exists())
+        self.assertFalse(Cliente.objects.exists())
+        self.assertTrue(User.objects.filter(username='cli').exists())
+
+    def test_reset_exige_confirmacao(self):
+        response = self.client.post(reverse('limpar_dados_sistema'), {'tipo': 'reset_total', 'confirmacao': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ArquivamentoTest(TestCase):
+    """Testes do arquivamento de agendamentos antigos e da leitura pelo histórico"""
+
+    def setUp(self):
+        from decimal import Decimal
+        from django.core.cache import cache
+        cache.clear()
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        agora = timezone.now()
+        self.antigos = []
+        for i in range(3):
+            agendamento = self._agendar(agora - timedelta(days=400 + i), Decimal('10.00'))
+            OrdemServico.objects.create(
+                agendamento=agendamento, descricao_servico=f'OS {i}', custo=Decimal('10.00'),
+            )
+            self.antigos.append(agendamento)
+        self.recentes = [self._agendar(agora - timedelta(days=i + 1), Decimal('5.00')) for i in range(3)]
+
+    def _agendar(self, data_hora, valor):
+        return Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto, status='concluido',
+            data_hora=data_hora, valor_servico=valor, descricao_problema='Barulho no motor',
+        )
+
+    def _arquivar(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from unittest import mock
+        with mock.patch('Administrador.limpeza.PAUSA_ENTRE_LOTES', 0):
+            call_command('arquivar_agendamentos', stdout=StringIO())
+
+    def test_comando_move_para_o_arquivo(self):
+        from .models import AgendamentoArquivado, TarefaLimpeza
+        self._arquivar()
+
+        self.assertEqual(Agendamento.objects.count(), 3)
+        self.assertEqual(OrdemServico.objects.count(), 0)
+        arquivado = AgendamentoArquivado.objects.get(pk=self.antigos[0].pk)
+        self.assertEqual(arquivado.mes, timezone.localtime(self.antigos[0].data_hora).date().replace(day=1))
+        self.assertEqual(arquivado.descricao_problema, 'Barulho no motor')
+        self.assertEqual(arquivado.dados['ordem_servico']['descricao_servico'], 'OS 0')
+        self.assertEqual(arquivado.moto.marca, 'Honda')
+        self.assertEqual(TarefaLimpeza.objects.get(tipo='arquivamento').status, 'concluida')
+
+    def test_historico_continua_no_arquivo(self):
+        from decimal import Decimal
+        self._arquivar()
+        self.client.login(username='cli', password='p')
+
+        ids, cursor = [], None
+        for _ in range(3):
+            params = {'por_pagina': 2, **({'cursor': cursor} if cursor else {})}
+            pagina = self.client.get(reverse('historico-cliente'), params).context['pagina']
+            ids += [a.id for a in pagina]
+            cursor = pagina.proximo_cursor
+
+        self.assertIsNone(cursor)
+        self.assertEqual(ids, [a.id for a in self.recentes + self.antigos])
+        response = self.client.get(reverse('historico-cliente'))
+        self.assertEqual(response.context['total_servicos'], 6)
+        self.assertEqual(response.context['total_gasto'], Decimal('45.00'))
+        self.assertContains(response, 'Barulho no motor')
+
+    def test_resumo_cliente_soma_arquivo(self):
+        from decimal import Decimal
+        from .estatisticas import resumo_cliente
+        Agendamento.objects.filter(pk__in=[a.pk for a in self.recentes]).delete()
+        self._arquivar()
+
+        resumo = resumo_cliente(self.cliente)
+
+        self.assertEqual(resumo['total_finalizados'], 3)
+        self.assertEqual(resumo['total_gasto'], Decimal('30.00'))
+        self.assertEqual(resumo['ultimo_servico'].pk, self.antigos[0].pk)
+
+
+class AuditoriaTest(TestCase):
+    """Testes da auditoria em lote (auditoria.py e AuditoriaMiddleware)"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='cli', password='p')
+        cliente = Cliente.objects.create(usuario=user, telefone='1', endereco='Rua')
+        self.mecanico_user = User.objects.create_user(username='mec', password='p')
+        Mecanico.objects.create(usuario=self.mecanico_user, especialidade='Motor', telefone='1')
+        self.agendamento = Agendamento.objects.create(
+            cliente=cliente,
+            servico=Servicos.objects.create(nome='Revisão', descricao='Geral'),
+            moto=Moto.objects.create(cliente=cliente, marca='Honda', modelo='CG', ano=2020),
+            data_hora=timezone.now() + timedelta(days=1),
+        )
+
+    def _evento(self, acao='teste'):
+        from .models import LogAuditoria
+        return LogAuditoria(usuario_id=self.mecanico_user.pk, acao=acao, modelo='Teste', objeto_id=1, descricao='')
+
+    def test_requisicao_grava_eventos_em_um_insert(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import LogAuditoria
+        self.client.login(username='mec', password='p')
+        LogAuditoria.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('pegar-agendamento', args=[self.agendamento.id]))
+
+        inserts = [q for q in consultas.captured_queries if 'INSERT INTO "Administrador_logauditoria"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        logs = {(log.acao, log.modelo): log for log in LogAuditoria.objects.all()}
+        transicao = logs[('alterar', 'Agendamento')]
+        self.assertEqual(transicao.usuario, self.mecanico_user)
+        self.assertEqual(transicao.objeto_id, self.agendamento.id)
+        self.assertEqual(transicao.descricao, 'status=em_andamento')
+        self.assertEqual(transicao.ip_address, '127.0.0.1')
+        self.assertEqual(logs[('POST', 'pegar-agendamento')].objeto_id, self.agendamento.id)
+
+    def test_get_nao_gera_evento(self):
+        from .models import LogAuditoria
+        self.client.login(username='mec', password='p')
+        LogAuditoria.objects.all().delete()
+        self.client.get(reverse('dashboard-mecanico'))
+        self.assertFalse(LogAuditoria.objects.exists())
+
+    def test_sem_usuario_nao_registra(self):
+        from .models import LogAuditoria
+        Cliente.objects.create(
+            usuario=User.objects.create_user(username='outro', password='p'),
+            telefone='1', endereco='Rua', email='outro@example.com',
+        )
+        self.assertFalse(LogAuditoria.objects.exists())
+
+    def test_lote_fecha_pelo_tamanho(self):
+        from .auditoria import GravadorAuditoria
+        gravador = GravadorAuditoria(tamanho_lote=3, intervalo=5, fila_max=10, espera_max=0)
+        for _ in range(4):
+            gravador.enfileirar(self._evento(), em_segundo_plano=False)
+
+        lote, parando = gravador._coletar()
+
+        self.assertEqual(len(lote), 3)
+        self.assertFalse(parando)
+        self.assertEqual(gravador.fila.qsize(), 1)
+
+    def test_fila_cheia_descarta_apos_espera(self):
+        from .auditoria import GravadorAuditoria
+        gravador = GravadorAuditoria(tamanho_lote=10, intervalo=5, fila_max=1, espera_max=0.01)
+        gravador.enfileirar(self._evento(), em_segundo_plano=False)
+        gravador.enfileirar(self._evento(), em_segundo_plano=False)
+        self.assertEqual(gravador.descartados, 1)
+
+    def test_parar_grava_o_que_estava_na_fila(self):
+        from unittest import mock
+        from .auditoria import GravadorAuditoria
+        gravados = []
+        gravador = GravadorAuditoria(tamanho_lote=2, intervalo=60, fila_max=100, espera_max=1)
+        with mock.patch('Administrador.auditoria.gravar', side_effect=gravados.extend), \
+                mock.patch('Administrador.auditoria.connection'):
+            for i in range(5):
+                gravador.enfileirar(self._evento(f'acao {i}'))
+            gravador.parar()
+
+        self.assertFalse(gravador._thread.is_alive())
+        self.assertEqual([evento.acao for evento in gravados], [f'acao {i}' for i in range(5)])
+
+
+class ParticoesAuditoriaTest(TestCase):
+    """Testes das partições mensais de LogAuditoria (particoes.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='root', password='p', email='root@example.com')
+        self.agora = timezone.make_aware(datetime(2026, 10, 15, 12))
+
+    def _log(self, *data, acao='alterar'):
+        from .models import LogAuditoria
+        return LogAuditoria.objects.create(
+            usuario=self.user, acao=acao, modelo='Agendamento', objeto_id=1, descricao='',
+            data_hora=timezone.make_aware(datetime(*data)),
+        )
+
+    def test_rotacao_move_meses_fechados(self):
+        from django.db import connection
+        from .models import LogAuditoria
+        from .particoes import modelo_particao, particoes_existentes, rotacionar
+        self._log(2026, 10, 2)
+        self._log(2026, 9, 10)
+        self._log(2026, 9, 30, 23, 59)
+        self._log(2025, 8, 10)  # fora da retenção de 12 meses
+
+        resultado = rotacionar(agora=self.agora)
+
+        self.assertEqual(resultado['movidos'], {(2026, 9): 2})
+        self.assertEqual(particoes_existentes(), [(2026, 9)])
+        self.assertEqual(LogAuditoria.objects.count(), 1)
+        self.assertEqual(modelo_particao((2026, 9)).objects.filter(usuario=self.user).count(), 2)
+        indices = connection.introspection.get_constraints(connection.cursor(), 'Administrador_logauditoria_202609')
+        self.assertIn('logaud_usuario_data_202609', indices)
+
+    def test_retencao_descarta_particao_inteira(self):
+        from .particoes import particoes_existentes, rotacionar
+        self._log(2026, 8, 10)
+        self._log(2026, 9, 10)
+        rotacionar(agora=self.agora)
+
+        resultado = rotacionar(meses_retencao=2, agora=self.agora)
+
+        self.assertEqual(resultado['descartadas'], [(2026, 8)])
+        self.assertEqual(particoes_existentes(), [(2026, 9)])
+
+    def test_admin_consulta_so_a_particao_escolhida(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .particoes import rotacionar
+        self._log(2026, 9, 10, acao='acao de setembro')
+        rotacionar(agora=self.agora)
+        self.client.login(username='root', password='p')
+        url = reverse('admin:Administrador_logauditoria_changelist')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'periodo': '2026-09'})
+
+        self.assertContains(response, 'acao de setembro')
+        self.assertFalse(any('"Administrador_logauditoria"' in q['sql'] for q in consultas.captured_queries))
+        self.assertNotContains(self.client.get(url), 'acao de setembro')
+
+
+class FalhaSms:
+    """Backend de SMS dos testes que falha na primeira mensagem"""
+    falhas = 1
+
+    def destino(self, cliente):
+        return cliente.telefone
+
+    def enviar(self, destino, assunto, mensagem):
+        if FalhaSms.falhas:
+            FalhaSms.falhas -= 1
+            raise ConnectionError('provedor fora do ar')
+
+
+class LembretesTest(TestCase):
+    """Testes do agendador de lembretes (lembretes.py)"""
+
+    def setUp(self):
+        import tempfile
+        from .models import ConfiguracaoNotificacao
+        ConfiguracaoNotificacao.objects.create(notificar_24h_antes=True, notificar_1h_antes=True, sms_lembrete=True)
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(
+            usuario=user, nome_completo='Ana', email='ana@example.com', telefone='11999990000', endereco='Rua',
+        )
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.agora = timezone.now()
+        self.arquivo_sms = f'{tempfile.mkdtemp()}/sms.txt'
+
+    def _agendar(self, daqui, status='agendado'):
+        return Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto,
+            data_hora=self.agora + daqui, status=status,
+        )
+
+    def _enviar(self, agora=None, sms='Administrador.lembretes.BackendSmsArquivo'):
+        from django.test import override_settings
+        from .lembretes import enviar_lembretes
+        with override_settings(
+            LEMBRETES_BACKENDS={'email': 'Administrador.lembretes.BackendEmail', 'sms': sms},
+            LEMBRETES_SMS_ARQUIVO=self.arquivo_sms,
+        ):
+            return enviar_lembretes(agora=agora or self.agora)
+
+    def test_janelas_enviam_uma_vez(self):
+        from django.core import mail
+        from .models import LembreteEnviado
+        proximo = self._agendar(timedelta(minutes=30))
+        amanha = self._agendar(timedelta(hours=5))
+        self._agendar(timedelta(hours=30))
+        self._agendar(timedelta(hours=2), status='cancelado')
+
+        enviados = self._enviar()
+
+        self.assertEqual(enviados, {('1h', 'email'): 1, ('1h', 'sms'): 1, ('24h', 'email'): 1, ('24h', 'sms'): 1})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['ana@example.com'] * 2)
+        with open(self.arquivo_sms, encoding='utf-8') as arquivo:
+            self.assertEqual(len(arquivo.readlines()), 2)
+        self.assertEqual(
+            set(LembreteEnviado.objects.values_list('agendamento_id', 'tipo')),
+            {(proximo.id, '1h'), (amanha.id, '24h')},
+        )
+        # Ciclo seguinte, com os mesmos agendamentos ainda na janela: nada sai de novo
+        self.assertEqual(self._enviar(agora=self.agora + timedelta(minutes=1)), {})
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_pego_pelo_mecanico_ainda_recebe_lembrete(self):
+        from django.core import mail
+        self._agendar(timedelta(hours=5), status='em_andamento')
+        self._agendar(timedelta(minutes=30), status='concluido')
+
+        enviados = self._enviar()
+
+        self.assertEqual(enviados, {('24h', 'email'): 1, ('24h', 'sms'): 1})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_remarcado_recebe_lembrete_do_novo_horario(self):
+        from django.core import mail
+        agendamento = self._agendar(timedelta(hours=5))
+        self._enviar()
+        agendamento.data_hora = self.agora + timedelta(hours=8)
+        agendamento.save()
+
+        self._enviar()
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_falha_e_tentada_de_novo(self):
+        from .models import LembreteEnviado
+        self._agendar(timedelta(hours=5))
+        FalhaSms.falhas = 1
+
+        with self.assertLogs('Administrador.lembretes', 'ERROR'):
+            self.assertEqual(self._enviar(sms='Administrador.tests.FalhaSms'), {('24h', 'email'): 1})
+        self.assertEqual(LembreteEnviado.objects.get(canal='sms').status, 'erro')
+
+        self.assertEqual(self._enviar(sms='Administrador.tests.FalhaSms'), {('24h', 'sms'): 1})
+        lembrete = LembreteEnviado.objects.get(canal='sms')
+        self.assertEqual((lembrete.status, lembrete.tentativas), ('enviado', 2))
+
+
+class CaixaSaidaTest(TestCase):
+    """Testes da caixa de saída de e-mails (caixa_saida.py)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(
+            usuario=user, nome_completo='Ana', email='ana@example.com', telefone='1', endereco='Rua',
+        )
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.agendamentos = [
+            Agendamento.objects.create(
+                cliente=self.cliente, servico=self.servico, moto=self.moto,
+                data_hora=timezone.now() + timedelta(days=i + 1),
+            )
+            for i in range(3)
+        ]
+
+    def test_cancelamento_enfileira_sem_enviar_na_requisicao(self):
+        from django.core import mail
+        from .caixa_saida import despachar
+        from .models import EmailSaida
+        self.client.login(username='cli', password='p')
+
+        self.client.get(reverse('cancelar-agendamento-cliente', args=[self.agendamentos[0].id]))
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailSaida.objects.get()
+        self.assertEqual((email.tipo, email.status, email.destinatario), ('cancelamento', 'pendente', 'ana@example.com'))
+        self.assertEqual(despachar(), (1, 0))
+        self.assertEqual(mail.outbox[0].subject, f'Agendamento #{self.agendamentos[0].id} cancelado')
+        self.assertEqual(despachar(), (0, 0))
+
+    def test_mesma_transacao_deduplicacao_e_configuracao(self):
+        from django.db import transaction
+        from .caixa_saida import enfileirar
+        from .models import ConfiguracaoNotificacao, EmailSaida
+        agendamento = self.agendamentos[0]
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enfileirar('confirmacao', agendamento)
+            raise RuntimeError('status não foi gravado')
+        self.assertFalse(EmailSaida.objects.exists())
+
+        self.assertIsNotNone(enfileirar('confirmacao', agendamento))
+        self.assertIsNone(enfileirar('confirmacao', agendamento))
+        ConfiguracaoNotificacao.objects.create(email_cancelamento=False)
+        self.assertIsNone(enfileirar('cancelamento', agendamento))
+        self.assertEqual(EmailSaida.objects.count(), 1)
+
+    def test_conclusao_pela_transicao(self):
+        from decimal import Decimal
+        from . import transicoes
+        from .models import EmailSaida
+        mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'), especialidade='Motor', telefone='1',
+        )
+        agendamento = self.agendamentos[0]
+        transicoes.pegar_agendamento(agendamento.id, mecanico)
+
+        transicoes.concluir_agendamento(agendamento.id, mecanico, 'Feito', Decimal('80.00'))
+
+        email = EmailSaida.objects.get(tipo='conclusao')
+        self.assertIn('Valor: R$ 80.00', email.corpo)
+
+    def test_lote_usa_uma_conexao_e_falha_volta_com_espera(self):
+        from unittest import mock
+        from django.core import mail
+        from django.core.mail import EmailMessage, get_connection
+        from .caixa_saida import despachar, enfileirar
+        from .models import EmailSaida
+        for agendamento in self.agendamentos:
+            enfileirar('confirmacao', agendamento)
+        agora = timezone.now()
+        envio_original = EmailMessage.send
+
+        def falhar_no_segundo(mensagem, *args, **kwargs):
+            if str(self.agendamentos[1].id) in mensagem.subject:
+                raise ConnectionError('servidor recusou')
+            return envio_original(mensagem, *args, **kwargs)
+
+        with mock.patch('Administrador.caixa_saida.get_connection', wraps=get_connection) as conexao, \
+                mock.patch.object(EmailMessage, 'send', falhar_no_segundo), \
+                self.assertLogs('Administrador.caixa_saida', 'WARNING'):
+            self.assertEqual(despachar(agora=agora), (2, 1))
+        self.assertEqual(conexao.call_count, 1)
+
+        falha = EmailSaida.objects.get(status='erro')
+        self.assertEqual(falha.tentativas, 1)
+        self.assertEqual(falha.proxima_tentativa, agora + timedelta(minutes=1))
+        self.assertEqual(despachar(agora=agora + timedelta(seconds=30)), (0, 0))
+        self.assertEqual(despachar(agora=agora + timedelta(minutes=1)), (1, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_backend_de_arquivo(self):
+        import os
+        import tempfile
+        from django.test import override_settings
+        from .caixa_saida import despachar, enfileirar
+        diretorio = tempfile.mkdtemp()
+        enfileirar('confirmacao', self.agendamentos[0])
+
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=diretorio,
+        ):
+            self.assertEqual(despachar(), (1, 0))
+
+        [arquivo] = os.listdir(diretorio)
+        with open(os.path.join(diretorio, arquivo), encoding='utf-8') as conteudo:
+            self.assertIn('To: ana@example.com', conteudo.read())
+
+
+class FilaMecanicoTest(TestCase):
+    """Testes da fila ao vivo dos mecânicos (fila_mecanico.py)"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, nome_completo='Ana', telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'), especialidade='Motor', telefone='1',
+        )
+
+    def _eventos(self, acao):
+        from .fila_mecanico import fila
+        inicio = fila().ultimo_id
+        with self.captureOnCommitCallbacks(execute=True):
+            acao()
+        return fila()._desde(inicio)
+
+    def test_eventos_das_gravacoes_e_transicoes(self):
+        from . import transicoes
+        agendamento = []
+        [novo] = self._eventos(lambda: agendamento.append(Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto,
+            data_hora=timezone.now() + timedelta(days=1), descricao_problema='Barulho no motor',
+        )))
+        agendamento = agendamento[0]
+        self.assertEqual(
+            (novo['tipo'], novo['agendamento'], novo['status'], novo['cliente'], novo['moto'], novo['descricao']),
+            ('novo', agendamento.id, 'agendado', 'Ana', 'Honda CG', 'Barulho no motor'),
+        )
+
+        [pego] = self._eventos(lambda: transicoes.pegar_agendamento(agendamento.id, self.mecanico))
+        self.assertEqual((pego['tipo'], pego['status'], pego['mecanico']), ('pego', 'em_andamento', self.mecanico.id))
+        [devolvido] = self._eventos(lambda: transicoes.devolver_agendamento(agendamento.id, self.mecanico))
+        self.assertEqual((devolvido['tipo'], devolvido['status']), ('devolvido', 'agendado'))
+
+        def cancelar():
+            agendamento.status = 'cancelado'
+            agendamento.save()
+        [cancelado] = self._eventos(cancelar)
+        self.assertEqual(cancelado['tipo'], 'cancelado')
+        [removido] = self._eventos(agendamento.delete)
+        self.assertEqual((removido['tipo'], removido['agendamento']), ('removido', cancelado['agendamento']))
+
+    def test_nada_publicado_sem_commit(self):
+        from django.db import transaction
+        from .fila_mecanico import fila
+        inicio = fila().ultimo_id
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError), transaction.atomic():
+            Agendamento.objects.create(
+                cliente=self.cliente, servico=self.servico, moto=self.moto, data_hora=timezone.now(),
+            )
+            raise RuntimeError('desfeito')
+        self.assertEqual(fila().ultimo_id, inicio)
+
+    async def test_reconexao_recebe_o_que_perdeu(self):
+        import asyncio
+        from .fila_mecanico import FilaMecanico
+        fila = FilaMecanico(historico=2, fila_max=10)
+        inicio = fila.ultimo_id
+        primeiro = fila.publicar({'tipo': 'novo', 'agendamento': 1})
+        segundo = fila.publicar({'tipo': 'novo', 'agendamento': 2})
+
+        assinante, perdidos = fila.assinar(primeiro['id'])
+        self.assertEqual(perdidos, [segundo])
+        # Publicado por outra thread (a de uma view) chega pelo loop do assinante
+        terceiro = await asyncio.to_thread(fila.publicar, {'tipo': 'pego', 'agendamento': 2})
+        self.assertEqual(await asyncio.wait_for(assinante.fila.get(), 1), terceiro)
+
+        # `inicio` já saiu do histórico, e ids de outro processo não valem: recarregar
+        self.assertEqual(fila.assinar(inicio)[1][0]['tipo'], 'recarregar')
+        self.assertEqual(fila.assinar('outroproc-3')[1][0]['tipo'], 'recarregar')
+
+    async def test_assinante_lento_recebe_recarregar(self):
+        import asyncio
+        from .fila_mecanico import FilaMecanico
+        fila = FilaMecanico(historico=10, fila_max=2)
+        assinante, _ = fila.assinar()
+        for numero in range(3):
+            fila.publicar({'tipo': 'novo', 'agendamento': numero})
+        await asyncio.sleep(0)
+
+        self.assertEqual(assinante.fila.qsize(), 1)
+        self.assertEqual(assinante.fila.get_nowait()['tipo'], 'recarregar')
+
+    async def test_stream_sse(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from .fila_mecanico import fila
+        await sync_to_async(self.async_client.force_login)(self.mecanico.usuario)
+        url = reverse('fila-mecanico-eventos')
+
+        response = await self.async_client.get(url, {'ultimo': fila().ultimo_id})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        conteudo = aiter(response.streaming_content)
+        self.assertEqual(await anext(conteudo), b'retry: 5000\n\n')
+        evento = await asyncio.to_thread(fila().publicar, {'tipo': 'novo', 'agendamento': 7})
+        recebido = await asyncio.wait_for(anext(conteudo), 1)
+        await conteudo.aclose()
+
+        self.assertIn(f"id: {evento['id']}\nevent: agendamento\n".encode(), recebido)
+        self.assertIn(b'"agendamento": 7', recebido)
+
+    def test_stream_so_para_mecanicos(self):
+        self.client.login(username='cli', password='p')
+        self.assertEqual(self.client.get(reverse('fila-mecanico-eventos')).status_code, 403)
+
+    async def test_paineis_levam_ultimo_evento(self):
+        from asgiref.sync import sync_to_async
+        from .fila_mecanico import fila
+        await sync_to_async(self.async_client.force_login)(self.mecanico.usuario)
+        for nome in ('dashboard-mecanico', 'ver-servicos-pendentes'):
+            response = await self.async_client.get(reverse(nome))
+            self.assertContains(response, f'?ultimo={fila().ultimo_id}')
+            self.assertContains(response, 'js/fila-mecanico.js')
+
+    def test_wsgi_sem_stream(self):
+        # O WSGI juntaria o gerador infinito antes de responder: nada de stream
+        self.client.login(username='mec', password='p')
+        for nome in ('dashboard-mecanico', 'ver-servicos-pendentes'):
+            response = self.client.get(reverse(nome))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'data-eventos')
+            self.assertNotContains(response, 'js/fila-mecanico.js')
+
+        response = self.client.get(reverse('fila-mecanico-eventos'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+
+class DashboardsAssincronosTest(TestCase):
+    """Dashboards assíncronos (Views/assincrono.py) nos caminhos ASGI e WSGI"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = User.objects.create_user(username='adm', password='p', is_staff=True)
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, nome_completo='Ana', telefone='1', endereco='Rua')
+        moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'), especialidade='Motor', telefone='1',
+        )
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=servico, moto=moto, data_hora=timezone.now() + timedelta(days=1),
+        )
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=servico, moto=moto, data_hora=timezone.now() - timedelta(days=3),
+            status='concluido', valor_servico=120,
+        )
+
+    def test_views_sao_assincronas(self):
+        import asyncio
+        from .Views import administrador, cliente, mecanico
+        for view in (administrador.dashboard_admin, mecanico.dashboard_mecanico,
+                     cliente.Mostrar, cliente.historico_cliente):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_dashboards_pelo_asgi(self):
+        from asgiref.sync import sync_to_async
+        await sync_to_async(self.async_client.force_login)(self.admin)
+        response = await self.async_client.get(reverse('dashboard-admin'))
+        self.assertEqual(response.context['total_agendamentos'], 2)
+        self.assertEqual(response.context['agendamentos_concluidos'], 1)
+        self.assertEqual(response.context['servicos_labels'], '["Revis\\u00e3o"]')
+
+        await sync_to_async(self.async_client.force_login)(self.mecanico.usuario)
+        response = await self.async_client.get(reverse('dashboard-mecanico'))
+        self.assertEqual(response.content.count(b'class="btn-pegar-agendamento"'), 2)  # linha + <template>
+
+        await sync_to_async(self.async_client.force_login)(self.cliente.usuario)
+        response = await self.async_client.get(reverse('historico-cliente'))
+        self.assertEqual((response.context['total_historico'], response.context['total_gasto']), (1, 120))
+        response = await self.async_client.get(reverse('dashboard-cliente'))
+        self.assertEqual(response.context['total_pendentes'], 1)
+
+    def test_sem_perfil_e_anonimo(self):
+        self.client.login(username='cli', password='p')
+        self.assertRedirects(self.client.get(reverse('dashboard-mecanico')), reverse('login'), fetch_redirect_response=False)
+        self.client.logout()
+        self.assertRedirects(self.client.get(reverse('historico-cliente')), reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('dashboard-cliente')).status_code, 200)
+
+
+class BenchmarkDashboardsTest(TransactionTestCase):
+    """O comando benchmark_dashboards mede os dois caminhos sem falhas"""
+
+    def test_compara_wsgi_e_asgi(self):
+        from io import StringIO
+        from django.core.management import call_command
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        saida = StringIO()
+
+        call_command('benchmark_dashboards', 'adm', requisicoes=4, concorrencia=2, threads=2, stdout=saida)
+
+        linhas = [linha for linha in saida.getvalue().splitlines() if linha.startswith('dashboard-admin')]
+        self.assertEqual([linha.split()[1] for linha in linhas], ['wsgi', 'asgi'])
+        self.assertTrue(all(linha.endswith('falhas 0') for linha in linhas), linhas)
+
+
+class FragmentosTest(TestCase):
+    """Fragmentos de HTML em cache por geração (caches.obter_fragmento)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        user = User.objects.create_user(username='cli', password='p')
+        self.cliente = Cliente.objects.create(usuario=user, nome_completo='Ana', telefone='1', endereco='Rua')
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG', ano=2020)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'), especialidade='Motor', telefone='1',
+        )
+        self.agendamento = Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.moto, data_hora=timezone.now() + timedelta(days=1),
+        )
+
+    def _consultas_agendamento(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in consultas if 'administrador_agendamento' in q['sql'].lower()]
+
+    def test_geracao_muda_so_com_incremento(self):
+        from .caches import geracoes, incrementar_geracao
+        incrementar_geracao('teste')  # sem geração ainda: não faz nada
+        primeira = geracoes('teste')
+        self.assertEqual(geracoes('teste'), primeira)
+
+        incrementar_geracao('teste')
+
+        self.assertEqual(geracoes('teste'), [primeira[0] + 1])
+
+    def test_pendentes_em_cache_ate_agendamento_mudar(self):
+        self.client.login(username='mec', password='p')
+        self.client.get(reverse('ver-servicos-pendentes'))
+
+        response, consultas = self._consultas_agendamento(reverse('ver-servicos-pendentes'))
+
+        self.assertEqual(consultas, [])
+        self.assertContains(response, f'data-agendamento="{self.agendamento.id}"')
+
+        self.agendamento.status = 'cancelado'
+        self.agendamento.save()
+        response, consultas = self._consultas_agendamento(reverse('ver-servicos-pendentes'))
+
+        self.assertNotEqual(consultas, [])
+        self.assertNotContains(response, f'data-agendamento="{self.agendamento.id}"')
+
+    def test_renomear_servico_gera_novo_fragmento(self):
+        self.client.login(username='mec', password='p')
+        self.client.get(reverse('ver-servicos-pendentes'))
+
+        self.servico.nome = 'Troca de óleo'
+        self.servico.save()
+
+        self.assertContains(self.client.get(reverse('ver-servicos-pendentes')), 'Troca de óleo')
+
+    def test_historico_mecanico_em_cache_por_mecanico(self):
+        from .transicoes import concluir_agendamento
+        self.client.login(username='mec', password='p')
+        self.client.get(reverse('historico-mecanico'))
+
+        response, consultas = self._consultas_agendamento(reverse('historico-mecanico'))
+
+        self.assertEqual(consultas, [])
+        self.assertEqual(response.context['total_historico'], 0)
+
+        Agendamento.objects.filter(pk=self.agendamento.pk).update(mecanico=self.mecanico, status='em_andamento')
+        self.assertTrue(concluir_agendamento(self.agendamento.id, self.mecanico, 'Feito', 80))
+        response = self.client.get(reverse('historico-mecanico'))
+
+        self.assertEqual(response.context['total_historico'], 1)
+        self.assertContains(response, f'#{self.agendamento.id}')
+
+    def test_reatribuir_invalida_o_dono_anterior(self):
+        Agendamento.objects.filter(pk=self.agendamento.pk).update(mecanico=self.mecanico, status='concluido')
+        self.client.login(username='mec', password='p')
+        self.assertEqual(self.client.get(reverse('historico-mecanico')).context['total_historico'], 1)
+        outro = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec2', password='p'), especialidade='Freios', telefone='2',
+        )
+
+        # Como em editar_agendamento: o save() só conhece o mecânico novo
+        agendamento = Agendamento.objects.get(pk=self.agendamento.pk)
+        agendamento.mecanico = outro
+        agendamento.save()
+        response = self.client.get(reverse('historico-mecanico'))
+
+        self.assertEqual(response.context['total_historico'], 0)
+        self.assertNotContains(response, f'#{self.agendamento.id}')
+
+    def test_painel_do_cliente_em_cache(self):
+        self.client.login(username='cli', password='p')
+        self.client.get(reverse('dashboard-cliente'))
+
+        response, consultas = self._consultas_agendamento(reverse('dashboard-cliente'))
+
+        self.assertEqual(consultas, [])
+        self.assertEqual(response.context['total_motos'], 1)
+
+        Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Fazer', ano=2021)
+
+        self.assertEqual(self.client.get(reverse('dashboard-cliente')).context['total_motos'], 2)
+
+
+class AutocompletarTest(TestCase):
+    """Autocompletar de clientes e mecânicos (busca.py) nos formulários do administrador"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        self.ana = Cliente.objects.create(
+            usuario=User.objects.create_user(username='ana.s', password='p'), nome_completo='Ana Souza',
+            cpf='123.456.789-00', email='ana@exemplo.com', telefone='1', endereco='Rua',
+        )
+        self.mariana = Cliente.objects.create(
+            usuario=User.objects.create_user(username='mari', password='p'), nome_completo='Mariana Lima',
+            cpf='987.654.321-00', email='mariana@exemplo.com', telefone='1', endereco='Rua',
+        )
+        self.mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='joao.mec', password='p', email='joao@oficina.com'),
+            nome_completo='João Pereira', especialidade='Motor', telefone='1',
+        )
+        self.client.login(username='adm', password='p')
+
+    def _buscar(self, tipo, q, **params):
+        response = self.client.get(reverse('autocompletar', args=[tipo]), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [opcao['id'] for opcao in response.json()['resultados']]
+
+    def test_trecho_de_qualquer_campo_e_prefixo_primeiro(self):
+        self.assertEqual(self._buscar('clientes', 'ana'), [self.ana.id, self.mariana.id])
+        self.assertEqual(self._buscar('clientes', 'LIMA'), [self.mariana.id])
+        self.assertEqual(self._buscar('clientes', '654.321'), [self.mariana.id])
+        self.assertEqual(self._buscar('clientes', 'ana.s'), [self.ana.id])
+        self.assertEqual(self._buscar('mecanicos', '@oficina'), [self.mecanico.id])
+        self.assertEqual(self._buscar('clientes', '"%_'), [])
+
+    def test_termo_curto_e_limite(self):
+        for i in range(25):
+            Cliente.objects.create(
+                usuario=User.objects.create_user(username=f'lote{i}', password='p'), nome_completo=f'Lote {i}',
+                email=f'lote{i}@exemplo.com', telefone='1', endereco='Rua',
+            )
+
+        self.assertEqual(self._buscar('clientes', 'an'), [])
+        self.assertEqual(len(self._buscar('clientes', 'lote', limite=100)), 20)
+        self.assertEqual(len(self._buscar('clientes', 'lote')), 10)
+
+    def test_indice_acompanha_gravacoes(self):
+        self.ana.nome_completo = 'Ana Beatriz'
+        self.ana.save()
+        self.mariana.usuario.username = 'mlima'
+        self.mariana.usuario.save()
+        self.mecanico.delete()
+
+        self.assertEqual(self._buscar('clientes', 'beatriz'), [self.ana.id])
+        self.assertEqual(self._buscar('clientes', 'souza'), [])
+        self.assertEqual(self._buscar('clientes', 'mlima'), [self.mariana.id])
+        self.assertEqual(self._buscar('mecanicos', 'joão'), [])
+
+    def test_reindexar_busca(self):
+        from io import StringIO
+        from django.core.management import call_command
+        Cliente.objects.filter(pk=self.ana.pk).update(nome_completo='Ana Carvalho')  # sem sinais
+
+        call_command('reindexar_busca', stdout=StringIO())
+
+        self.assertEqual(self._buscar('clientes', 'carvalho'), [self.ana.id])
+
+    def test_so_administrador(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('autocompletar', args=['clientes']), {'q': 'ana'}).status_code, 401)
+        self.client.login(username='ana.s', password='p')
+        self.assertEqual(self.client.get(reverse('autocompletar', args=['clientes']), {'q': 'ana'}).status_code, 403)
+
+    def test_formularios_nao_listam_clientes(self):
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        moto = Moto.objects.create(cliente=self.ana, marca='Honda', modelo='CG', ano=2020)
+        agendamento = Agendamento.objects.create(
+            cliente=self.ana, servico=servico, moto=moto, data_hora=timezone.now() + timedelta(days=1),
+        )
+
+        self.assertNotContains(self.client.get(reverse('agendar-servico-admin')), 'Mariana Lima')
+        response = self.client.get(reverse('editar_agendamento', args=[agendamento.id]))
+        self.assertContains(response, 'value="Ana Souza"')
+        self.assertContains(response, f'name="cliente" value="{self.ana.id}"')
+        self.assertNotContains(response, 'Mariana Lima')
+
+
+class BuscaTextualTest(TestCase):
+    """Busca textual de agendamentos (busca.AGENDAMENTOS) e o endpoint /busca/"""
+
+    def setUp(self):
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        self.cliente = Cliente.objects.create(
+            usuario=User.objects.create_user(username='cli', password='p'), nome_completo='Carlos Almeida',
+            email='carlos@exemplo.com', telefone='1', endereco='Rua',
+        )
+        self.honda = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG 160', ano=2020, placa='ABC1D23')
+        self.yamaha = Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Fazer', ano=2021)
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        self.freio = Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.honda,
+            data_hora=timezone.make_aware(datetime(2026, 3, 10, 9)), descricao_problema='Barulho no freio dianteiro',
+        )
+        self.oleo = Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.yamaha,
+            data_hora=timezone.make_aware(datetime(2026, 5, 4, 9)), descricao_problema='Vazamento de óleo perto do freio',
+        )
+        self.client.login(username='adm', password='p')
+
+    def _buscar(self, q, **params):
+        response = self.client.get(reverse('busca'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [resultado['id'] for resultado in response.json()['resultados']]
+
+    def test_palavras_prefixo_e_acentos(self):
+        self.assertEqual(self._buscar('honda freio'), [self.freio.id])
+        self.assertEqual(set(self._buscar('frei')), {self.freio.id, self.oleo.id})
+        self.assertEqual(set(self._buscar('REVISAO')), {self.freio.id, self.oleo.id})
+        self.assertEqual(self._buscar('oleo'), [self.oleo.id])
+        self.assertEqual(self._buscar('abc1d23'), [self.freio.id])
+        self.assertEqual(self._buscar('"*('), [])
+
+    def test_moto_pesa_mais_que_descricao(self):
+        Agendamento.objects.create(
+            cliente=self.cliente, servico=self.servico, moto=self.yamaha,
+            data_hora=timezone.make_aware(datetime(2026, 6, 1, 9)), descricao_problema='Comparar com a honda do vizinho',
+        )
+
+        self.assertEqual(self._buscar('honda')[0], self.freio.id)
+
+    def test_filtro_por_periodo(self):
+        self.assertEqual(self._buscar('freio', inicio='2026-03-01', fim='2026-03-31'), [self.freio.id])
+        self.assertEqual(self.client.get(reverse('busca'), {'q': 'freio', 'inicio': '03/2026'}).status_code, 400)
+
+    def test_indice_acompanha_ordem_transicao_e_exclusao(self):
+        from decimal import Decimal
+        from .transicoes import concluir_agendamento, pegar_agendamento
+        mecanico = Mecanico.objects.create(
+            usuario=User.objects.create_user(username='mec', password='p'), especialidade='Motor', telefone='1',
+        )
+        OrdemServico.objects.create(
+            agendamento=self.oleo, descricao_servico='Troca do retentor', custo=Decimal('80.00'),
+            observacoes='Cliente pediu peça original',
+        )
+        self.assertTrue(pegar_agendamento(self.freio.id, mecanico))
+        self.assertTrue(concluir_agendamento(self.freio.id, mecanico, 'Pastilhas substituídas', Decimal('150.00')))
+        self.honda.modelo = 'Titan'
+        self.honda.save()
+
+        self.assertEqual(self._buscar('retentor original'), [self.oleo.id])
+        self.assertEqual(self._buscar('pastilhas'), [self.freio.id])
+        self.assertEqual(self._buscar('titan'), [self.freio.id])
+
+        self.oleo.delete()
+        self.assertEqual(self._buscar('retentor'), [])
+
+    def test_so_administrador(self):
+        self.client.login(username='cli', password='p')
+        self.assertEqual(self.client.get(reverse('busca'), {'q': 'freio'}).status_code, 403)
+
+
+class PlacaTest(TestCase):
+    """Chave normalizada da placa (placas.py), o endpoint de busca por placa e o preenchimento"""
+
+    def setUp(self):
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        self.cliente = Cliente.objects.create(
+            usuario=User.objects.create_user(username='cli', password='p'), nome_completo='Carlos Almeida',
+            email='carlos@exemplo.com', telefone='1', endereco='Rua',
+        )
+        self.moto = Moto.objects.create(cliente=self.cliente, marca='Honda', modelo='CG 160', ano=2020, placa='abc-1234')
+        self.client.login(username='adm', password='p')
+
+    def _buscar(self, placa):
+        response = self.client.get(reverse('buscar-placa'), {'placa': placa})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resultados']
+
+    def test_normalizar_placa(self):
+        from .placas import normalizar_placa
+        self.assertEqual(normalizar_placa('abc-1234'), 'ABC1C34')
+        self.assertEqual(normalizar_placa(' ABC 1234 '), 'ABC1C34')
+        self.assertEqual(normalizar_placa('abc1c34'), 'ABC1C34')
+        self.assertEqual(normalizar_placa('xyz.9j99'), 'XYZ9J99')
+        self.assertEqual(normalizar_placa('ESPECIAL-1'), 'ESPECIAL1')
+        self.assertIsNone(normalizar_placa(' - '))
+        self.assertIsNone(normalizar_placa(None))
+
+    def test_formas_antiga_e_mercosul_acham_a_mesma_moto(self):
+        self.assertEqual(self.moto.placa_normalizada, 'ABC1C34')
+        for placa in ('ABC1234', 'abc 1234', 'ABC-1C34'):
+            self.assertEqual([resultado['id'] for resultado in self._buscar(placa)], [self.moto.id])
+        self.assertEqual(self._buscar('ABC1235'), [])
+
+        self.moto.placa = 'DEF4G56'
+        self.moto.save(update_fields=['placa'])
+        self.moto.refresh_from_db()
+        self.assertEqual(self.moto.placa_normalizada, 'DEF4G56')
+
+    def test_dono_e_ultimo_servico_em_uma_query(self):
+        from decimal import Decimal
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+        for dia, status in ((1, 'concluido'), (5, 'concluido'), (9, 'pendente')):
+            Agendamento.objects.create(
+                cliente=self.cliente, servico=servico, moto=self.moto, status=status,
+                data_hora=timezone.make_aware(datetime(2026, 3, dia, 9)), valor_servico=Decimal('100.00') * dia,
+            )
+
+        self._buscar('ABC1234')  # sessão e perfil já carregados nas medidas abaixo
+        with CaptureQueriesContext(connection) as uma_moto:
+            [resultado] = self._buscar('ABC1234')
+        self.assertEqual(resultado['cliente']['nome'], 'Carlos Almeida')
+        self.assertEqual(resultado['ultimo_servico']['data_hora'], '05/03/2026 09:00')
+        self.assertEqual(resultado['ultimo_servico']['valor'], '500.00')
+
+        # Mais motos com a mesma placa (a moto vendida, agora de outro cliente) não acrescentam consultas
+        comprador = Cliente.objects.create(
+            usuario=User.objects.create_user(username='cli2', password='p'), nome_completo='Beatriz Souza',
+            email='beatriz@exemplo.com', telefone='2', endereco='Rua',
+        )
+        Moto.objects.create(cliente=comprador, marca='Honda', modelo='CG 160', ano=2020, placa='ABC1C34')
+        with CaptureQueriesContext(connection) as duas_motos:
+            resultados = self._buscar('ABC1234')
+        self.assertEqual(len(resultados), 2)
+        self.assertIsNone(resultados[0]['ultimo_servico'])
+        self.assertEqual(len(duas_motos), len(uma_moto))
+        self.assertEqual(sum('Administrador_moto' in query['sql'] for query in uma_moto), 1)
+
+    def test_moto_sem_dono(self):
+        Moto.objects.create(marca='Suzuki', modelo='Yes', ano=2010, placa='QWE-5678')
+
+        [resultado] = self._buscar('QWE5G78')
+
+        self.assertEqual(resultado['modelo'], 'Yes')
+        self.assertIsNone(resultado['cliente'])
+
+    def test_validacao_e_permissao(self):
+        self.assertEqual(self.client.get(reverse('buscar-placa'), {'placa': ' - '}).status_code, 400)
+        self.client.login(username='cli', password='p')
+        self.assertEqual(self.client.get(reverse('buscar-placa'), {'placa': 'ABC1234'}).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('buscar-placa'), {'placa': 'ABC1234'}).status_code, 401)
+
+    def test_comando_preenche_em_lotes(self):
+        from io import StringIO
+        from django.core.management import call_command
+        Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Fazer', ano=2021, placa='XYZ9J99')
+        Moto.objects.create(cliente=self.cliente, marca='Yamaha', modelo='Crosser', ano=2022)
+        Moto.objects.update(placa_normalizada=None)
+
+        saida = StringIO()
+        call_command('normalizar_placas', lote=2, stdout=saida)
+
+        self.assertIn('2 de 3 motos atualizadas', saida.getvalue())
+        self.assertEqual(
+            set(Moto.objects.values_list('placa_normalizada', flat=True)), {'ABC1C34', 'XYZ9J99', None},
+        )
+
+
+class MotoTest(TestCase):
+    """Resolução da moto por cliente e placa (motos.py) e a mescla das motos antigas"""
+
+    def setUp(self):
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        self.ana, self.bruno, self.carla = (
+            Cliente.objects.create(
+                usuario=User.objects.create_user(username=nome.lower(), password='p'), nome_completo=nome,
+                email=f'{nome.lower()}@exemplo.com', telefone='1', endereco='Rua',
+            )
+            for nome in ('Ana', 'Bruno', 'Carla')
+        )
+        self.servico = Servicos.objects.create(nome='Revisão', descricao='Geral')
+
+    def _agendar(self, cliente, moto, dia=1):
+        return Agendamento.objects.create(
+            cliente=cliente, servico=self.servico, moto=moto, data_hora=timezone.make_aware(datetime(2026, 3, dia, 9)),
+        )
+
+    def test_resolver_moto_por_cliente_e_placa(self):
+        from .motos import resolver_moto
+        moto = resolver_moto(self.ana, 'Honda', 'CG 160', '2020', 'abc-1234')
+
+        self.assertEqual(resolver_moto(self.ana, 'Honda', 'Titan', 2020, 'ABC1C34'), moto)
+        self.assertNotEqual(resolver_moto(self.bruno, 'Honda', 'CG 160', 2020, 'ABC1234'), moto)
+        sem_placa = resolver_moto(self.ana, 'Yamaha', 'Fazer', 2021)
+        self.assertEqual(resolver_moto(self.ana, ' yamaha ', 'FAZER', 2021, ''), sem_placa)
+        # A placa informada depois vai para a moto sem placa
+        self.assertEqual(resolver_moto(self.ana, 'Yamaha', 'Fazer', 2021, 'XYZ9J99'), sem_placa)
+        sem_placa.refresh_from_db()
+        self.assertEqual(sem_placa.placa_normalizada, 'XYZ9J99')
+        self.assertEqual(Moto.objects.filter(cliente=self.ana).count(), 2)
+
+    def test_resolver_moto_quando_outra_requisicao_grava_primeiro(self):
+        from unittest import mock
+        from . import motos
+        existente = Moto.objects.create(cliente=self.ana, marca='Honda', modelo='CG 160', ano=2020, placa='ABC1234')
+
+        # A primeira leitura não vê a moto, como se ela ainda não tivesse sido gravada:
+        # o INSERT esbarra na restrição e a segunda leitura acha a moto
+        with mock.patch('Administrador.motos._procurar', side_effect=[None, existente]):
+            self.assertEqual(motos.resolver_moto(self.ana, 'Honda', 'CG 160', 2020, 'ABC-1234'), existente)
+        self.assertEqual(Moto.objects.count(), 1)
+
+    def test_formularios_do_administrador_usam_a_moto_do_cliente(self):
+        moto_da_ana = Moto.objects.create(cliente=self.ana, marca='Honda', modelo='CG 160', ano=2020)
+        agendamento = self._agendar(self.bruno, Moto.objects.create(cliente=self.bruno, marca='Honda', modelo='Biz', ano=2015))
+        self.client.login(username='adm', password='p')
+
+        self.client.post(reverse('editar_agendamento', args=[agendamento.id]), {
+            'cliente': self.bruno.id, 'servico': self.servico.id, 'data': '2026-03-01', 'hora': '09:00',
+            'marca': 'Honda', 'modelo': 'CG 160', 'ano': '2020', 'placa': 'def-4567', 'status': 'agendado',
+        })
+
+        agendamento.refresh_from_db()
+        self.assertNotEqual(agendamento.moto_id, moto_da_ana.id)
+        self.assertEqual(agendamento.moto.cliente, self.bruno)
+        self.assertEqual(agendamento.moto.placa_normalizada, 'DEF4F67')
+
+    def test_mesclar_motos_separa_compartilhadas(self):
+        from io import StringIO
+        from django.core.management import call_command
+        # Motos das versões antigas: sem dono ou de um cliente no agendamento de outro
+        orfa = Moto.objects.create(marca='Honda', modelo='CG 160', ano=2020)
+        da_bruno = Moto.objects.create(cliente=self.bruno, marca='honda', modelo='cg 160', ano=2020)
+        da_carla = Moto.objects.create(cliente=self.carla, marca='Yamaha', modelo='Fazer', ano=2021, placa='XYZ9J99')
+        sobra = Moto.objects.create(marca='Suzuki', modelo='Yes', ano=2010)
+        da_ana_1 = self._agendar(self.ana, orfa, 1)
+        do_bruno = self._agendar(self.bruno, orfa, 2)
+        da_ana_2 = self._agendar(self.ana, da_carla, 3)
+
+        saida = StringIO()
+        call_command('mesclar_motos', stdout=saida)
+
+        self.assertIn('1 motos criadas', saida.getvalue())
+        orfa.refresh_from_db()
+        self.assertEqual(orfa.cliente, self.ana)
+        for agendamento in (da_ana_1, do_bruno, da_ana_2):
+            agendamento.refresh_from_db()
+            self.assertEqual(agendamento.moto.cliente_id, agendamento.cliente_id)
+        self.assertEqual(do_bruno.moto, da_bruno)
+        self.assertEqual(da_ana_2.moto.placa_normalizada, 'XYZ9J99')
+        self.assertFalse(Moto.objects.filter(pk=sobra.pk).exists())
+
+
+class CatalogoServicosTest(TestCase):
+    """Catálogo de serviços (servicos.py): chave do nome, cache e criação sem duplicar"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.revisao = Servicos.objects.create(nome='Revisão Geral', descricao='Completa')
+        self.oleo = Servicos.objects.create(nome='Troca de óleo', descricao='Óleo e filtro')
+
+    def test_nome_normalizado(self):
+        self.assertEqual(Servicos.normalizar_nome('  REVISÃO   geral '), 'revisao geral')
+        self.assertEqual(self.revisao.nome_normalizado, 'revisao geral')
+
+    def test_catalogo_sem_consultas_depois_da_primeira_leitura(self):
+        from .servicos import listar_servicos, obter_servico, servico_por_nome
+        self.assertEqual(listar_servicos(), [self.revisao, self.oleo])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(servico_por_nome('revisao  GERAL', 'x'), self.revisao)
+            self.assertEqual(obter_servico(str(self.oleo.id)), self.oleo)
+            self.assertEqual(len(listar_servicos()), 2)
+
+    def test_mudanca_invalida_o_catalogo(self):
+        from django.http import Http404
+        from .servicos import listar_servicos, obter_servico, servico_por_nome
+        listar_servicos()
+
+        self.oleo.nome = 'Troca de óleo sintético'
+        self.oleo.save(update_fields=['nome'])
+        novo = servico_por_nome('Alinhamento', 'Rodas')
+
+        self.assertEqual(servico_por_nome('troca de oleo sintetico', 'x'), self.oleo)
+        self.assertEqual(servico_por_nome('ALINHAMENTO', 'x'), novo)
+        self.assertEqual(Servicos.objects.count(), 3)
+        novo.delete()
+        with self.assertRaises(Http404):
+            obter_servico(novo.id)
+
+    def test_criacao_simultanea_usa_o_servico_ja_gravado(self):
+        from unittest import mock
+        from .servicos import servico_por_nome
+        vazio = {'por_id': {}, 'por_nome': {}}
+
+        # Catálogo lido antes de outra requisição gravar o serviço: o INSERT esbarra no índice único
+        with mock.patch('Administrador.servicos.obter_catalogo_servicos', return_value=vazio):
+            self.assertEqual(servico_por_nome('Revisao geral', 'x'), self.revisao)
+        self.assertEqual(Servicos.objects.count(), 2)
+
+    def test_servico_personalizado_do_administrador_reaproveita_o_existente(self):
+        User.objects.create_user(username='adm', password='p', is_staff=True)
+        cliente = Cliente.objects.create(
+            usuario=User.objects.create_user(username='cli', password='p'), nome_completo='Ana',
+            email='ana@exemplo.com', telefone='1', endereco='Rua',
+        )
+        agendamento = Agendamento.objects.create(
+            cliente=cliente, servico=self.oleo, data_hora=timezone.make_aware(datetime(2026, 3, 2, 9)),
+            moto=Moto.objects.create(cliente=cliente, marca='Honda', modelo='CG 160', ano=2020),
+        )
+        self.client.login(username='adm', password='p')
+
+        self.client.post(reverse('editar_agendamento', args=[agendamento.id]), {
+            'cliente': cliente.id, 'servico': 'outro', 'outro_servico': 'revisão geral', 'data': '2026-03-02',
+            'hora': '09:00', 'marca': 'Honda', 'modelo': 'CG 160', 'ano': '2020', 'status': 'agendado',
+        })
+
+        agendamento.refresh_from_db()
+        self.assertEqual(agendamento.servico, self.revisao)
+        self.assertEqual(Servicos.objects.count(), 2)
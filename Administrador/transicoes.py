@@ -0,0 +1,65 @@
+"""
+Transições de status do Agendamento feitas pelos mecânicos
+
+Cada transição é um único UPDATE condicional (compare-and-set): a condição
+de estado vai no WHERE e o número de linhas afetadas diz se a operação
+venceu. Dois mecânicos clicando ao mesmo tempo nunca sobrescrevem um ao
+outro, e não há SELECT ... FOR UPDATE nem round trip extra de lock.
+
+Como update() não dispara post_save, cada transição vencedora envia o sinal
+agendamento_transicionado para quem mantém caches ou notificações. A
+conclusão grava o e-mail ao cliente na caixa de saída (caixa_saida.py) na
+mesma transação do UPDATE.
+"""
+from django.db import transaction
+
+from . import caixa_saida
+from .models import Agendamento
+from .signals import agendamento_transicionado
+
+
+def _notificar(agendamento_id, status):
+    agendamento_transicionado.send(sender=Agendamento, agendamento_id=agendamento_id, status=status)
+
+
+def pegar_agendamento(agendamento_id, mecanico):
+    """agendado e sem mecânico -> em_andamento com este mecânico. Retorna True se venceu."""
+    atualizados = Agendamento.objects.filter(
+        id=agendamento_id,
+        status='agendado',
+        mecanico__isnull=True,
+    ).update(mecanico=mecanico, status='em_andamento')
+    if atualizados:
+        _notificar(agendamento_id, 'em_andamento')
+    return atualizados == 1
+
+
+def concluir_agendamento(agendamento_id, mecanico, descricao_mecanico, valor_servico):
+    """em_andamento com este mecânico -> concluido. Retorna True se venceu."""
+    with transaction.atomic():
+        atualizados = Agendamento.objects.filter(
+            id=agendamento_id,
+            mecanico=mecanico,
+            status='em_andamento',
+        ).update(
+            status='concluido',
+            descricao_mecanico=descricao_mecanico,
+            valor_servico=valor_servico,
+        )
+        if atualizados:
+            caixa_saida.enfileirar('conclusao', agendamento_id)
+    if atualizados:
+        _notificar(agendamento_id, 'concluido')
+    return atualizados == 1
+
+
+def devolver_agendamento(agendamento_id, mecanico):
+    """em_andamento com este mecânico -> agendado sem mecânico. Retorna True se venceu."""
+    atualizados = Agendamento.objects.filter(
+        id=agendamento_id,
+        mecanico=mecanico,
+        status='em_andamento',
+    ).update(mecanico=None, status='agendado')
+    if atualizados:
+        _notificar(agendamento_id, 'agendado')
+    return atualizados == 1
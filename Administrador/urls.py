@@ -21,6 +21,7 @@ urlpatterns = [
     
     # Agendamento e serviços
     path('agendamento/', cliente.agendar_servico, name='agendar-servico'),
+    path('horarios-disponiveis/', cliente.horarios_disponiveis, name='horarios-disponiveis'),
     path('lista-servicos/', cliente.listas_servicos, name='lista-servicos'),
     path('ordens-servico/', cliente.ordens_servico, name='ordens-servico'),
     path('criar-ordem/<int:agendamento_id>/', cliente.criar_ordem_servico, name='criar-ordem-servico'),
@@ -41,11 +42,15 @@ urlpatterns = [
     path('concluir-agendamento/<int:agendamento_id>/', mecanico.concluir_agendamento, name='concluir-agendamento'),
     path('cancelar-agendamento-mecanico/<int:agendamento_id>/', mecanico.cancelar_agendamento_mecanico, name='cancelar-agendamento-mecanico'),
     path('ver-servicos-pendentes/', mecanico.ver_servicos_pendentes, name='ver-servicos-pendentes'),
+    path('fila-mecanico/eventos/', mecanico.fila_eventos, name='fila-mecanico-eventos'),
     path('historico-mecanico/', mecanico.historico_mecanico, name='historico-mecanico'),
     path('logout-mecanico/', mecanico.logout_mecanico, name='logout-mecanico'),
     
     path('adm-agendamentos/', administrador.agendamentos_admin, name='adm-agendamentos'),
     path('agendamento-admin/', administrador.agendar_servico_admin, name='agendar-servico-admin'), 
+    path('autocompletar/<str:tipo>/', administrador.autocompletar, name='autocompletar'),
+    path('busca/', administrador.buscar_agendamentos, name='busca'),
+    path('motos/placa/', administrador.buscar_placa, name='buscar-placa'),
     
     # CRUD de Clientes pelo Admin
     path('editar_cliente/<int:pk>/', administrador.editar_cliente, name='editar_cliente'),
@@ -62,9 +67,11 @@ urlpatterns = [
     # CRUD de Agendamentos pelo Admin
     path('editar_agendamento/<int:id>/', administrador.editar_agendamento, name='editar_agendamento'),
     path('cancelar_agendamento/<int:id>/', administrador.cancelar_agendamento, name='cancelar_agendamento'),
+    path('exportar/<str:tipo>.<str:formato>', administrador.exportar_dados, name='exportar_dados'),
     
     # Configurações do Administrador
     path('configuracoes/', administrador.configuracoes_admin, name='configuracoes_admin'),
     path('limpar-dados/', administrador.limpar_dados_sistema, name='limpar_dados_sistema'),
+    path('limpar-dados/<int:id>/status/', administrador.status_limpeza, name='status_limpeza'),
     
 ]
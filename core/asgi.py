@@ -3,6 +3,12 @@ ASGI config for Oficina project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live mechanic queue (Administrador/fila_mecanico.py) streams Server-Sent
+Events from an async generator, so it needs this entry point: under WSGI
+(``manage.py runserver``) the pages skip the stream and mechanics refresh the
+page to see new bookings. Run a single process, e.g.
+``uvicorn core.asgi:application``, since the queue's pub/sub is in-process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
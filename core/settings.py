@@ -5,6 +5,7 @@ Generated by 'django-admin startproject' using Django 3.2.19.
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,6 +33,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Administrador.middleware.PerfilMiddleware',
+    'Administrador.middleware.AuditoriaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,6 +71,55 @@ DATABASES = {
     }
 }
 
+# Cache
+# Backend em arquivo para que todos os workers (gunicorn) compartilhem os valores.
+# Em produção pode ser trocado por Redis/Memcached sem mudar o código.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+    }
+}
+
+# Nos testes, cache em memória para não reaproveitar valores de execuções anteriores
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Auditoria (LogAuditoria): gravação em lote por uma thread, ver Administrador/auditoria.py
+AUDITORIA_TAMANHO_LOTE = 200
+AUDITORIA_INTERVALO = 2.0  # segundos até gravar um lote incompleto
+AUDITORIA_FILA_MAX = 10000
+AUDITORIA_ESPERA_MAX = 0.5  # segundos que uma requisição espera com a fila cheia
+AUDITORIA_EM_SEGUNDO_PLANO = 'test' not in sys.argv
+# Meses de auditoria mantidos, contando o corrente; partições mais antigas são descartadas
+AUDITORIA_MESES_RETENCAO = 12
+
+# E-mail: no desenvolvimento as mensagens saem no console
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'MotoService <nao-responda@oficina.com>'
+EMAILS_INTERVALO = 5  # segundos entre os ciclos do worker da caixa de saída (enviar_emails)
+
+# Lembretes de agendamento (Administrador/lembretes.py): backend de cada canal
+LEMBRETES_BACKENDS = {
+    'email': 'Administrador.lembretes.BackendEmail',
+    'sms': 'Administrador.lembretes.BackendSmsConsole',
+}
+LEMBRETES_SMS_ARQUIVO = BASE_DIR / 'sms' / 'enviados.txt'  # usado por BackendSmsArquivo
+LEMBRETES_INTERVALO = 60  # segundos entre os ciclos do agendador
+
+# Fila ao vivo dos mecânicos (SSE), ver Administrador/fila_mecanico.py
+FILA_MECANICO_HEARTBEAT = 15  # segundos entre os pings de uma conexão ociosa
+FILA_MECANICO_HISTORICO = 200  # eventos guardados para as reconexões
+FILA_MECANICO_FILA_MAX = 100  # eventos pendentes por conexão antes de pedir 'recarregar'
+
+# Listagem de agendamentos do administrador (paginação por cursor)
+AGENDAMENTOS_POR_PAGINA = 50
+AGENDAMENTOS_POR_PAGINA_MAX = 200
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -0,0 +1,122 @@
+// Campos de cliente e mecânico dos formulários de agendamento do administrador.
+// Uso: {% include "Administrador/components/autocompletar.html" with tipo="clientes" campo="cliente" %}
+// O texto digitado consulta data-url?q=; a opção escolhida grava o id no input oculto.
+document.addEventListener("DOMContentLoaded", function () {
+  const MIN_CARACTERES = 3;
+  const ESPERA_MS = 250;
+
+  document.querySelectorAll(".autocompletar[data-url]").forEach((caixa) => {
+    const busca = caixa.querySelector('input[type="search"]');
+    const oculto = caixa.querySelector('input[type="hidden"]');
+    const lista = caixa.querySelector(".autocompletar-opcoes");
+    let escolhido = busca.value;
+    let opcoes = [];
+    let ativa = -1;
+    let espera = null;
+    let pedido = null;
+
+    function fechar() {
+      lista.hidden = true;
+      busca.setAttribute("aria-expanded", "false");
+      ativa = -1;
+    }
+
+    function marcar(indice) {
+      ativa = indice;
+      lista.querySelectorAll("li").forEach((item, i) => item.setAttribute("aria-selected", i === ativa));
+    }
+
+    function escolher(opcao) {
+      oculto.value = opcao.id;
+      busca.value = escolhido = opcao.nome;
+      busca.setCustomValidity("");
+      fechar();
+    }
+
+    function mostrar(resultados) {
+      opcoes = resultados;
+      lista.innerHTML = "";
+      if (!resultados.length) {
+        const vazio = document.createElement("li");
+        vazio.textContent = "Nenhum resultado";
+        vazio.setAttribute("aria-disabled", "true");
+        lista.appendChild(vazio);
+      }
+      resultados.forEach((opcao, i) => {
+        const item = document.createElement("li");
+        item.setAttribute("role", "option");
+        item.textContent = opcao.nome;
+        const detalhe = document.createElement("small");
+        detalhe.textContent = opcao.detalhe;
+        item.appendChild(detalhe);
+        // mousedown: antes do blur do campo fechar a lista
+        item.addEventListener("mousedown", (evento) => {
+          evento.preventDefault();
+          escolher(opcoes[i]);
+        });
+        lista.appendChild(item);
+      });
+      lista.hidden = false;
+      busca.setAttribute("aria-expanded", "true");
+      marcar(-1);
+    }
+
+    function consultar() {
+      const termo = busca.value.trim();
+      if (termo.length < MIN_CARACTERES) {
+        fechar();
+        return;
+      }
+      // Só a resposta do último termo importa
+      if (pedido) {
+        pedido.abort();
+      }
+      pedido = new AbortController();
+      fetch(`${caixa.dataset.url}?q=${encodeURIComponent(termo)}`, { signal: pedido.signal })
+        .then((resposta) => resposta.json())
+        .then((dados) => mostrar(dados.resultados || []))
+        .catch((erro) => {
+          if (erro.name !== "AbortError") {
+            fechar();
+          }
+        });
+    }
+
+    busca.addEventListener("input", () => {
+      // O texto mudou: o id anterior não vale mais
+      oculto.value = "";
+      busca.setCustomValidity("");
+      clearTimeout(espera);
+      espera = setTimeout(consultar, ESPERA_MS);
+    });
+
+    busca.addEventListener("keydown", (evento) => {
+      if (lista.hidden || !opcoes.length) {
+        return;
+      }
+      if (evento.key === "ArrowDown" || evento.key === "ArrowUp") {
+        evento.preventDefault();
+        const passo = evento.key === "ArrowDown" ? 1 : -1;
+        marcar((ativa + passo + opcoes.length) % opcoes.length);
+      } else if (evento.key === "Enter" && ativa >= 0) {
+        evento.preventDefault();
+        escolher(opcoes[ativa]);
+      } else if (evento.key === "Escape") {
+        fechar();
+      }
+    });
+
+    busca.addEventListener("blur", fechar);
+
+    busca.form.addEventListener("submit", (evento) => {
+      if (!busca.value.trim()) {
+        // Campo opcional (mecânico) apagado: sem atribuição
+        oculto.value = "";
+      } else if (!oculto.value || busca.value !== escolhido) {
+        busca.setCustomValidity("Escolha uma das opções da lista.");
+        busca.reportValidity();
+        evento.preventDefault();
+      }
+    });
+  });
+});
@@ -133,8 +133,37 @@
   }
 
   // Funcionalidades de Segurança
+  function urlLimpeza() {
+    return document.querySelector("[data-url-limpeza]").dataset.urlLimpeza;
+  }
+
+  // A limpeza roda em segundo plano: consulta o status até terminar
+  function acompanharLimpeza(statusUrl, onConcluida) {
+    fetch(statusUrl)
+      .then((response) => response.json())
+      .then((tarefa) => {
+        if (tarefa.status === "concluida") {
+          showNotification(
+            "✅ Limpeza concluída: " + tarefa.total_removidos + " registros removidos.",
+            "success"
+          );
+          if (onConcluida) onConcluida();
+        } else if (tarefa.status === "erro") {
+          showNotification("❌ Erro durante a limpeza: " + tarefa.erro, "error");
+        } else {
+          showNotification("⏳ Limpeza em andamento: " + tarefa.progresso + "%", "info");
+          setTimeout(() => acompanharLimpeza(statusUrl, onConcluida), 3000);
+        }
+      })
+      .catch((error) => {
+        showNotification("❌ Erro de conexão: " + error.message, "error");
+      });
+  }
+
   function cleanupData(type) {
     const messages = {
+      arquivamento:
+        "Confirma o arquivamento dos agendamentos antigos? Eles continuarão nos históricos.",
       agendamentos:
         "Confirma a limpeza dos agendamentos antigos? Esta ação não pode ser desfeita.",
       logs: "Confirma a limpeza dos logs do sistema? Esta ação não pode ser desfeita.",
@@ -145,7 +174,7 @@
       showNotification(" Limpeza de " + type + " iniciada!", "info");
 
       // Fazer requisição AJAX para limpar dados
-      fetch('{% url "limpar_dados_sistema" %}', {
+      fetch(urlLimpeza(), {
         method: "POST",
         headers: {
           "Content-Type": "application/x-www-form-urlencoded",
@@ -158,6 +187,7 @@
         .then((data) => {
           if (data.success) {
             showNotification("✅ " + data.message, "success");
+            if (data.status_url) acompanharLimpeza(data.status_url);
           } else {
             showNotification(
               "❌ " + (data.error || "Erro durante a limpeza"),
@@ -192,7 +222,7 @@
           );
 
           // Fazer requisição AJAX para reset total
-          fetch('{% url "limpar_dados_sistema" %}', {
+          fetch(urlLimpeza(), {
             method: "POST",
             headers: {
               "Content-Type": "application/x-www-form-urlencoded",
@@ -208,9 +238,11 @@
             .then((data) => {
               if (data.success) {
                 showNotification("💥 " + data.message, "success");
-                setTimeout(() => {
-                  window.location.reload();
-                }, 3000);
+                acompanharLimpeza(data.status_url, () => {
+                  setTimeout(() => {
+                    window.location.reload();
+                  }, 3000);
+                });
               } else {
                 showNotification(
                   "❌ " + (data.error || "Erro durante o reset"),
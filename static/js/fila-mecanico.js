@@ -0,0 +1,80 @@
+// Fila de serviços pendentes ao vivo: recebe as mudanças dos agendamentos por
+// Server-Sent Events e atualiza as tabelas sem recarregar a página.
+// Uso: <div id="fila-pendentes" data-eventos="{% url 'fila-mecanico-eventos' %}" data-mecanico="...">
+// (Mecanico/components/fila-pendentes.html). Na tabela "Meus Serviços em
+// Andamento", as linhas com data-agendamento saem quando o serviço deixa de ser deste mecânico.
+document.addEventListener("DOMContentLoaded", function () {
+  const fila = document.getElementById("fila-pendentes");
+  // Sem data-eventos: página servida pelo WSGI, sem stream (ver fila_mecanico.py)
+  if (!fila || !fila.dataset.eventos || !window.EventSource) {
+    return;
+  }
+  const mecanico = Number(fila.dataset.mecanico);
+  const tbody = fila.querySelector("tbody");
+  const tabela = fila.querySelector(".table-container");
+  const vazio = fila.querySelector(".empty-message");
+  const modelo = document.getElementById("linha-pendente");
+
+  function atualizarVazio() {
+    const temLinhas = tbody.rows.length > 0;
+    tabela.hidden = !temLinhas;
+    vazio.hidden = temLinhas;
+  }
+
+  function resumir(texto, palavras) {
+    const partes = texto.split(/\s+/).filter(Boolean);
+    return partes.length > palavras ? partes.slice(0, palavras).join(" ") + " …" : texto;
+  }
+
+  function criarLinha(evento) {
+    const linha = modelo.content.firstElementChild.cloneNode(true);
+    linha.dataset.agendamento = evento.agendamento;
+    linha.dataset.dataHora = evento.data_hora;
+    linha.querySelectorAll("[data-campo]").forEach((campo) => {
+      campo.textContent = evento[campo.dataset.campo];
+    });
+    const descricao = linha.querySelector('[data-campo="descricao"]');
+    if (evento.descricao) {
+      descricao.textContent = resumir(evento.descricao, 15);
+    } else {
+      descricao.innerHTML = "<em>Sem descrição</em>";
+    }
+    const pegar = linha.querySelector("a");
+    pegar.href = pegar.getAttribute("href").replace(/0\/$/, `${evento.agendamento}/`);
+    return linha;
+  }
+
+  function inserirPendente(evento) {
+    const linha = criarLinha(evento);
+    // Mantém a ordem por data_hora, como a consulta da view
+    const depois = Array.from(tbody.rows).find(
+      (atual) => new Date(atual.dataset.dataHora) > new Date(evento.data_hora)
+    );
+    tbody.insertBefore(linha, depois || null);
+  }
+
+  function aplicar(evento) {
+    const atual = tbody.querySelector(`tr[data-agendamento="${evento.agendamento}"]`);
+    if (atual) {
+      atual.remove();
+    }
+    if (evento.status === "agendado") {
+      inserirPendente(evento);
+    }
+    atualizarVazio();
+
+    const meu = document.querySelector(`.table-em-andamento tr[data-agendamento="${evento.agendamento}"]`);
+    const ehMeu = evento.status === "em_andamento" && evento.mecanico === mecanico;
+    if (meu && !ehMeu) {
+      meu.remove();
+    } else if (!meu && ehMeu && document.querySelector(".table-em-andamento, #sem-servicos-em-andamento")) {
+      // Atribuído a este mecânico fora desta página (ex.: pelo administrador)
+      window.location.reload();
+    }
+  }
+
+  const eventos = new EventSource(fila.dataset.eventos);
+  eventos.addEventListener("agendamento", (mensagem) => aplicar(JSON.parse(mensagem.data)));
+  // O servidor perdeu eventos desta conexão (restart ou cliente lento): recarrega tudo
+  eventos.addEventListener("recarregar", () => window.location.reload());
+});
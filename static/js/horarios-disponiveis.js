@@ -0,0 +1,61 @@
+// Preenche o <select> de hora com os horários livres do dia escolhido.
+// Uso: <select id="hora" data-url="{% url 'horarios-disponiveis' %}" data-data="data">
+// Na remarcação, data-atual e data-dia-atual mantêm o horário já reservado como opção.
+document.addEventListener("DOMContentLoaded", function () {
+  document.querySelectorAll("select[data-url][data-data]").forEach((selectHora) => {
+    const inputData = document.getElementById(selectHora.dataset.data);
+    const horaAtual = selectHora.dataset.atual || "";
+    const diaAtual = selectHora.dataset.diaAtual || "";
+
+    function preencher(horarios, mensagem) {
+      selectHora.innerHTML = "";
+      const vazio = document.createElement("option");
+      vazio.value = "";
+      vazio.disabled = true;
+      vazio.selected = true;
+      vazio.textContent = mensagem;
+      selectHora.appendChild(vazio);
+
+      horarios.forEach((hora) => {
+        const opcao = document.createElement("option");
+        opcao.value = hora;
+        opcao.textContent = hora;
+        if (hora === horaAtual) {
+          opcao.selected = true;
+        }
+        selectHora.appendChild(opcao);
+      });
+    }
+
+    function carregar() {
+      if (!inputData.value) {
+        preencher([], "Escolha a data primeiro");
+        return;
+      }
+      preencher([], "Carregando...");
+
+      fetch(`${selectHora.dataset.url}?inicio=${inputData.value}&dias=1`)
+        .then((resposta) => resposta.json())
+        .then((dados) => {
+          const dia = (dados.dias || [])[0];
+          if (dia && horaAtual && inputData.value === diaAtual && !dia.horarios.includes(horaAtual)) {
+            dia.horarios = [...dia.horarios, horaAtual].sort();
+            dia.lotado = false;
+          }
+          if (!dia) {
+            preencher([], "A oficina não funciona neste dia");
+          } else if (dia.lotado) {
+            preencher([], "Dia lotado - escolha outra data");
+          } else if (!dia.horarios.length) {
+            preencher([], "Nenhum horário livre neste dia");
+          } else {
+            preencher(dia.horarios, "Selecione um horário");
+          }
+        })
+        .catch(() => preencher([], "Erro ao carregar horários"));
+    }
+
+    inputData.addEventListener("change", carregar);
+    carregar();
+  });
+});